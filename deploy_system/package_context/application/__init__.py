@@ -1,3 +1,8 @@
 # coding=utf-8
 
-from package_deploy_service import PackageDeployService
+from deploy_system.package_context.application.package_deploy_service import \
+    PackageDeployService
+from deploy_system.package_context.application.package_retention_service \
+    import PackageRetentionService
+from deploy_system.package_context.application.package_watch_service import \
+    PackageWatchService
@@ -46,21 +46,28 @@ class PackageDeployService(object):
         package = self.package_repo.get(package_name)
         package.build()
 
-    def deploy(self, package_name, package_type, level='', version_number=''):
+    def deploy(self, package_name, package_type, level='', version_number='',
+               ref='', url=''):
         """Public interface of this service.
 
-        It will arrange the full user case of deployment.
+        It will arrange the full user case of deployment. Source code is pulled
+        from the default branch unless a branch or tag is given as ref, and
+        from the Gitlab repo of the package unless a repo url is given.
 
         """
         assert package_type in ('internal', 'external'), \
             "package_type should be either 'internal' or 'external'."
-        self.package_service.create_package(package_name, package_type)
-        self.build(package_name)
-        self.deploy_service.deploy(package_name,
-                                   package_type,
-                                   level,
-                                   version_number)
-        self.clear(package_name)
+        # Entities created during this deployment only live in its session,
+        # they get evicted from package repository some time after it ends.
+        with self.package_repo.session():
+            self.package_service.create_package(package_name, package_type,
+                                                ref, url)
+            self.build(package_name)
+            self.deploy_service.deploy(package_name,
+                                       package_type,
+                                       level,
+                                       version_number)
+            self.clear(package_name)
 
     def clear(self, package_name):
         """Remove specific package from source and staging area."""
@@ -0,0 +1,102 @@
+# coding=utf-8
+"""Application service module applies retention of deployed versions."""
+
+# Import built-in modules
+from collections import OrderedDict
+
+# Import framework utilities
+from deploy_system.utils.ioc import dependency
+from deploy_system.utils.reaper import Reaper
+
+# Import local context domain services
+from deploy_system.package_context.domain.service import RetentionService
+
+
+class PackageRetentionService(object):
+    """Package retention service class.
+
+    Use report() to see what would be removed, and collect() to actually
+    remove old versions with a background reaper.
+
+    """
+
+    # Dependency injection
+    @dependency('deployment_repo')
+    @dependency('version_repo')
+    def __init__(self, deployment_repo=None, version_repo=None):
+        """Initialize the service.
+
+        Use dependency injection technique to get actual implementation class
+        of deployment repository and version repository.
+
+        """
+        self.deployment_repo = deployment_repo()
+        self.version_repo = version_repo()
+        self.retention_service = RetentionService(self.deployment_repo,
+                                                  self.version_repo)
+
+    def report(self, keep=3):
+        """Dry run of the retention, nothing will be removed.
+
+        Args:
+            keep (int): Number of latest versions to keep per package.
+
+        Returns (OrderedDict): Mapping of package name to a dict with removable
+            'versions' and reclaimable 'bytes'.
+
+        """
+        report = OrderedDict()
+        expired = self.retention_service.get_expired_versions(keep)
+        for package_name, versions in expired.items():
+            report[package_name] = {
+                'versions': OrderedDict(
+                    (version, self.deployment_repo.get_size(package_name,
+                                                            version))
+                    for version in versions)
+            }
+            report[package_name]['bytes'] = sum(
+                report[package_name]['versions'].values())
+        return report
+
+    @staticmethod
+    def format_report(report):
+        """Format a report into human readable text.
+
+        Args:
+            report (OrderedDict): Result of report().
+
+        Returns (str): One line per package and a total line.
+
+        """
+        lines = []
+        for package_name, info in report.items():
+            lines.append('{}: {} version(s), {:.1f} MB reclaimable ({})'.format(
+                package_name,
+                len(info['versions']),
+                info['bytes'] / 1024.0 / 1024.0,
+                ', '.join(info['versions'])))
+        lines.append('Total: {:.1f} MB reclaimable'.format(
+            sum(info['bytes'] for info in report.values()) / 1024.0 / 1024.0))
+        return '\n'.join(lines)
+
+    def collect(self, keep=3, interval=1.0, bytes_per_second=0):
+        """Remove expired versions of all packages in background.
+
+        Args:
+            keep (int): Number of latest versions to keep per package.
+            interval (float): Seconds the reaper waits after each version.
+            bytes_per_second (int): Average removing speed limit of the
+                reaper, 0 means no limit.
+
+        Returns (Reaper): The running reaper, join() it to wait until all
+            expired versions been removed.
+
+        """
+        reaper = Reaper(interval, bytes_per_second)
+        reaper.start()
+        for package_name, info in self.report(keep).items():
+            for version, size in info['versions'].items():
+                self.deployment_repo.remove(package_name, version,
+                                            reaper=reaper, size=size)
+        reaper.stop()
+        return reaper
@@ -0,0 +1,296 @@
+# coding=utf-8
+"""Application service module deploys packages when new tags are pushed."""
+
+# Import built-in modules
+from collections import deque, OrderedDict
+import logging
+import threading
+import time
+
+# Import framework utilities
+from deploy_system.utils.ioc import dependency
+
+# Import local context domain objects
+from deploy_system.package_context.domain.value_object import VersionNumber
+
+# Import local modules
+from deploy_system.package_context.application.package_deploy_service import \
+    PackageDeployService
+
+
+logger = logging.getLogger(__name__)
+
+# Number of latest queued tags remembered to skip queuing them again.
+MAX_SEEN_TAGS = 1024
+
+
+class DeployQueue(object):
+    """Queue of tag deployments.
+
+    The same tag of a package is only queued once while it's among the
+    latest max_seen queued tags, and deployments of the same package never
+    run at the same time, they are handed out in the order they came in.
+    Once closed, deployments still queued are handed out before workers
+    are told to quit.
+
+    """
+
+    def __init__(self, max_seen=MAX_SEEN_TAGS):
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()
+        self._running = set()
+        self._seen = OrderedDict()
+        self.max_seen = max_seen
+        self._closed = False
+
+    def put(self, package_name, package_type, tag, detected_time):
+        """Queue a deployment if the same tag never been queued.
+
+        Returns (bool): Whether the deployment been queued.
+
+        """
+        with self._condition:
+            if (package_name, tag) in self._seen:
+                return False
+            self._seen[(package_name, tag)] = True
+            while len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+            self._pending.setdefault(package_name, deque()).append(
+                (package_name, package_type, tag, detected_time))
+            self._condition.notify()
+            return True
+
+    def get(self):
+        """Wait and take the next deployment of a package not being deployed.
+
+        Returns (tuple): (package_name, package_type, tag, detected_time), or
+            None if the queue been closed and no deployment is left.
+
+        """
+        with self._condition:
+            while True:
+                for package_name, jobs in self._pending.items():
+                    if package_name not in self._running:
+                        self._running.add(package_name)
+                        job = jobs.popleft()
+                        if not jobs:
+                            del self._pending[package_name]
+                        return job
+                # Deployments of a package being deployed are still left,
+                # they're handed out once it finished.
+                if self._closed and not self._pending:
+                    return None
+                self._condition.wait()
+
+    def task_done(self, package_name):
+        """Mark deployment of a package finished."""
+        with self._condition:
+            self._running.discard(package_name)
+            self._condition.notify_all()
+
+    def close(self):
+        """Wake up all waiting workers and let them quit once all queued
+        deployments been handed out."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def depth(self):
+        """Number of deployments waiting in queue."""
+        with self._condition:
+            return sum(len(jobs) for jobs in self._pending.values())
+
+
+class WatchMetrics(object):
+    """Counters of the watch service, safe to read from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.deployed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=100)
+
+    def record(self, latency, success):
+        """Record a finished deployment.
+
+        Args:
+            latency (float): Seconds from tag detected to version published.
+            success (bool): Whether the deployment succeeded.
+
+        """
+        with self._lock:
+            if success:
+                self.deployed += 1
+                self.latencies.append(latency)
+            else:
+                self.failed += 1
+
+    def snapshot(self, queue_depth):
+        """Get current value of all metrics.
+
+        Args:
+            queue_depth (int): Current depth of the deploy queue.
+
+        Returns (dict): Metric name and value.
+
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                'queue_depth': queue_depth,
+                'deployed': self.deployed,
+                'failed': self.failed,
+                'last_latency': self.latencies[-1] if latencies else None,
+                'max_latency': latencies[-1] if latencies else None,
+                'median_latency':
+                    latencies[len(latencies) // 2] if latencies else None
+            }
+
+
+class PackageWatchService(object):
+    """Package watch service class.
+
+    Poll repos of the given packages for new tags and deploy every new tag
+    as a version with the same number. Call start() to run in background and
+    stop() to quit after running deployments finished.
+
+    """
+
+    # Dependency injection
+    @dependency('code_repo')
+    def __init__(self, packages, poll_interval=60, batch_window=5, workers=2,
+                 repo_urls=None, code_repo=None):
+        """Initialize the service.
+
+        Args:
+            packages (dict): Mapping of package name to package type.
+            poll_interval (float): Seconds between two polls of all repos.
+            batch_window (float): Seconds to wait for more tags once a new tag
+                shows up, so a release pushing many tags deploys once.
+            workers (int): Maximum number of deployments running together.
+            repo_urls (dict): Mapping of package name to url of its repo, like
+                a local bare repo, packages not in it use their Gitlab repo.
+
+        """
+        self.code_repo = code_repo()
+        self.packages = packages
+        self.repo_urls = repo_urls or {}
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.queue = DeployQueue()
+        self.metrics = WatchMetrics()
+        self.known_tags = {}
+        self.threads = []
+        self.workers = workers
+        self._stop_event = threading.Event()
+
+    def poll(self):
+        """Get tags created since last poll.
+
+        Tags exist on first poll are taken as already deployed.
+
+        Returns (list): (package_name, package_type, tag, detected_time).
+
+        """
+        events = []
+        for package_name, package_type in self.packages.items():
+            try:
+                tags = set(self.code_repo.get_tags(
+                    package_name, package_type,
+                    self.repo_urls.get(package_name, '')))
+            except Exception as exc:
+                logger.warning('Failed to list tags of %s: %s',
+                               package_name, exc)
+                continue
+            if package_name in self.known_tags:
+                for tag in tags - self.known_tags[package_name]:
+                    events.append((package_name, package_type, tag,
+                                   time.time()))
+                tags |= self.known_tags[package_name]
+            self.known_tags[package_name] = tags
+        return events
+
+    def enqueue(self, events):
+        """Queue deployments of a batch of tag events.
+
+        Only the highest tag of each package in the batch is deployed.
+
+        Args:
+            events (list): (package_name, package_type, tag, detected_time).
+
+        """
+        latest = {}
+        for event in events:
+            package_name, tag = event[0], event[2]
+            if package_name not in latest or \
+                    VersionNumber.sort_key(tag) > \
+                    VersionNumber.sort_key(latest[package_name][2]):
+                latest[package_name] = event
+        for event in latest.values():
+            self.queue.put(*event)
+
+    def deploy(self, package_name, package_type, tag):
+        """Deploy a tag of a package.
+
+        Each deployment uses its own service, services hold repositories which
+        are not meant to be shared between threads.
+
+        """
+        PackageDeployService().deploy(package_name,
+                                      package_type,
+                                      version_number=tag.lstrip('v'),
+                                      ref=tag,
+                                      url=self.repo_urls.get(package_name, ''))
+
+    def work(self):
+        """Deploy queued tags until the queue been closed."""
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            package_name, package_type, tag, detected_time = job
+            success = True
+            try:
+                self.deploy(package_name, package_type, tag)
+            except Exception as exc:
+                success = False
+                logger.error('Failed to deploy %s %s: %s',
+                             package_name, tag, exc)
+            finally:
+                self.queue.task_done(package_name)
+            self.metrics.record(time.time() - detected_time, success)
+
+    def watch(self):
+        """Poll repos and queue new tags until stop() been called."""
+        self.poll()
+        while not self._stop_event.wait(self.poll_interval):
+            events = self.poll()
+            if events and not self._stop_event.wait(self.batch_window):
+                events.extend(self.poll())
+            self.enqueue(events)
+
+    def start(self):
+        """Start the watcher and worker threads in background."""
+        self._stop_event.clear()
+        self.threads = [threading.Thread(target=self.work)
+                        for _ in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.watch))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stop polling and wait for queued deployments to finish."""
+        self._stop_event.set()
+        self.queue.close()
+        for thread in self.threads:
+            thread.join()
+
+    def get_metrics(self):
+        """Get current queue depth and tag to publish latency in seconds.
+
+        Returns (dict): Metric name and value.
+
+        """
+        return self.metrics.snapshot(self.queue.depth)
@@ -5,7 +5,7 @@
 from collections import OrderedDict
 
 # Import local context domain objects
-from value_object import VersionNumber
+from deploy_system.package_context.domain.value_object import VersionNumber
 
 
 class Package(object):
@@ -10,6 +10,10 @@ class CodeRepository(object):
     def get_code(self):
         pass
 
+    @abstractmethod
+    def get_tags(self, package_name, package_type, url=''):
+        pass
+
     @abstractmethod
     def get_build_module(self, package_name):
         pass
@@ -30,10 +34,18 @@ class VersionRepository(object):
     def update(self, package_name, new_version):
         pass
 
+    @abstractmethod
+    def get_pinned_versions(self):
+        pass
+
 
 class PackageRepository(object):
     __metaclass__ = ABCMeta
 
+    @abstractmethod
+    def session(self):
+        pass
+
     @abstractmethod
     def get(self, package_name):
         pass
@@ -41,3 +53,23 @@ class PackageRepository(object):
     @abstractmethod
     def update(self, package):
         pass
+
+
+class DeploymentRepository(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get_packages(self):
+        pass
+
+    @abstractmethod
+    def get_versions(self, package_name):
+        pass
+
+    @abstractmethod
+    def get_size(self, package_name, version_number):
+        pass
+
+    @abstractmethod
+    def remove(self, package_name, version_number):
+        pass
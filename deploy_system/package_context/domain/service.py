@@ -1,9 +1,12 @@
 # coding=utf-8
 """Domain services of package context."""
 
+# Import built-in modules
+from collections import OrderedDict
+
 # Import local context domain objects
-from entity import Package
-from value_object import VersionNumber
+from deploy_system.package_context.domain.entity import Package
+from deploy_system.package_context.domain.value_object import VersionNumber
 
 
 class DuplicatedPackageNameError(Exception):
@@ -32,13 +35,13 @@ class CreatePackageService(object):
         self.version_repo = version_repo
         self.package_repo = package_repo
 
-    def create_package(self, package_name, package_type):
+    def create_package(self, package_name, package_type, ref='', url=''):
         package = Package(package_name)
         if package_type == 'internal':
             current_version = GetCurrentVersionService(
                 self.version_repo).get_current_version(package_name)
             package.current_version = current_version
-        self.code_repo.get_code(package_name, package_type)
+        self.code_repo.get_code(package_name, package_type, ref, url)
         package.build_module = self.code_repo.get_build_module(package_name)
         self.package_repo.update(package)
 
@@ -100,3 +103,66 @@ class GetCurrentVersionService(object):
 
     def get_current_version(self, package_name):
         return self.version_repo.get_package_version(package_name)
+
+
+class RetentionService(object):
+    def __init__(self, deployment_repo, version_repo):
+        self.deployment_repo = deployment_repo
+        self.version_repo = version_repo
+
+    def get_resolved_version(self, package_name):
+        """Get the version launch_app resolves for a package name.
+
+        launch_app always takes the last folder name in plain string order, so
+        that's the version other packages' requirements actually point to.
+
+        """
+        versions = self.deployment_repo.get_versions(package_name)
+        if versions:
+            return sorted(versions)[-1]
+
+    def get_kept_versions(self, keep):
+        """Get versions to keep for every deployed package.
+
+        A version is kept if it is one of the latest `keep` versions of its
+        package, the version pinned in version database, or the version
+        launch_app resolves for the package.
+
+        Args:
+            keep (int): Number of latest versions to keep per package.
+
+        Returns (dict): Mapping of package name to a set of version numbers.
+
+        """
+        pinned = self.version_repo.get_pinned_versions()
+        kept = {}
+        for package_name in self.deployment_repo.get_packages():
+            versions = sorted(self.deployment_repo.get_versions(package_name),
+                              key=VersionNumber.sort_key)
+            kept[package_name] = set(versions[-keep:] if keep > 0 else [])
+            kept[package_name].add(self.get_resolved_version(package_name))
+            if pinned.get(package_name) in versions:
+                kept[package_name].add(pinned[package_name])
+            kept[package_name].discard(None)
+        return kept
+
+    def get_expired_versions(self, keep):
+        """Get versions which are safe to be removed for every package.
+
+        Args:
+            keep (int): Number of latest versions to keep per package.
+
+        Returns (OrderedDict): Mapping of package name to a list of version
+            numbers, oldest first. Packages with nothing to remove are skipped.
+
+        """
+        kept = self.get_kept_versions(keep)
+        expired = OrderedDict()
+        for package_name in sorted(kept):
+            versions = [version for version in
+                        self.deployment_repo.get_versions(package_name)
+                        if version not in kept[package_name]]
+            if versions:
+                expired[package_name] = sorted(versions,
+                                               key=VersionNumber.sort_key)
+        return expired
@@ -65,3 +65,18 @@ class VersionNumber(str):
         if match:
             return True
         raise ValueError('Version number string not match valid format.')
+
+    @staticmethod
+    def sort_key(version_string):
+        """Get a key to sort version number strings in release order.
+
+        Digits are compared as numbers, so 1.10.0 comes after 1.9.0.
+
+        Args:
+            version_string (str): The version number string.
+
+        Returns (tuple): Key to be used by sorted().
+
+        """
+        return tuple(int(part) if part.isdigit() else part
+                     for part in re.split(r'(\d+)', version_string))
@@ -8,6 +8,7 @@ import os
 import shutil
 import subprocess
 import sys
+import threading
 
 # Import framework utilities
 from deploy_system.utils.ioc import dependency, register
@@ -17,52 +18,118 @@ from deploy_system.utils.path import handle_remove_readonly, hotfix
 from deploy_system.package_context.domain.repository import CodeRepository
 
 # Import local modules
-from constants import EXTERNAL_REPO_PATTERN, INTERNAL_REPO_PATTERN, INTERNAL_DEPLOY_DIR, \
-    SOURCE_DIR, STAGING_DIR, EXTERNAL_DEPLOY_DIR
+from deploy_system.package_context.infrastructure.constants import (
+    EXTERNAL_REPO_PATTERN, INTERNAL_REPO_PATTERN, INTERNAL_DEPLOY_DIR,
+    SOURCE_DIR, STAGING_DIR, EXTERNAL_DEPLOY_DIR, GIT_BIN_DIR)
 
 
-def gitlab_puller(package_name, package_type):
-    """Pull source code from Gitlab with given repo name.
+# Deployments may run in parallel threads, but cloning, importing the build
+# module and building change process wide state like sys.path, sys.modules
+# and the current folder, so only one package runs those steps at a time.
+ENVIRONMENT_LOCK = threading.RLock()
+
+
+def get_repo_url(package_name, package_type):
+    """Get Gitlab repo url of a package.
 
     Args:
         package_name (str): Name of a Gitlab repo.
         package_type (str): Either 'internal' or 'external'.
 
-    Returns:
+    Returns (str): Url of the repo.
 
     """
     if package_type == 'internal':
-        url = INTERNAL_REPO_PATTERN.format(package_name)
+        return INTERNAL_REPO_PATTERN.format(package_name)
     elif package_type == 'external':
-        url = EXTERNAL_REPO_PATTERN.format(package_name)
-    else:
-        raise AssertionError("package_type should be either 'internal' or "
-                             "'external'.")
-    os.environ['PATH'] = r'C:\Program Files\Git\cmd'
+        return EXTERNAL_REPO_PATTERN.format(package_name)
+    raise AssertionError("package_type should be either 'internal' or "
+                         "'external'.")
+
+
+def get_git_env():
+    """Get environment to run git in, with Git for Windows found first.
+
+    Returns (dict): A copy of current environment, os.environ is unchanged.
+
+    """
+    env = os.environ.copy()
+    env['PATH'] = os.pathsep.join([GIT_BIN_DIR, env.get('PATH', '')])
+    return env
+
+
+def gitlab_puller(package_name, package_type, ref='', url=''):
+    """Pull source code from Gitlab with given repo name.
+
+    Args:
+        package_name (str): Name of a Gitlab repo.
+        package_type (str): Either 'internal' or 'external'.
+        ref (str): Branch or tag to check out, default branch if empty.
+        url (str): Url of the repo, the Gitlab repo of the package if empty.
+
+    Returns:
+
+    """
+    url = url or get_repo_url(package_name, package_type)
     cmd = [
         'git',
         '-C',
         SOURCE_DIR,
         'clone',
-        url
+        url,
+        package_name
     ]
-    subprocess.check_call(cmd, env=os.environ)
+    if ref:
+        cmd.extend(['--branch', ref])
+    subprocess.check_call(cmd, env=get_git_env())
+
+
+def gitlab_tags(package_name, package_type, url=''):
+    """List tags of a Gitlab repo without cloning it.
+
+    Args:
+        package_name (str): Name of a Gitlab repo.
+        package_type (str): Either 'internal' or 'external'.
+        url (str): Url of the repo, the Gitlab repo of the package if empty.
+
+    Returns (list): Tag names of the repo.
+
+    """
+    url = url or get_repo_url(package_name, package_type)
+    output = subprocess.check_output(['git', 'ls-remote', '--tags', url],
+                                     env=get_git_env())
+    tags = set()
+    for line in output.decode('utf-8').splitlines():
+        ref = line.split()[-1]
+        if ref.startswith('refs/tags/'):
+            tags.add(ref[len('refs/tags/'):].replace('^{}', ''))
+    return sorted(tags)
 
 
 @contextmanager
 def temp_env(path):
     """Context manager to temporarily specify sys.path.
 
+    sys.path and sys.modules are changed in place, the import system keeps
+    using the original objects if they're rebound. Modules imported inside
+    are removed from sys.modules afterwards, so they're only referenced by
+    whoever imported them, and the next package imports its own build module.
+
     Args:
         path (str): Absolute path of a folder.
 
     """
-    original_paths = sys.path
+    original_paths = sys.path[:]
     original_modules = sys.modules.copy()
-    sys.path = [path]
-    yield
-    sys.path = original_paths
-    sys.modules = original_modules
+    sys.path[:] = [path]
+    try:
+        yield
+    finally:
+        sys.path[:] = original_paths
+        for name in list(sys.modules):
+            if name not in original_modules:
+                del sys.modules[name]
+        sys.modules.update(original_modules)
 
 
 class Builder(object):
@@ -86,10 +153,14 @@ class Builder(object):
     def build(self):
         """Call the run() function from the build module.
 
+        Build modules may change process wide state too, so builds of
+        parallel deployments run one at a time.
+
         Returns:
 
         """
-        self.build_module.run(self.config)
+        with ENVIRONMENT_LOCK:
+            self.build_module.run(self.config)
 
 
 # Register this class as the implementation of code repository.
@@ -98,19 +169,39 @@ class CodePersistence(CodeRepository):
     """Implementation of code repository."""
 
     @staticmethod
-    def get_code(package_name, package_type):
+    def get_code(package_name, package_type, ref='', url=''):
         """Pull latest source code of specific package from Gitlab.
 
         Args:
             package_name (str): Name of a Gitlab repo.
+            package_type (str): Either 'internal' or 'external'.
+            ref (str): Branch or tag to pull, default branch if empty.
+            url (str): Url of the repo, the Gitlab repo of the package if
+                empty.
 
         Returns:
 
         """
-        if package_name in os.listdir(SOURCE_DIR):
-            shutil.rmtree('{}/{}'.format(SOURCE_DIR, package_name),
-                          onerror=handle_remove_readonly)
-        gitlab_puller(package_name, package_type)
+        with ENVIRONMENT_LOCK:
+            if package_name in os.listdir(SOURCE_DIR):
+                shutil.rmtree('{}/{}'.format(SOURCE_DIR, package_name),
+                              onerror=handle_remove_readonly)
+            gitlab_puller(package_name, package_type, ref, url)
+
+    @staticmethod
+    def get_tags(package_name, package_type, url=''):
+        """Get all tag names of specific package from Gitlab.
+
+        Args:
+            package_name (str): Name of a Gitlab repo.
+            package_type (str): Either 'internal' or 'external'.
+            url (str): Url of the repo, the Gitlab repo of the package if
+                empty.
+
+        Returns (list): Tag names of the repo.
+
+        """
+        return gitlab_tags(package_name, package_type, url)
 
     @staticmethod
     @dependency('package_repo')
@@ -153,8 +244,9 @@ class CodePersistence(CodeRepository):
         Returns (model object): The build module of the package.
 
         """
-        with temp_env('{}/{}'.format(SOURCE_DIR, package_name)):
-            build_module = import_module('build')
+        with ENVIRONMENT_LOCK:
+            with temp_env('{}/{}'.format(SOURCE_DIR, package_name)):
+                build_module = import_module('build')
         return build_module
 
     @staticmethod
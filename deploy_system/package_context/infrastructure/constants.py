@@ -13,3 +13,5 @@ STAGING_DIR = 'path_to_staging'
 INTERNAL_DEPLOY_DIR = 'path_to_internal_deployment'
 
 EXTERNAL_DEPLOY_DIR = 'path_to_external_deployment'
+
+GIT_BIN_DIR = r'C:\Program Files\Git\cmd'
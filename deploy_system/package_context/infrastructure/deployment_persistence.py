@@ -0,0 +1,109 @@
+# coding=utf-8
+"""Implementation of deployed package versions related operators."""
+
+# Import built-in modules
+import os
+import shutil
+
+# Import framework utilities
+from deploy_system.utils.ioc import register
+from deploy_system.utils.path import handle_remove_readonly
+
+# Import local context domain objects
+from deploy_system.package_context.domain.repository import \
+    DeploymentRepository
+
+# Import local modules
+from deploy_system.package_context.infrastructure.constants import INTERNAL_DEPLOY_DIR, EXTERNAL_DEPLOY_DIR
+
+
+# Register this class as the implementation of deployment repository.
+@register('deployment_repo')
+class DeploymentPersistence(DeploymentRepository):
+    """Implementation of deployment repository."""
+
+    deploy_dirs = [INTERNAL_DEPLOY_DIR, EXTERNAL_DEPLOY_DIR]
+
+    def get_package_dir(self, package_name):
+        """Get deployment folder of a package.
+
+        Same as launch_app, external area wins if both areas have the package.
+
+        Args:
+            package_name (str): Name of the package.
+
+        Returns (str): Absolute path of the folder, None if not deployed.
+
+        """
+        package_dir = None
+        for root in self.deploy_dirs:
+            if os.path.isdir('{}/{}'.format(root, package_name)):
+                package_dir = '{}/{}'.format(root, package_name)
+        return package_dir
+
+    def get_packages(self):
+        """Get names of all deployed packages.
+
+        Returns (list): Names of packages in internal and external area.
+
+        """
+        packages = set()
+        for root in self.deploy_dirs:
+            if os.path.isdir(root):
+                packages.update(name for name in os.listdir(root) if
+                                os.path.isdir('{}/{}'.format(root, name)))
+        return sorted(packages)
+
+    def get_versions(self, package_name):
+        """Get all deployed versions of a package.
+
+        Args:
+            package_name (str): Name of the package.
+
+        Returns (list): Version numbers in plain string order.
+
+        """
+        package_dir = self.get_package_dir(package_name)
+        if not package_dir:
+            return []
+        return sorted(name for name in os.listdir(package_dir) if
+                      os.path.isdir('{}/{}'.format(package_dir, name)))
+
+    def get_size(self, package_name, version_number):
+        """Get size on disk of a deployed version.
+
+        Args:
+            package_name (str): Name of the package.
+            version_number (str): A deployed version of the package.
+
+        Returns (int): Size in bytes.
+
+        """
+        size = 0
+        version_dir = '{}/{}'.format(self.get_package_dir(package_name),
+                                     version_number)
+        for folder, _, files in os.walk(version_dir):
+            for _file in files:
+                try:
+                    size += os.lstat(os.path.join(folder, _file)).st_size
+                except OSError:
+                    pass
+        return size
+
+    def remove(self, package_name, version_number, reaper=None, size=0):
+        """Remove a deployed version.
+
+        Args:
+            package_name (str): Name of the package.
+            version_number (str): A deployed version of the package.
+            reaper (Reaper): Running reaper to queue the folder into, the
+                folder is removed right away if not given.
+            size (int): Size in bytes of the version, used by throttling.
+
+        """
+        version_dir = '{}/{}'.format(self.get_package_dir(package_name),
+                                     version_number)
+        if reaper:
+            reaper.remove(version_dir, size)
+        elif os.path.isdir(version_dir):
+            shutil.rmtree(version_dir, onerror=handle_remove_readonly)
@@ -1,6 +1,13 @@
 # coding=utf-8
 """Implementation of package related operator."""
 
+# Import built-in modules
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import count
+import sys
+import threading
+
 # Import framework utilities
 from deploy_system.utils.ioc import register
 
@@ -8,25 +15,133 @@ from deploy_system.utils.ioc import register
 from deploy_system.package_context.domain.repository import PackageRepository
 
 
+def release(package):
+    """Drop the build module and builder a package entity holds.
+
+    Args:
+        package (Package): A package entity.
+
+    """
+    build_module = package.build_module
+    if build_module is not None:
+        for name, module in list(sys.modules.items()):
+            if module is build_module:
+                del sys.modules[name]
+    package.build_module = None
+    package.builder = None
+
+
 # Register this class as the implementation of package repository.
 @register('package_repo')
 class PackagePersistence(PackageRepository):
-    """Implementation of package repository."""
+    """Implementation of package repository.
 
-    # Storage of packages.
+    Packages are stored per deploy session. A session is bound to the thread
+    that opened it, so parallel deployments never see each other's entities.
+    When a session ends its packages are kept as finished for later lookup by
+    any thread, only the latest finished entity of each package name and at
+    most `max_finished` of them in total. Evicted ones release their build
+    modules.
+
+    Packages stored outside any session are kept as finished right away,
+    so they're evicted the same way.
+
+    """
+
+    # Storage of packages of running sessions, session id to OrderedDict of
+    # package name to package entity.
     __packages__ = {}
+    # Storage of packages of ended sessions in least recently used order,
+    # package name to package entity.
+    __finished__ = OrderedDict()
+    __lock__ = threading.RLock()
+    __local__ = threading.local()
+    __session_ids__ = count(1)
+
+    max_finished = 32
+
+    @classmethod
+    def current_session(cls):
+        """Get id of the innermost session opened by current thread.
+
+        Returns (int): Session id, None outside any session.
+
+        """
+        sessions = getattr(cls.__local__, 'sessions', None)
+        return sessions[-1] if sessions else None
+
+    @classmethod
+    @contextmanager
+    def session(cls):
+        """Context manager to scope stored packages into a deploy session.
+
+        Yields (int): Id of the new session.
+
+        """
+        with cls.__lock__:
+            session_id = next(cls.__session_ids__)
+            cls.__packages__[session_id] = OrderedDict()
+        if not hasattr(cls.__local__, 'sessions'):
+            cls.__local__.sessions = []
+        cls.__local__.sessions.append(session_id)
+        try:
+            yield session_id
+        finally:
+            cls.__local__.sessions.pop()
+            cls.finish(session_id)
+
+    @classmethod
+    def finish(cls, session_id):
+        """Move packages of a session into finished storage.
+
+        Args:
+            session_id (int): Id of the session.
+
+        """
+        with cls.__lock__:
+            packages = cls.__packages__.pop(session_id, {})
+            for package in packages.values():
+                cls.keep_finished(package)
+
+    @classmethod
+    def keep_finished(cls, package):
+        """Store a package as finished, evict the least recently used ones.
+
+        Args:
+            package (Package): A package entity.
+
+        """
+        with cls.__lock__:
+            previous = cls.__finished__.pop(package.name, None)
+            if previous is not None and previous is not package:
+                release(previous)
+            cls.__finished__[package.name] = package
+            while len(cls.__finished__) > cls.max_finished:
+                _, evicted = cls.__finished__.popitem(last=False)
+                release(evicted)
 
     @classmethod
     def get(cls, package_name):
         """Get a package entity from storage with given package name.
 
+        Look up current session first, then the finished sessions.
+
         Args:
             package_name (str): Name of a package.
 
         Returns (Package): The package entity relevant to the given name.
 
         """
-        return cls.__packages__.get(package_name)
+        session_id = cls.current_session()
+        with cls.__lock__:
+            packages = cls.__packages__.get(session_id, {})
+            if package_name in packages:
+                return packages[package_name]
+            if package_name in cls.__finished__:
+                # Touch the entry to mark it as recently used.
+                package = cls.__finished__.pop(package_name)
+                cls.__finished__[package_name] = package
+                return package
 
     @classmethod
     def update(cls, package):
@@ -38,4 +153,9 @@ class PackagePersistence(PackageRepository):
             package (Package): A package entity.
 
         """
-        cls.__packages__[package.name] = package
+        session_id = cls.current_session()
+        with cls.__lock__:
+            if session_id is None:
+                cls.keep_finished(package)
+            else:
+                cls.__packages__[session_id][package.name] = package
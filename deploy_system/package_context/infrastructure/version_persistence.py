@@ -3,6 +3,7 @@
 # Import built-in modules
 from collections import OrderedDict
 import json
+import threading
 
 # Import framework utilities
 from deploy_system.utils.ioc import register, dependency
@@ -12,7 +13,7 @@ from deploy_system.package_context.domain.repository import VersionRepository
 from deploy_system.package_context.domain.value_object import VersionNumber
 
 # Import local modules
-from constants import PACKAGE_VERSION_DB
+from deploy_system.package_context.infrastructure.constants import PACKAGE_VERSION_DB
 
 
 # Register this class as the implementation of version repository.
@@ -20,15 +21,20 @@ from constants import PACKAGE_VERSION_DB
 class VersionPersistence(VersionRepository):
     """Implementation of version repository."""
 
+    # Lock shared by all instances, services deploying different packages in
+    # parallel each hold their own copy of the data.
+    __lock__ = threading.Lock()
+
     def __init__(self):
         """Load data of package versions from database file."""
+        self.updated_packages = set()
         try:
             with open(PACKAGE_VERSION_DB, 'r') as db:
                 self.package_version_data = json.load(db)
         except Exception as exc:
             raise IOError('Can\'t open database file {}, '
                           'see detail:\n{}'.format(PACKAGE_VERSION_DB,
-                                                   exc.message))
+                                                   exc))
 
     def validate(self, package_name, package_type):
         if package_name in self.package_version_data and \
@@ -55,6 +61,15 @@ class VersionPersistence(VersionRepository):
         except KeyError:
             return VersionNumber('0.0.0')
 
+    def get_pinned_versions(self):
+        """Get versions recorded in database for every package.
+
+        Returns (dict): Mapping of package name to its recorded version.
+
+        """
+        return dict((name, data['version']) for name, data in
+                    self.package_version_data.items() if data.get('version'))
+
     @dependency('package_repo')
     def update(self, package_name, package_type, package_repo=None):
         """Update version information of a package in package version data.
@@ -67,6 +82,7 @@ class VersionPersistence(VersionRepository):
         """
         package = package_repo.get(package_name)
         new_version = package.new_version
+        self.updated_packages.add(package_name)
         try:
             self.package_version_data[package_name]['version'] = new_version
         except (KeyError, TypeError):
@@ -76,6 +92,20 @@ class VersionPersistence(VersionRepository):
             }
 
     def write(self):
-        """Store updated package version information into database."""
-        with open(PACKAGE_VERSION_DB, 'w') as db:
-            json.dump(self.package_version_data, db, indent=4)
+        """Store updated package version information into database.
+
+        Only packages updated by this instance are written over the latest
+        database content, so parallel deployments don't drop each other's
+        versions.
+
+        """
+        with self.__lock__:
+            with open(PACKAGE_VERSION_DB, 'r') as db:
+                package_version_data = json.load(db)
+            for package_name in self.updated_packages:
+                package_version_data[package_name] = \
+                    self.package_version_data[package_name]
+            with open(PACKAGE_VERSION_DB, 'w') as db:
+                json.dump(package_version_data, db, indent=4)
+            self.package_version_data = package_version_data
+            self.updated_packages.clear()
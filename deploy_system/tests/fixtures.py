@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Temporary deploy areas and local bare repos for tests."""
+
+# Import built-in modules
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Import framework utilities
+from deploy_system.utils.path import handle_remove_readonly
+
+# Import local context implementations, importing them registers them.
+from deploy_system.package_context.infrastructure import code_persistence
+from deploy_system.package_context.infrastructure import package_persistence
+from deploy_system.package_context.infrastructure import version_persistence
+
+
+# Build module of test packages, copies the source into staging area. A
+# sentinel object lets tests check if the module is still referenced.
+BUILD_MODULE = '''
+import shutil
+
+
+class Sentinel(object):
+    pass
+
+
+sentinel = Sentinel()
+
+
+def run(config):
+    shutil.copytree(config['source_dir'], config['staging_dir'],
+                    ignore=shutil.ignore_patterns('.git'))
+'''
+
+
+def git(*args):
+    """Run a git command with a fixed author, return its output."""
+    return subprocess.check_output(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@localhost'] +
+        list(args), stderr=subprocess.STDOUT)
+
+
+class DeployAreaTestCase(unittest.TestCase):
+    """Test case with source, staging and deploy areas and the version
+    database in a temporary folder."""
+
+    constant_names = ('SOURCE_DIR', 'STAGING_DIR', 'INTERNAL_DEPLOY_DIR',
+                      'EXTERNAL_DEPLOY_DIR')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.original_constants = {}
+        for name in self.constant_names:
+            path = os.path.join(self.root, name.lower())
+            os.makedirs(path)
+            self.original_constants[name] = getattr(code_persistence, name)
+            setattr(code_persistence, name, path)
+        self.original_db = version_persistence.PACKAGE_VERSION_DB
+        version_persistence.PACKAGE_VERSION_DB = os.path.join(
+            self.root, 'package_versions.json')
+        with open(version_persistence.PACKAGE_VERSION_DB, 'w') as db:
+            json.dump({}, db)
+
+    def tearDown(self):
+        for name, value in self.original_constants.items():
+            setattr(code_persistence, name, value)
+        version_persistence.PACKAGE_VERSION_DB = self.original_db
+        shutil.rmtree(self.root, onerror=handle_remove_readonly)
+
+    def make_repo(self, package_name):
+        """Create a bare repo of a package with a build module.
+
+        Returns (str): Path of the bare repo.
+
+        """
+        bare = os.path.join(self.root, 'repos', package_name + '.git')
+        work = os.path.join(self.root, 'work', package_name)
+        git('init', '--bare', bare)
+        git('clone', bare, work)
+        with open(os.path.join(work, 'build.py'), 'w') as build_file:
+            build_file.write(BUILD_MODULE)
+        git('-C', work, 'add', 'build.py')
+        git('-C', work, 'commit', '-m', 'Add build module')
+        git('-C', work, 'push', 'origin', 'HEAD')
+        return bare
+
+    def push_tag(self, package_name, tag):
+        """Tag the latest commit of a package and push the tag."""
+        work = os.path.join(self.root, 'work', package_name)
+        git('-C', work, 'tag', tag)
+        git('-C', work, 'push', 'origin', tag)
+
+    def get_deploy_dir(self, package_name, version_number):
+        """Get folder an external package version is deployed into."""
+        return os.path.join(code_persistence.EXTERNAL_DEPLOY_DIR,
+                            package_name, version_number)
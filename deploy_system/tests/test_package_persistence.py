@@ -0,0 +1,78 @@
+# coding=utf-8
+"""Tests of package entities released after deploy sessions end."""
+
+# Import built-in modules
+import gc
+import sys
+import types
+import unittest
+import weakref
+
+# Import local context application services
+from deploy_system.package_context.application.package_deploy_service import \
+    PackageDeployService
+
+# Import local context domain objects
+from deploy_system.package_context.domain.entity import Package
+
+# Import local context implementations
+from deploy_system.package_context.infrastructure.package_persistence import \
+    PackagePersistence
+
+# Import local modules
+from deploy_system.tests.fixtures import DeployAreaTestCase
+
+
+class PackagePersistenceTest(DeployAreaTestCase):
+
+    def setUp(self):
+        super(PackagePersistenceTest, self).setUp()
+        self.original_max_finished = PackagePersistence.max_finished
+        PackagePersistence.max_finished = 2
+
+    def tearDown(self):
+        PackagePersistence.max_finished = self.original_max_finished
+        super(PackagePersistenceTest, self).tearDown()
+
+    def test_evicted_build_modules_are_released(self):
+        package_names = ['tool{}'.format(index) for index in range(5)]
+        sentinels = []
+        for package_name in package_names:
+            url = self.make_repo(package_name)
+            PackageDeployService().deploy(package_name, 'external',
+                                          version_number='1.0.0', url=url)
+            build_module = PackagePersistence.get(package_name).build_module
+            sentinels.append(weakref.ref(build_module.sentinel))
+            del build_module
+        gc.collect()
+
+        # Every deployment imported its own build module.
+        self.assertNotIn('build', sys.modules)
+        self.assertEqual(len(set(id(ref()) for ref in sentinels[-2:])), 2)
+        for package_name, ref in zip(package_names, sentinels):
+            kept = package_name in package_names[-2:]
+            self.assertEqual(ref() is not None, kept, package_name)
+            self.assertEqual(PackagePersistence.get(package_name) is not None,
+                             kept, package_name)
+
+    def test_packages_outside_sessions_are_evicted(self):
+        packages = []
+        for index in range(3):
+            package = Package('loose{}'.format(index))
+            package.build_module = types.ModuleType('loose_build')
+            sys.modules['loose_build{}'.format(index)] = package.build_module
+            PackagePersistence.update(package)
+            packages.append(package)
+
+        self.assertIsNone(PackagePersistence.get('loose0'))
+        self.assertIsNone(packages[0].build_module)
+        self.assertNotIn('loose_build0', sys.modules)
+        for index in (1, 2):
+            self.assertIs(PackagePersistence.get('loose{}'.format(index)),
+                          packages[index])
+            self.assertIn('loose_build{}'.format(index), sys.modules)
+            del sys.modules['loose_build{}'.format(index)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# coding=utf-8
+"""Tests of removing old deployed versions."""
+
+# Import built-in modules
+import errno
+import json
+import os
+import sys
+import unittest
+
+# Import framework utilities
+from deploy_system.utils.path import handle_remove_readonly
+
+# Import local context application services
+from deploy_system.package_context.application.package_retention_service \
+    import PackageRetentionService
+
+# Import local context implementations, importing them registers them.
+from deploy_system.package_context.infrastructure import code_persistence
+from deploy_system.package_context.infrastructure import version_persistence
+from deploy_system.package_context.infrastructure.deployment_persistence \
+    import DeploymentPersistence
+
+# Import local modules
+from deploy_system.tests.fixtures import DeployAreaTestCase
+
+
+class PackageRetentionServiceTest(DeployAreaTestCase):
+
+    def setUp(self):
+        super(PackageRetentionServiceTest, self).setUp()
+        self.original_deploy_dirs = DeploymentPersistence.deploy_dirs
+        DeploymentPersistence.deploy_dirs = [
+            code_persistence.INTERNAL_DEPLOY_DIR,
+            code_persistence.EXTERNAL_DEPLOY_DIR]
+
+    def tearDown(self):
+        DeploymentPersistence.deploy_dirs = self.original_deploy_dirs
+        super(PackageRetentionServiceTest, self).tearDown()
+
+    def deploy(self, package_name, version, size=1):
+        """Create a deployed version folder with a file of given size."""
+        version_dir = os.path.join(code_persistence.INTERNAL_DEPLOY_DIR,
+                                   package_name, version)
+        os.makedirs(version_dir)
+        with open(os.path.join(version_dir, 'data'), 'wb') as data:
+            data.write(b'0' * size)
+
+    def pin(self, package_name, version):
+        """Record a version of a package in the version database."""
+        with open(version_persistence.PACKAGE_VERSION_DB, 'w') as db:
+            json.dump({package_name: {'version': version}}, db)
+
+    def test_report_keeps_latest_resolved_and_pinned_versions(self):
+        for version in ('0.1.0', '1.2.0', '1.9.0', '1.10.0'):
+            self.deploy('tool', version, size=1024)
+        self.deploy('lib', '1.0.0')
+        self.pin('tool', '0.1.0')
+
+        report = PackageRetentionService().report(keep=1)
+
+        # 1.10.0 is the latest, launch_app resolves 1.9.0 and 0.1.0 is
+        # pinned, only 1.2.0 expired. The only version of lib is kept.
+        self.assertEqual(list(report), ['tool'])
+        self.assertEqual(list(report['tool']['versions']), ['1.2.0'])
+        self.assertEqual(report['tool']['bytes'], 1024)
+
+    def test_collect_removes_expired_versions(self):
+        for version in ('1.0.0', '1.1.0', '1.2.0'):
+            self.deploy('tool', version)
+
+        reaper = PackageRetentionService().collect(keep=1, interval=0)
+        reaper.join()
+
+        package_dir = os.path.join(code_persistence.INTERNAL_DEPLOY_DIR,
+                                   'tool')
+        self.assertEqual(os.listdir(package_dir), ['1.2.0'])
+        self.assertEqual(len(reaper.removed), 2)
+        self.assertEqual(reaper.errors, [])
+
+
+class HandleRemoveReadonlyTest(unittest.TestCase):
+
+    def test_other_errors_are_raised(self):
+        try:
+            os.remove('/nonexistent/file')
+        except OSError:
+            exc_info = sys.exc_info()
+        with self.assertRaises(OSError) as context:
+            handle_remove_readonly(os.remove, '/nonexistent/file', exc_info)
+        self.assertEqual(context.exception.errno, errno.ENOENT)
+
+
+if __name__ == '__main__':
+    unittest.main()
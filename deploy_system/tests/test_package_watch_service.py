@@ -0,0 +1,85 @@
+# coding=utf-8
+"""Tests of the package watch service against local bare repos."""
+
+# Import built-in modules
+import os
+import threading
+import time
+import unittest
+
+# Import local context application services
+from deploy_system.package_context.application.package_watch_service import \
+    DeployQueue, PackageWatchService
+
+# Import local modules
+from deploy_system.tests.fixtures import DeployAreaTestCase
+
+
+class PackageWatchServiceTest(DeployAreaTestCase):
+
+    def test_pushed_tag_gets_deployed(self):
+        url = self.make_repo('tool')
+        self.push_tag('tool', 'v1.0.0')
+        service = PackageWatchService({'tool': 'external'},
+                                      poll_interval=0.1,
+                                      batch_window=0.1,
+                                      workers=1,
+                                      repo_urls={'tool': url})
+        # Tags exist on first poll are taken as deployed.
+        self.assertEqual(service.poll(), [])
+
+        self.push_tag('tool', 'v1.1.0')
+        events = service.poll()
+        self.assertEqual([event[:3] for event in events],
+                         [('tool', 'external', 'v1.1.0')])
+        service.enqueue(events)
+        self.assertEqual(service.get_metrics()['queue_depth'], 1)
+
+        service.start()
+        deadline = time.time() + 60
+        while service.get_metrics()['deployed'] + \
+                service.get_metrics()['failed'] < 1 and \
+                time.time() < deadline:
+            time.sleep(0.1)
+        service.stop()
+
+        metrics = service.get_metrics()
+        self.assertEqual((metrics['deployed'], metrics['failed']), (1, 0))
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.get_deploy_dir('tool', '1.1.0'), 'build.py')))
+        self.assertFalse(os.path.isdir(self.get_deploy_dir('tool', '1.0.0')))
+
+
+class DeployQueueTest(unittest.TestCase):
+
+    def test_close_hands_out_queued_deployments(self):
+        queue = DeployQueue()
+        queue.put('tool', 'external', 'v1.0.0', 0)
+        queue.put('tool', 'external', 'v1.1.0', 0)
+        self.assertEqual(queue.get()[2], 'v1.0.0')
+        queue.close()
+
+        # Another worker waits until the running deployment finished.
+        jobs = []
+        worker = threading.Thread(target=lambda: jobs.append(queue.get()))
+        worker.start()
+        worker.join(0.2)
+        self.assertTrue(worker.is_alive())
+        queue.task_done('tool')
+        worker.join(5)
+        self.assertEqual(jobs[0][2], 'v1.1.0')
+        queue.task_done('tool')
+        self.assertIsNone(queue.get())
+
+    def test_seen_tags_are_capped(self):
+        queue = DeployQueue(max_seen=2)
+        for tag in ('v1', 'v2', 'v3'):
+            self.assertTrue(queue.put('tool', 'external', tag, 0))
+        self.assertFalse(queue.put('tool', 'external', 'v3', 0))
+        self.assertEqual(len(queue._seen), 2)
+        # The oldest tag been forgotten.
+        self.assertTrue(queue.put('tool', 'external', 'v1', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,7 +22,7 @@ def handle_remove_readonly(func, path, exc):
         os.chmod(path, stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)  # 0777
         func(path)
     else:
-        raise
+        raise excvalue
 
 
 def hotfix(source_folder, dest_folder):
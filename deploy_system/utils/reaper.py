@@ -0,0 +1,78 @@
+# coding=utf-8
+"""Background reaper to remove folders without blocking the caller."""
+
+# Import built-in modules
+import os
+import shutil
+import threading
+import time
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+# Import framework utilities
+from deploy_system.utils.path import handle_remove_readonly
+
+
+class Reaper(threading.Thread):
+    """Worker thread removes queued folders one by one.
+
+    Removing many deployed versions in a row hammers the file server all
+    artists launch their applications from, so the reaper waits `interval`
+    seconds between two folders and never removes more than
+    `bytes_per_second` on average.
+
+    """
+
+    def __init__(self, interval=1.0, bytes_per_second=0):
+        """Initialize the reaper.
+
+        Args:
+            interval (float): Seconds to wait after removing each folder.
+            bytes_per_second (int): Average removing speed limit, 0 means no
+                limit.
+
+        """
+        super(Reaper, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.bytes_per_second = bytes_per_second
+        self.removed = []
+        self.errors = []
+        self._queue = Queue()
+
+    def remove(self, path, size=0):
+        """Queue a folder to be removed.
+
+        Args:
+            path (str): Absolute path of the folder.
+            size (int): Size in bytes of the folder, used by throttling.
+
+        """
+        self._queue.put((path, size))
+
+    def stop(self):
+        """Stop the reaper after all queued folders been removed."""
+        self._queue.put(None)
+
+    def run(self):
+        """Remove queued folders until stop() been called."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, size = item
+            start = time.time()
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, onerror=handle_remove_readonly)
+                self.removed.append(path)
+            except (IOError, OSError) as exc:
+                self.errors.append((path, exc))
+            wait = self.interval
+            if self.bytes_per_second:
+                wait = max(wait, float(size) / self.bytes_per_second -
+                           (time.time() - start))
+            time.sleep(wait)
@@ -0,0 +1,442 @@
+"""Module includes archive writers to package sources into one file.
+
+Sources are streamed into the archive while being copied, so the package
+doesn't need to be read again to be zipped or tarred for delivery. Members
+are written in the order they are copied: a script is added among the
+sources once all of its nodes been collected, the copy log and the checksum
+manifest are the last members.
+"""
+
+# Import built-in modules
+import os
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+
+# Import local modules
+from copier import CHUNK_SIZE, check_running
+
+# Archive formats.
+TAR = 'tar'
+ZIP = 'zip'
+ARCHIVE_FORMATS = (TAR, ZIP)
+
+# Copy modes of files written into an archive.
+STORED = 'stored'
+DEFLATED = 'deflated'
+
+# Extensions of media already compressed, compressing them again only costs
+# time.
+COMPRESSED_EXTENSIONS = frozenset([
+    '.7z', '.avi', '.braw', '.bz2', '.exr', '.gif', '.gz', '.heic', '.jpeg',
+    '.jpg', '.m4v', '.mkv', '.mov', '.mp4', '.mxf', '.png', '.r3d', '.webm',
+    '.webp', '.xz', '.zip'
+])
+
+# Compressed members up to this size are kept in memory before being
+# written, larger ones are spilled into a temporary file.
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# Zip record signatures and the version needed to read zip64 records.
+ZIP_LOCAL_HEADER = 0x04034b50
+ZIP_DATA_DESCRIPTOR = 0x08074b50
+ZIP_CENTRAL_HEADER = 0x02014b50
+ZIP64_END_RECORD = 0x06064b50
+ZIP64_END_LOCATOR = 0x07064b50
+ZIP_END_RECORD = 0x06054b50
+ZIP64_VERSION = 45
+# Sizes follow the data, names are utf-8.
+ZIP_FLAGS = 0x08 | 0x800
+
+
+def is_compressible(path):
+    """Check if a file is worth being compressed by its extension.
+
+    Args:
+        path (str): Path of the file.
+    Returns:
+        bool: False for media formats which are compressed already.
+    """
+    return os.path.splitext(path)[1].lower() not in COMPRESSED_EXTENSIONS
+
+
+def get_dos_time(mtime):
+    """Get MS-DOS time and date stored in zip headers.
+
+    Args:
+        mtime (float): Modification time in seconds since the epoch.
+    Returns:
+        tuple: (dos time, dos date)
+    """
+    local_time = time.localtime(mtime)
+    if local_time.tm_year < 1980:
+        return 0, 1 << 5 | 1
+    return (local_time.tm_hour << 11 | local_time.tm_min << 5 |
+            local_time.tm_sec // 2,
+            (local_time.tm_year - 1980) << 9 | local_time.tm_mon << 5 |
+            local_time.tm_mday)
+
+
+class ProgressReader(object):
+    """Read-only file object reports number of bytes of every read, and
+    hashes the read data."""
+
+    def __init__(self, file_obj, on_progress=None, hasher=None,
+                 is_running=None):
+        """Initialize reader.
+
+        Args:
+            file_obj (file): File object to read from.
+            on_progress (callable): Called with number of bytes of every read.
+            hasher (object): Hash object updated with the read data.
+            is_running (callable): Returns False when the copy should stop,
+                checked before every read.
+        """
+        self.file_obj = file_obj
+        self.on_progress = on_progress
+        self.hasher = hasher
+        self.is_running = is_running
+
+    def read(self, size=-1):
+        """Read from the file object and report the read bytes.
+
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        check_running(self.is_running, self.file_obj.name)
+        data = self.file_obj.read(size)
+        if data and self.on_progress:
+            self.on_progress(len(data))
+        if data and self.hasher:
+            self.hasher.update(data)
+        return data
+
+
+class VolumeWriter(object):
+    """Write-only file object splits written data into fixed-size volumes.
+
+    Volumes are named <path>.000, <path>.001 and so on, concatenating them
+    in order gives back the whole archive.
+    """
+
+    def __init__(self, path, volume_size=0):
+        """Initialize writer, no volume is created before the first write.
+
+        Args:
+            path (str): Path of the archive.
+            volume_size (int): Size in bytes of one volume, 0 to write one
+                file at path.
+        """
+        self.path = path
+        self.volume_size = volume_size
+        self.volumes = []
+        self._file = None
+        self._written = 0
+
+    def next_volume(self):
+        """Close current volume and open the next one."""
+        if self._file:
+            self._file.close()
+        path = self.path
+        if self.volume_size:
+            path = '{}.{:03d}'.format(self.path, len(self.volumes))
+        self.volumes.append(path)
+        self._file = open(path, 'wb')
+        self._written = 0
+
+    def write(self, data):
+        """Write data, continue in next volume when current one is full."""
+        while data:
+            if self._file is None or \
+                    self.volume_size and self._written >= self.volume_size:
+                self.next_volume()
+            count = len(data)
+            if self.volume_size:
+                count = min(count, self.volume_size - self._written)
+            self._file.write(data[:count])
+            self._written += count
+            data = data[count:]
+
+    def close(self):
+        """Close current volume."""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class ArchiveWriter(object):
+    """Base class of archive writers shared by all copy worker threads.
+
+    Files are added by their destination paths in the folder tree of the
+    package, so the archive extracts to the same tree. Members are written
+    one at a time, workers wait for each other while writing.
+    """
+
+    extension = ''
+
+    def __init__(self, dest_root):
+        """Initialize archive writer.
+
+        Args:
+            dest_root (str): Destination root folder path, the archive is
+                named after it and written into it.
+        """
+        self.root = dest_root
+        self.path = '{}/{}.{}'.format(
+            dest_root, os.path.basename(os.path.normpath(dest_root)),
+            self.extension)
+        self._lock = threading.Lock()
+
+    def get_arcname(self, dest):
+        """Get member name of a destination path.
+
+        Args:
+            dest (str): Destination path in the folder tree of the package.
+        Returns:
+            str: Path relative to destination root with forward slashes.
+        """
+        return os.path.relpath(dest, self.root).replace(os.sep, '/')
+
+    def add_file(self, source, dest, on_progress=None, hasher=None,
+                 is_running=None):
+        """Add a file into the archive.
+
+        Args:
+            source (str): Absolute path of the source file.
+            dest (str): Destination path in the folder tree of the package.
+            on_progress (callable): Called with number of bytes of every read
+                chunk of the source file.
+            hasher (object): Hash object updated with the file content.
+            is_running (callable): Returns False when the copy should stop,
+                checked before every chunk read from the source file.
+        Returns:
+            str: Copy mode used, STORED or DEFLATED.
+        Raises:
+            CopyCancelled: If the copy been stopped, the member is left
+                incomplete.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Finish the archive."""
+        raise NotImplementedError
+
+
+class TarArchiveWriter(ArchiveWriter):
+    """Writer streams files into an uncompressed tar, split into volumes."""
+
+    extension = TAR
+
+    def __init__(self, dest_root, volume_size=0):
+        """Initialize tar writer.
+
+        Args:
+            dest_root (str): Destination root folder path.
+            volume_size (int): Size in bytes of one volume, 0 to not split.
+        """
+        super(TarArchiveWriter, self).__init__(dest_root)
+        self.volume_writer = VolumeWriter(self.path, volume_size)
+        self.tar = tarfile.open(mode='w|',
+                                fileobj=self.volume_writer,
+                                format=tarfile.PAX_FORMAT,
+                                dereference=True)
+
+    def add_file(self, source, dest, on_progress=None, hasher=None,
+                 is_running=None):
+        """Add a file into the tar, see ArchiveWriter.add_file().
+
+        A cancelled member is left truncated in the tar stream, so the tar
+        of a stopped copy is incomplete.
+        """
+        with self._lock:
+            tar_info = self.tar.gettarinfo(source, self.get_arcname(dest))
+            with open(source, 'rb') as source_file:
+                self.tar.addfile(tar_info, ProgressReader(source_file,
+                                                          on_progress,
+                                                          hasher,
+                                                          is_running))
+        return STORED
+
+    def close(self):
+        """Write end of the tar and close the last volume."""
+        with self._lock:
+            self.tar.close()
+            self.volume_writer.close()
+
+
+class ZipArchiveWriter(ArchiveWriter):
+    """Writer streams files into a zip64 archive.
+
+    Compressible files are deflated by the calling worker thread before
+    taking the lock, so files are compressed in parallel and only written
+    one at a time. Media already compressed are stored as they are.
+    """
+
+    extension = ZIP
+
+    def __init__(self, dest_root, level=6):
+        """Initialize zip writer.
+
+        Args:
+            dest_root (str): Destination root folder path.
+            level (int): Compression level of zlib.
+        """
+        super(ZipArchiveWriter, self).__init__(dest_root)
+        self.level = level
+        self._file = open(self.path, 'wb')
+        self._entries = []
+
+    def deflate(self, source, dest_file, on_progress=None, hasher=None,
+                is_running=None):
+        """Compress a file into raw deflate data.
+
+        Args:
+            source (str): Absolute path of the source file.
+            dest_file (file): File object to write compressed data into.
+            on_progress (callable): Called with number of bytes of every read
+                chunk of the source file.
+            hasher (object): Hash object updated with the file content.
+            is_running (callable): Returns False when the copy should stop,
+                checked before every chunk.
+        Returns:
+            int: CRC-32 of the uncompressed data.
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        crc = 0
+        with open(source, 'rb') as source_file:
+            while True:
+                check_running(is_running, source)
+                chunk = source_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                dest_file.write(compressor.compress(chunk))
+                if on_progress:
+                    on_progress(len(chunk))
+                if hasher:
+                    hasher.update(chunk)
+        dest_file.write(compressor.flush())
+        return crc & 0xffffffff
+
+    def add_file(self, source, dest, on_progress=None, hasher=None,
+                 is_running=None):
+        """Add a file into the zip, see ArchiveWriter.add_file().
+
+        A cancelled member is not listed in the central directory, so the
+        zip still opens with the members added before it.
+        """
+        arcname = self.get_arcname(dest)
+        stat = os.stat(source)
+        if stat.st_size and is_compressible(source):
+            with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as compressed:
+                crc = self.deflate(source, compressed, on_progress, hasher,
+                                   is_running)
+                if compressed.tell() < stat.st_size:
+                    compressed.seek(0)
+                    with self._lock:
+                        self.write_member(arcname, stat, DEFLATED,
+                                          compressed, crc)
+                    return DEFLATED
+            # Not smaller after compressing, progress is reported and the
+            # content is hashed already.
+            on_progress = None
+            hasher = None
+        with open(source, 'rb') as source_file:
+            with self._lock:
+                self.write_member(arcname, stat, STORED,
+                                  ProgressReader(source_file, on_progress,
+                                                 hasher, is_running))
+        return STORED
+
+    def write_member(self, arcname, stat, mode, data_file, crc=None):
+        """Write local header, data and data descriptor of a member.
+
+        Args:
+            arcname (str): Member name.
+            stat (os.stat_result): Stat result of the source file.
+            mode (str): STORED or DEFLATED.
+            data_file (file): File object to read member data from.
+            crc (int): CRC-32 of the uncompressed data, None to calculate it
+                from data of a stored member.
+        """
+        if not isinstance(arcname, bytes):
+            arcname = arcname.encode('utf-8')
+        method = 8 if mode == DEFLATED else 0
+        dos_time, dos_date = get_dos_time(stat.st_mtime)
+        offset = self._file.tell()
+        # Sizes are unknown to the local header, they are written into the
+        # data descriptor and the zip64 extra field of the central header.
+        self._file.write(struct.pack(
+            '<LHHHHHLLLHH', ZIP_LOCAL_HEADER, ZIP64_VERSION, ZIP_FLAGS,
+            method, dos_time, dos_date, 0, 0xffffffff, 0xffffffff,
+            len(arcname), 20))
+        self._file.write(arcname)
+        self._file.write(struct.pack('<HHQQ', 1, 16, 0, 0))
+        compress_size = 0
+        running_crc = 0
+        while True:
+            chunk = data_file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self._file.write(chunk)
+            compress_size += len(chunk)
+            if crc is None:
+                running_crc = zlib.crc32(chunk, running_crc)
+        if crc is None:
+            crc = running_crc & 0xffffffff
+        self._file.write(struct.pack('<LLQQ', ZIP_DATA_DESCRIPTOR, crc,
+                                     compress_size, stat.st_size))
+        self._entries.append((arcname, method, dos_time, dos_date, crc,
+                              compress_size, stat.st_size, offset,
+                              stat.st_mode))
+
+    def close(self):
+        """Write central directory and end records of the zip."""
+        with self._lock:
+            if self._file is None:
+                return
+            directory_offset = self._file.tell()
+            for (arcname, method, dos_time, dos_date, crc, compress_size,
+                 size, offset, file_mode) in self._entries:
+                self._file.write(struct.pack(
+                    '<LHHHHHHLLLHHHHHLL', ZIP_CENTRAL_HEADER,
+                    3 << 8 | ZIP64_VERSION, ZIP64_VERSION, ZIP_FLAGS, method,
+                    dos_time, dos_date, crc, 0xffffffff, 0xffffffff,
+                    len(arcname), 28, 0, 0, 0, (file_mode & 0xffff) << 16,
+                    0xffffffff))
+                self._file.write(arcname)
+                self._file.write(struct.pack('<HHQQQ', 1, 24, size,
+                                             compress_size, offset))
+            end_offset = self._file.tell()
+            count = len(self._entries)
+            self._file.write(struct.pack(
+                '<LQHHLLQQQQ', ZIP64_END_RECORD, 44, 3 << 8 | ZIP64_VERSION,
+                ZIP64_VERSION, 0, 0, count, count,
+                end_offset - directory_offset, directory_offset))
+            self._file.write(struct.pack('<LLQL', ZIP64_END_LOCATOR, 0,
+                                         end_offset, 1))
+            self._file.write(struct.pack(
+                '<LHHHHLLH', ZIP_END_RECORD, 0, 0, min(count, 0xffff),
+                min(count, 0xffff), 0xffffffff, 0xffffffff, 0))
+            self._file.close()
+            self._file = None
+
+
+def open_archive(dest_root, archive_format, volume_size=0):
+    """Create an archive writer in destination root folder.
+
+    Args:
+        dest_root (str): Destination root folder path.
+        archive_format (str): TAR or ZIP.
+        volume_size (int): Size in bytes of one tar volume, 0 to not split.
+    Returns:
+        ArchiveWriter: The archive writer.
+    """
+    if archive_format == TAR:
+        return TarArchiveWriter(dest_root, volume_size)
+    return ZipArchiveWriter(dest_root)
@@ -0,0 +1,354 @@
+"""Command line tool to package many .nk scripts without a Nuke session.
+
+All scripts are packaged into one destination root folder, they share one
+sources folder, so a file read by several scripts is copied once. The same
+package can be written into mirror destination roots as well, every source
+is read once for all of them.
+
+Packages of several runs delivered into one root can share a pool of
+sources in it, every file is stored once and linked into the sources folder
+of each package.
+
+Example:
+    python batch.py shot010.nk shot020.nk /path/to/scripts -d /path/to/dest
+    python batch.py /path/to/scripts -d /path/to/dest -m /path/to/outbox
+    python batch.py shot010.nk -d /delivery/shot010 --pool /delivery
+"""
+
+# Import built-in modules
+import argparse
+from multiprocessing import Pool, cpu_count
+import os
+import sys
+import threading
+
+# Import local modules
+from archive import ARCHIVE_FORMATS, open_archive
+from checksum import DEFAULT_HASH_NAME, HASH_NAMES
+from collector import SourceCollector
+from copier import LINK_MODES, RANGE_MIN_SIZE
+from frames import get_root_range
+from journal import CopyJournal
+from listing_cache import ListingCache
+from nk_parser import NkScript
+from scanner import SequenceScanner
+from scheduler import CopyScheduler
+from source_index import SourceIndex
+from source_pool import CONTENT, KEY_MODES, SourcePool
+from utils import READ_CLASSES, rewrite_script
+
+
+def find_scripts(paths):
+    """Find .nk files from given files and folders.
+
+    Args:
+        paths (list): Paths of .nk files or folders holding .nk files.
+    Returns:
+        list: Paths of .nk files.
+    """
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            scripts.extend(os.path.join(path, name) for name in
+                           sorted(os.listdir(path)) if name.endswith('.nk'))
+        elif os.path.isfile(path):
+            scripts.append(path)
+    return scripts
+
+
+def parse_script(args):
+    """Parse a .nk file, runs in a worker process.
+
+    Args:
+        args (tuple): (path of the .nk file, prefix of node full names)
+    Returns:
+        NkScript: Parsed script.
+    """
+    return NkScript.read(*args)
+
+
+def get_script_names(scripts):
+    """Get unique destination file names of scripts.
+
+    Args:
+        scripts (list): Paths of .nk files.
+    Returns:
+        list: File names, with a number appended to repeated names.
+    """
+    names = []
+    used = set()
+    for script in scripts:
+        stem, ext = os.path.splitext(os.path.basename(script))
+        name = stem
+        index = 0
+        while name.lower() in used:
+            index += 1
+            name = '{}_{}'.format(stem, index)
+        used.add(name.lower())
+        names.append(name + ext)
+    return names
+
+
+def package_scripts(scripts, dest_root, processes=None, workers=4,
+                    link_mode=None, archive_format=None, volume_size=0,
+                    hash_name=None, incremental=False,
+                    handles=None, range_parts=1, listing_cache=None,
+                    mirror_roots=(), source_pool=None):
+    """Package .nk scripts into one destination root folder.
+
+    Scripts are parsed in a process pool, then collected into one source
+    index and copied by one scheduler.
+
+    Args:
+        scripts (list): Paths of .nk files.
+        dest_root (str): Destination root folder path.
+        processes (int): Number of processes to parse scripts.
+        workers (int): Number of threads to copy files.
+        link_mode (str): copier.HARDLINK or copier.REFLINK to link sources on
+            the same volume as destination, None to always copy.
+        archive_format (str): archive.TAR or archive.ZIP to stream scripts
+            and sources into one archive, None to copy into a folder tree.
+        volume_size (int): Size in bytes of one tar volume, 0 to not split.
+        hash_name (str): Name of the hash algorithm of the checksum
+            manifest, None to not write a manifest. Hashed files are
+            copied through Python buffers, not by the kernel or as
+            parallel byte ranges.
+        incremental (bool): Whether to keep unchanged sources of the previous
+            package in destination root folder in place and remove the ones
+            no longer used, ignored with an archive output.
+        handles (int): Number of frames kept before and after the frame
+            range of each script, None to copy all frames of sequences.
+        range_parts (int): Number of byte ranges a large file is copied as
+            in parallel, 1 to copy every file as one stream. Ignored with
+            a hash_name, hashed files are copied as one stream.
+        listing_cache (ListingCache): Persistent cache of source directory
+            listings, None to list every directory.
+        mirror_roots (list): Other destination root folder paths to write
+            the same package into, ignored with an archive output.
+        source_pool (SourcePool): Pool to store sources into and link them
+            from, ignored with an archive output or mirrors.
+    Returns:
+        tuple: (SourceIndex of sources of all scripts, CopyScheduler of the
+            copied files).
+    """
+    if archive_format:
+        mirror_roots = ()
+    if archive_format or mirror_roots:
+        source_pool = None
+    for root in [dest_root] + list(mirror_roots):
+        if not os.path.isdir(root):
+            os.makedirs(root)
+    names = get_script_names(scripts)
+    pool = Pool(processes or cpu_count())
+    try:
+        parsed_scripts = pool.map(parse_script, zip(
+            scripts, [os.path.splitext(name)[0] for name in names]))
+    finally:
+        pool.close()
+        pool.join()
+
+    archive = None
+    if archive_format:
+        archive = open_archive(dest_root, archive_format, volume_size)
+    journal = CopyJournal(dest_root)
+    source_index = SourceIndex(
+        journal.get_previous_dests() if incremental else None)
+    mirrors = [CopyJournal(root) for root in mirror_roots]
+    for each_journal in [journal] + mirrors:
+        each_journal.open()
+    scheduler = CopyScheduler(workers, journal, link_mode=link_mode,
+                              archive=archive, hash_name=hash_name,
+                              range_parts=range_parts, mirrors=mirrors,
+                              pool=source_pool)
+    run_flag = [True]
+    threads = [threading.Thread(target=scheduler.run_worker,
+                                args=(lambda: run_flag[0], lambda task: None))
+               for _ in range(scheduler.workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    scanner = SequenceScanner(listing_cache)
+    error_nodes = []
+    script_paths = []
+    try:
+        # Sources are copied while the rest of nodes are collected.
+        try:
+            for name, script in zip(names, parsed_scripts):
+                root_range = None
+                roots = script.get_nodes(['Root'])
+                if handles is not None and roots:
+                    root_range = get_root_range(roots[0])
+                collector = SourceCollector(dest_root,
+                                            script.get_nodes(READ_CLASSES),
+                                            source_index,
+                                            scanner,
+                                            root_range,
+                                            handles or 0)
+                for index in range(len(collector.nodes)):
+                    collector.grab_source(index)
+                    scheduler.add_files(source_index.pop_new_files(),
+                                        dest_root, lambda: run_flag[0])
+                error_nodes.extend('{}:{}'.format(script.prefix, node_name)
+                                   for node_name in collector.error_nodes)
+                script_path = '{}/{}'.format(dest_root, name)
+                rewrite_script(script, source_index.node_paths, script_path)
+                script_paths.append(script_path)
+                for mirror in mirrors:
+                    rewrite_script(script, source_index.node_paths,
+                                   '{}/{}'.format(mirror.dest_root, name))
+                if archive:
+                    archive.add_file(script_path, script_path)
+        finally:
+            scheduler.close()
+            scanner.save_cache()
+            for each_journal in [journal] + mirrors:
+                each_journal.log_collection(error_nodes,
+                                            source_index.sequence_results,
+                                            source_index.single_results)
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+        if incremental and not archive:
+            journal.prune(scheduler.dests)
+            for mirror, dests in zip(mirrors, scheduler.mirror_dests):
+                if mirror not in scheduler.stalled_mirrors:
+                    mirror.prune(dests)
+    except KeyboardInterrupt:
+        run_flag[0] = False
+        for thread in threads:
+            thread.join()
+    manifest_path = None
+    for each_journal in [journal] + mirrors:
+        try:
+            each_journal.close()
+        except IOError as exc:
+            # The log is rendered from the events written before.
+            sys.stderr.write('The copy log may be incomplete: {}\n'.format(
+                exc))
+        each_journal.save_log()
+        if hash_name:
+            path = each_journal.save_manifest(hash_name, [
+                '{}/{}'.format(each_journal.dest_root,
+                               os.path.basename(script_path))
+                for script_path in script_paths])
+            if each_journal is journal:
+                manifest_path = path
+    if archive:
+        for path in (manifest_path, '{}/copy_log.log'.format(dest_root)):
+            if path and os.path.isfile(path):
+                archive.add_file(path, path)
+        archive.close()
+        # The manifest lists members of the archive, it's only valid in the
+        # extracted folder tree.
+        if manifest_path:
+            os.remove(manifest_path)
+    return source_index, scheduler
+
+
+def main(argv=None):
+    """Entry of the command line tool."""
+    parser = argparse.ArgumentParser(
+        description='Package Nuke scripts without a Nuke session.')
+    parser.add_argument('scripts', nargs='+',
+                        help='.nk files or folders holding .nk files.')
+    parser.add_argument('-d', '--dest', required=True,
+                        help='Destination root folder.')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='Number of processes to parse scripts.')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Number of threads to copy files.')
+    parser.add_argument('-l', '--link-mode', choices=LINK_MODES,
+                        help='Link sources on the same volume as destination '
+                             'instead of copying them.')
+    parser.add_argument('-a', '--archive', choices=ARCHIVE_FORMATS,
+                        help='Stream scripts and sources into one archive '
+                             'in destination root folder.')
+    parser.add_argument('-s', '--volume-size', type=int, default=0,
+                        metavar='MB',
+                        help='Split the tar archive into volumes of this '
+                             'size in MB.')
+    parser.add_argument('-c', '--checksum', choices=HASH_NAMES + ('none',),
+                        default='none',
+                        help='Hash algorithm of the checksum manifest, none '
+                             'to not write a manifest. Files are then hashed '
+                             'while copied through Python buffers, which '
+                             'is slower than the kernel copy. {} is '
+                             'suggested.'.format(DEFAULT_HASH_NAME))
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Keep unchanged sources of the previous package '
+                             'in place and remove unused ones.')
+    parser.add_argument('-t', '--trim', type=int, nargs='?', const=0,
+                        metavar='HANDLES',
+                        help='Only copy frames shown within the frame range '
+                             'of each script, plus HANDLES frames before '
+                             'and after it.')
+    parser.add_argument('-r', '--range-parts', type=int, default=1,
+                        help='Copy files larger than {} MB as this many '
+                             'byte ranges in parallel, not supported with '
+                             'checksums.'.format(
+                                 RANGE_MIN_SIZE // 1024 // 1024))
+    parser.add_argument('--no-listing-cache', action='store_true',
+                        help='List every source directory instead of using '
+                             'listings cached by previous runs.')
+    parser.add_argument('-m', '--mirror', action='append', default=[],
+                        metavar='DEST',
+                        help='Another destination root folder to write the '
+                             'same package into, sources are read once for '
+                             'all destinations. Can be repeated.')
+    parser.add_argument('--pool', metavar='ROOT',
+                        help='Store sources once in a pool in this delivery '
+                             'root folder and link them into the sources '
+                             'folder.')
+    parser.add_argument('--pool-key', choices=KEY_MODES, default=CONTENT,
+                        help='Name pooled files by content hash, or by real '
+                             'path, size and mtime to not read sources '
+                             'already pooled.')
+    args = parser.parse_args(argv)
+
+    scripts = find_scripts(args.scripts)
+    if not scripts:
+        parser.error('No .nk file found.')
+    if args.mirror and args.archive:
+        parser.error('Mirrors are not supported with an archive output.')
+    if args.range_parts > 1 and args.checksum != 'none':
+        parser.error('Range parts are not supported with checksums, hashed '
+                     'files are copied as one stream.')
+    if args.pool and (args.archive or args.mirror):
+        parser.error('The source pool is not supported with an archive '
+                     'output or mirrors.')
+    listing_cache = None
+    if not args.no_listing_cache:
+        listing_cache = ListingCache().load()
+    source_pool = None
+    if args.pool:
+        source_pool = SourcePool(args.pool, args.pool_key)
+    source_index, scheduler = package_scripts(
+        scripts, args.dest, args.processes, args.workers, args.link_mode,
+        args.archive, args.volume_size * 1024 * 1024,
+        None if args.checksum == 'none' else args.checksum,
+        args.incremental, args.trim, args.range_parts, listing_cache,
+        args.mirror, source_pool)
+    sys.stdout.write('Packaged {} script(s), {} file(s) into {}, {} failed.'
+                     '\n'.format(len(scripts),
+                                 sum(1 for _ in source_index.iter_files()),
+                                 ', '.join([args.dest] + args.mirror),
+                                 len(scheduler.failed)))
+    for dest, error in scheduler.failed:
+        sys.stdout.write('Failed to copy {}: {}\n'.format(dest, error))
+    for mirror in scheduler.stalled_mirrors:
+        sys.stdout.write('Gave up mirror {} after it stalled, it is '
+                         'incomplete.\n'.format(mirror.dest_root))
+    if listing_cache:
+        sys.stdout.write(listing_cache.get_report() + '\n')
+    if source_pool:
+        sys.stdout.write(source_pool.get_report() + '\n')
+    if args.trim is not None:
+        trimmed_count, trimmed_bytes = source_index.trimmed
+        sys.stdout.write('Trimmed {} frame(s), {:.1f} MB saved.\n'.format(
+            trimmed_count, trimmed_bytes / 1024.0 / 1024.0))
+    return 1 if scheduler.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Benchmark of this tool without Nuke, on a generated scene.
+
+The nuke module is replaced by fake_nuke, a scene of Read nodes with shared
+sources and missing frames is generated into a temporary folder, then
+collecting, modifying node paths and copying are timed one by one, and
+all of them together with copying streamed from collecting.
+
+Example:
+    python benchmark.py -n 200 -m 100 -w 8
+"""
+
+# Import built-in modules
+import argparse
+from collections import OrderedDict
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Import local modules
+import fake_nuke
+
+
+class ThreadSampler(threading.Thread):
+    """Thread samples number of running threads to find the peak."""
+
+    def __init__(self, interval=0.005):
+        """Initialize sampler.
+
+        Args:
+            interval (float): Seconds between two samples.
+        """
+        super(ThreadSampler, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Sample until stopped."""
+        while not self._stop_event.is_set():
+            # The sampler itself isn't counted.
+            self.peak = max(self.peak, threading.active_count() - 1)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        """Stop sampling and wait for the sampler."""
+        self._stop_event.set()
+        self.join()
+
+
+def generate_scene(root, nodes=100, frames=50, frame_size=64 * 1024,
+                   shared=0.2, missing=0.1, singles=0.1, seed=0):
+    """Generate source files and a .nk file reading them.
+
+    Args:
+        root (str): Folder to generate the scene into.
+        nodes (int): Number of Read nodes.
+        frames (int): Number of frames of every sequence.
+        frame_size (int): Size in bytes of every source file.
+        shared (float): Ratio of nodes reading the source of another node.
+        missing (float): Ratio of sequences with a missing frame.
+        singles (float): Ratio of nodes reading a single movie file.
+        seed (int): Seed of the random generator.
+    Returns:
+        str: Path of the .nk file.
+    """
+    generator = random.Random(seed)
+    data = os.urandom(frame_size)
+    sources = []
+    # Movies are written straight into it, sequences into sub folders.
+    os.makedirs('{}/src'.format(root))
+    fake_nuke.scriptClear()
+    for index in range(nodes):
+        if sources and generator.random() < shared:
+            source, first, last = generator.choice(sources)
+        elif generator.random() < singles:
+            source = '{}/src/clip_{:04d}.mov'.format(root, index)
+            first = last = 1
+            with open(source, 'wb') as source_file:
+                source_file.write(data)
+            sources.append((source, first, last))
+        else:
+            folder = '{}/src/shot_{:04d}'.format(root, index)
+            os.makedirs(folder)
+            source = '{}/plate_{:04d}.%04d.exr'.format(folder, index)
+            first = 1001
+            last = first + frames - 1
+            lost_frame = None
+            if generator.random() < missing:
+                lost_frame = generator.randint(first, last)
+            for frame in range(first, last + 1):
+                if frame != lost_frame:
+                    with open(source % frame, 'wb') as source_file:
+                        source_file.write(data)
+            sources.append((source, first, last))
+        fake_nuke.createNode('Read', OrderedDict([
+            ('file', source),
+            ('first', str(first)),
+            ('last', str(last)),
+            ('name', 'Read{}'.format(index + 1))]))
+    script_path = '{}/scene.nk'.format(root)
+    fake_nuke.scriptSaveAs(script_path)
+    return script_path
+
+
+def get_stats(seconds, files, total_bytes, peak_threads):
+    """Get stats of one timed step.
+
+    Args:
+        seconds (float): Duration of the step.
+        files (int): Number of files handled.
+        total_bytes (int): Number of bytes handled.
+        peak_threads (int): Peak number of running threads.
+    Returns:
+        OrderedDict: Stats of the step.
+    """
+    seconds = max(seconds, 1e-9)
+    return OrderedDict([('seconds', round(seconds, 4)),
+                        ('files', files),
+                        ('files_per_second', round(files / seconds, 1)),
+                        ('mb_per_second',
+                         round(total_bytes / seconds / 1024 / 1024, 1)),
+                        ('peak_threads', peak_threads)])
+
+
+def run_benchmark(script_path, dest_root, workers=4):
+    """Time collecting, modifying node paths and copying of a scene.
+
+    Copy workers are plain threads running the same loop as the
+    CopyWorkerThread of the GUI, so Qt isn't needed. The last step packages
+    the scene again into another folder, copying while collecting as the
+    GUI does.
+
+    Args:
+        script_path (str): Path of the .nk file of the scene.
+        dest_root (str): Destination root folder path.
+        workers (int): Number of copy threads.
+    Returns:
+        OrderedDict: Step name to stats.
+    """
+    sys.modules['nuke'] = fake_nuke
+    # Imported after the fake nuke module been installed.
+    from journal import CopyJournal
+    from model import NukePackageWrapper
+    from scheduler import CopyScheduler
+
+    fake_nuke.scriptOpen(script_path)
+    results = OrderedDict()
+
+    sampler = ThreadSampler()
+    sampler.start()
+    start = time.time()
+    package_wrapper = NukePackageWrapper(dest_root)
+    for index in range(len(package_wrapper.nodes)):
+        package_wrapper.grab_source(index)
+    sampler.stop()
+    results['collect'] = get_stats(time.time() - start,
+                                   package_wrapper.copy_files_count,
+                                   package_wrapper.copy_bytes_total,
+                                   sampler.peak)
+
+    start = time.time()
+    package_wrapper.modify_nodes_path()
+    results['modify'] = get_stats(time.time() - start, 1,
+                                  os.path.getsize(package_wrapper.dest_nk), 1)
+
+    sampler = ThreadSampler()
+    sampler.start()
+    start = time.time()
+    journal = CopyJournal(dest_root)
+    journal.open()
+    scheduler = CopyScheduler(workers, journal)
+    scheduler.add_sources(package_wrapper.source_index, dest_root)
+    threads = [threading.Thread(target=scheduler.run_worker,
+                                args=(lambda: True, lambda task: None))
+               for _ in range(scheduler.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+    sampler.stop()
+    results['copy'] = get_stats(time.time() - start,
+                                package_wrapper.copy_files_count,
+                                package_wrapper.copy_bytes_total,
+                                sampler.peak)
+
+    fake_nuke.scriptOpen(script_path)
+    stream_root = dest_root + '_stream'
+    os.makedirs(stream_root)
+    sampler = ThreadSampler()
+    sampler.start()
+    start = time.time()
+    journal = CopyJournal(stream_root)
+    journal.open()
+    scheduler = CopyScheduler(workers, journal)
+    threads = [threading.Thread(target=scheduler.run_worker,
+                                args=(lambda: True, lambda task: None))
+               for _ in range(scheduler.workers)]
+    for thread in threads:
+        thread.start()
+    package_wrapper = NukePackageWrapper(stream_root)
+    for index in range(len(package_wrapper.nodes)):
+        package_wrapper.grab_source(index)
+        scheduler.add_files(package_wrapper.source_index.pop_new_files(),
+                            stream_root)
+    scheduler.close()
+    package_wrapper.modify_nodes_path()
+    for thread in threads:
+        thread.join()
+    journal.close()
+    sampler.stop()
+    results['stream'] = get_stats(time.time() - start,
+                                  package_wrapper.copy_files_count,
+                                  package_wrapper.copy_bytes_total,
+                                  sampler.peak)
+    return results
+
+
+def format_results(results):
+    """Format stats of all steps into a table.
+
+    Args:
+        results (OrderedDict): Step name to stats.
+    Returns:
+        str: The table.
+    """
+    lines = ['{:<8} {:>10} {:>8} {:>10} {:>10} {:>8}'.format(
+        'step', 'seconds', 'files', 'files/s', 'MB/s', 'threads')]
+    for step, stats in results.items():
+        lines.append('{:<8} {:>10} {:>8} {:>10} {:>10} {:>8}'.format(
+            step, *stats.values()))
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    """Entry of the benchmark command line tool."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark packaging a generated scene without Nuke.')
+    parser.add_argument('-n', '--nodes', type=int, default=100,
+                        help='Number of Read nodes.')
+    parser.add_argument('-m', '--frames', type=int, default=50,
+                        help='Number of frames of every sequence.')
+    parser.add_argument('-s', '--frame-size', type=int, default=64,
+                        help='Size in KB of every source file.')
+    parser.add_argument('--shared', type=float, default=0.2,
+                        help='Ratio of nodes reading a shared source.')
+    parser.add_argument('--missing', type=float, default=0.1,
+                        help='Ratio of sequences with a missing frame.')
+    parser.add_argument('--singles', type=float, default=0.1,
+                        help='Ratio of nodes reading a single movie file.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random scene generator.')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Number of copy threads.')
+    parser.add_argument('--json', action='store_true',
+                        help='Print stats as JSON.')
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep the generated scene and package.')
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='nuke_package_benchmark_')
+    try:
+        script_path = generate_scene(root, args.nodes, args.frames,
+                                     args.frame_size * 1024, args.shared,
+                                     args.missing, args.singles, args.seed)
+        dest_root = '{}/package'.format(root)
+        os.makedirs(dest_root)
+        results = run_benchmark(script_path, dest_root, args.workers)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, True)
+    if args.json:
+        sys.stdout.write(json.dumps(results, indent=4) + '\n')
+    else:
+        sys.stdout.write(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Module includes checksum functions and the manifest verify tool.
+
+Files are hashed from the same buffers they are copied with, the manifest
+is written into destination root folder in the format of md5sum, b2sum and
+xxhsum, so it can also be checked by those tools. With an archive output
+the manifest is only written into the archive, it's checked in the folder
+the archive is extracted to.
+
+Example:
+    python checksum.py /path/to/dest -w 8
+"""
+
+# Import built-in modules
+import argparse
+import hashlib
+from multiprocessing.pool import ThreadPool
+import os
+import sys
+
+# Import third-party modules
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Import local modules
+from copier import CHUNK_SIZE
+
+# Hash algorithms available in this environment, from the fastest one.
+HASH_NAMES = tuple(name for name, available in (
+    ('xxh64', xxhash is not None),
+    ('blake2b', hasattr(hashlib, 'blake2b')),
+    ('md5', True)) if available)
+DEFAULT_HASH_NAME = HASH_NAMES[0]
+
+# Name prefix of manifest files, followed by the hash algorithm name.
+MANIFEST_PREFIX = 'checksums.'
+
+# Results of verifying one file.
+OK = 'OK'
+FAILED = 'FAILED'
+MISSING = 'MISSING'
+
+
+def new_hasher(hash_name=DEFAULT_HASH_NAME):
+    """Create a hash object with update() and hexdigest().
+
+    Args:
+        hash_name (str): One of HASH_NAMES.
+    Returns:
+        object: The hash object.
+    """
+    if hash_name == 'xxh64':
+        return xxhash.xxh64()
+    return hashlib.new(hash_name)
+
+
+def hash_file(path, hash_name=DEFAULT_HASH_NAME, chunk_size=CHUNK_SIZE):
+    """Hash a file by reading it in chunks.
+
+    Args:
+        path (str): Path of the file.
+        hash_name (str): One of HASH_NAMES.
+        chunk_size (int): Size in bytes of one chunk.
+    Returns:
+        str: Hex digest of the file.
+    """
+    hasher = new_hasher(hash_name)
+    with open(path, 'rb') as hash_file_obj:
+        while True:
+            chunk = hash_file_obj.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_manifest_path(dest_root, hash_name):
+    """Get path of the manifest file of a hash algorithm."""
+    return '{}/{}{}'.format(dest_root, MANIFEST_PREFIX, hash_name)
+
+
+def find_manifest(dest_root):
+    """Find the manifest file in destination root folder.
+
+    Args:
+        dest_root (str): Destination root folder path.
+    Returns:
+        tuple: (manifest path, hash algorithm name), or (None, None) if no
+            manifest of an available algorithm is found.
+    """
+    for hash_name in HASH_NAMES:
+        path = get_manifest_path(dest_root, hash_name)
+        if os.path.isfile(path):
+            return path, hash_name
+    return None, None
+
+
+def write_manifest(path, checksums):
+    """Write a manifest file.
+
+    Args:
+        path (str): Path of the manifest file.
+        checksums (dict): Path relative to destination root to hex digest.
+    """
+    with open(path, 'w') as manifest_file:
+        for relative_path in sorted(checksums):
+            manifest_file.write('{}  {}\n'.format(checksums[relative_path],
+                                                  relative_path))
+
+
+def read_manifest(path):
+    """Read a manifest file.
+
+    Args:
+        path (str): Path of the manifest file.
+    Returns:
+        list: (path relative to destination root, hex digest) tuples.
+    """
+    checksums = []
+    with open(path, 'r') as manifest_file:
+        for line in manifest_file:
+            line = line.rstrip('\r\n')
+            if line:
+                digest, relative_path = line.split('  ', 1)
+                checksums.append((relative_path, digest))
+    return checksums
+
+
+def verify_file(args):
+    """Check a file against its digest, runs in a worker thread.
+
+    Args:
+        args (tuple): (file path, expected hex digest, hash algorithm name)
+    Returns:
+        tuple: (file path, OK, FAILED or MISSING)
+    """
+    path, digest, hash_name = args
+    if not os.path.isfile(path):
+        return path, MISSING
+    if hash_file(path, hash_name) != digest:
+        return path, FAILED
+    return path, OK
+
+
+def verify(dest_root, workers=4):
+    """Check all files listed by the manifest of a destination root folder.
+
+    Files are hashed by a pool of threads, hash functions release the GIL
+    while hashing large chunks, so reads and hashing run in parallel.
+
+    Args:
+        dest_root (str): Destination root folder path.
+        workers (int): Number of threads to hash files.
+    Returns:
+        list: (file path, FAILED or MISSING) of bad files.
+    Raises:
+        IOError: If no manifest is found.
+    """
+    manifest_path, hash_name = find_manifest(dest_root)
+    if manifest_path is None:
+        raise IOError('No checksum manifest found in {}.'.format(dest_root))
+    pool = ThreadPool(max(1, workers))
+    try:
+        results = pool.map(verify_file, [
+            ('{}/{}'.format(dest_root, relative_path), digest, hash_name)
+            for relative_path, digest in read_manifest(manifest_path)])
+    finally:
+        pool.close()
+        pool.join()
+    return [(path, result) for path, result in results if result != OK]
+
+
+def main(argv=None):
+    """Entry of the verify command line tool."""
+    parser = argparse.ArgumentParser(
+        description='Verify a package against its checksum manifest.')
+    parser.add_argument('dest', help='Destination root folder, or the '
+                                     'folder an archive is extracted to.')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Number of threads to hash files.')
+    args = parser.parse_args(argv)
+
+    try:
+        bad_files = verify(args.dest, args.workers)
+    except IOError as exc:
+        parser.error(str(exc))
+    for path, result in bad_files:
+        sys.stdout.write('{}: {}\n'.format(path, result))
+    sys.stdout.write('{} bad file(s).\n'.format(len(bad_files)))
+    return 1 if bad_files else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
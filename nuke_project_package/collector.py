@@ -0,0 +1,132 @@
+"""Module includes the source collector shared by GUI and batch mode."""
+
+# Import built-in modules
+import os
+
+# Import local modules
+from frames import get_used_range
+from scanner import SequencePattern, SequenceScanner
+from source_index import SourceIndex
+from utils import get_file_knob_name
+
+
+class SourceCollector(object):
+    """Class to collect sources of nodes with file knob.
+
+    Works on anything with the nuke.Node interface used here, so the same
+    collection runs on live Nuke nodes and on nodes parsed from .nk text.
+    """
+
+    def __init__(self, dest_root, nodes=None, source_index=None,
+                 scanner=None, root_range=None, handles=0):
+        """Initialize collector.
+
+        Args:
+            dest_root (str): Path of destination root folder.
+            nodes (list): Nodes with file knob to be collected.
+            source_index (SourceIndex): Index to add sources into, share one
+                index between collectors to copy each file once.
+            scanner (SequenceScanner): Scanner to find sequence frames, share
+                one scanner between collectors to list each folder once.
+            root_range (tuple): (first frame, last frame) of the script to
+                only collect frames shown within it, None to collect all
+                frames of every sequence.
+            handles (int): Number of frames kept before and after the root
+                range.
+        """
+        self.error_nodes = []
+        self.source_index = source_index or SourceIndex()
+        self.copy_files_count = 0
+        self.copy_bytes_total = 0
+        self.scanner = scanner or SequenceScanner()
+        self.dest_root = dest_root
+        self.root_range = root_range
+        self.handles = handles
+        self.nodes = [node for node in nodes or [] if
+                      self.check_node_error(node)]
+
+    def check_node_error(self, node):
+        """Check if given node has error.
+
+        Args:
+            node (nuke.Node or NkNode): A specific node.
+        Returns:
+            bool: True if there's no error on the given node, False if not.
+        """
+        if node.hasError():
+            self.error_nodes.append(node.name())
+            return False
+        return True
+
+    @property
+    def single_results(self):
+        """list: (node names, source path, destination name) of single
+        files, one item per physical file."""
+        return self.source_index.single_results
+
+    @property
+    def sequence_results(self):
+        """dict: Destination folder name to sequence info tuple
+        (node names, SequencePattern, FrameSet of present frames, first frame,
+        last frame, FrameSet of missing frames)."""
+        return self.source_index.sequence_results
+
+    def get_node_source(self, node):
+        """Get source information of a given node.
+
+        Args:
+            node (nuke.Node or NkNode): A specific node that has file knob.
+        """
+        source = node[get_file_knob_name(node)].value()
+        if os.path.isfile(source):
+            stat = os.stat(source)
+            if self.source_index.add_single(node.fullName(), source, stat):
+                self.copy_files_count += 1
+                self.copy_bytes_total += stat.st_size
+            return
+        pattern = SequencePattern.parse(source)
+        if pattern:
+            self.get_sequence_source(node, source, pattern)
+
+    def get_sequence_source(self, node, source, pattern):
+        """Get and store source information of an image sequence.
+
+        Frames are found from one listing of the sequence directory instead of
+        checking every frame on disk. Frames already collected from another
+        node reading the same sequence are not counted again. With a root
+        range, frames the node never shows within it are left out.
+
+        Args:
+            node (nuke.Node or NkNode): A node holds an image sequence in
+                its file knob.
+            source (str): Source path pattern of the node's file knob.
+            pattern (SequencePattern): Sequence pattern of the source path.
+        """
+        first = int(node['first'].value())
+        last = int(node['last'].value())
+        scan_result = self.scanner.scan(pattern, first, last)
+        trimmed_sizes = None
+        if self.root_range:
+            used_result = scan_result.get_range(
+                *get_used_range(node, self.root_range, self.handles))
+            trimmed_sizes = dict(
+                (frame, size) for frame, size in scan_result.sizes.items()
+                if frame not in used_result.sizes)
+            scan_result = used_result
+        if not scan_result.sizes:
+            self.error_nodes.append(node.name())
+            return
+        new_frames = self.source_index.add_sequence(node.fullName(),
+                                                    scan_result,
+                                                    trimmed_sizes)
+        self.copy_files_count += len(new_frames)
+        self.copy_bytes_total += sum(scan_result.sizes[frame]
+                                     for frame in new_frames)
+
+    def grab_source(self, index):
+        """Grab sources information from specific node.
+
+        Args:
+            index (int): Index of the nodes list.
+        """
+        self.get_node_source(self.nodes[index])
@@ -5,8 +5,17 @@ import os
 from functools import partial
 
 # Import local modules
-from threads import CollectThread, SingleCopyThread, SequenceCopyThread, \
-    FinishThread
+from archive import open_archive
+from checksum import DEFAULT_HASH_NAME
+from journal import CopyJournal
+from model import has_unsaved_changes
+from progress import ProgressAggregator
+from scheduler import CopyScheduler
+from threads import CollectThread, CopyWorkerThread, JobTracker
+
+# Number of failed files listed in the finishing message, the copy log lists
+# the copied ones.
+MAX_FAILED_SHOWN = 5
 
 
 class NukePackageController(object):
@@ -24,17 +33,19 @@ class NukePackageController(object):
             view (QtWidgets.QWidget): View instance of this tool.
         """
         self.view = view
-        self.finish_log = []
-        self.copy_count = 0
-        self.total_copy_amount = 0
+        self.progress = None
         self.package_wrapper = None
+        self.scheduler = None
+        self.prune_previous = False
+        self.job_tracker = None
         self.connect_slots()
 
     def connect_slots(self):
         """Connect GUI signals to slots."""
         self.view.folder_button.clicked.connect(self.select_destination)
         self.view.run_button.clicked.connect(self.run_packaging)
-        self.view.close_timer.timeout.connect(self.check_thread_pool)
+        self.view.close_requested.connect(self.cancel_packaging)
+        self.view.progress_timer.timeout.connect(self.show_copy_status)
 
     def select_destination(self):
         """Fill destination folder path in the UI.
@@ -50,30 +61,46 @@ class NukePackageController(object):
         if os.path.isdir(dest_folder):
             self.view.folder_line.setText(dest_folder)
 
-    def check_thread_pool(self):
-        """Check if there's any worker thread remains in thread pool.
+    def cancel_packaging(self):
+        """Cancel running packaging process when the view been closed.
 
-        This function will be triggered by the close_timer, if there's no worker
-        thread remains, it will set the close_flag to True, otherwise it will
-        restart the close_timer.
+        Worker threads have been asked to stop by the view, the view will be
+        closed by finish_jobs() once all of them stopped.
         """
-        if len(self.view.thread_pool) <= 1:
-            self.view.close_flag = True
-            self.view.close_timer.stop()
-            self.save_copying_log()
-            self.view.refresh_ui()
-            self.view.close()
-        else:
-            self.view.close_timer.start(1000)
+        if self.job_tracker:
+            self.job_tracker.cancel()
 
     def run_packaging(self):
-        """Start packaging process by creating and running collect thread."""
+        """Start packaging process by creating and running copy worker
+        threads and the collect thread feeding them.
+
+        A script with unsaved changes is refused where they can't be
+        packaged, the artist has to save it first.
+        """
+        if has_unsaved_changes():
+            self.view.show_message('Please save the script first, unsaved '
+                                   'changes can\'t be packaged in this Nuke '
+                                   'version.')
+            return
         if self.check_dest_root():
+            self.view.close_flag = False
+            self.package_wrapper = None
+            self.prune_previous = False
             self.view.show_message('Collecting source files...')
-            collect_thread = CollectThread(self.view.folder_line.text())
+            self.job_tracker = JobTracker()
+            self.job_tracker.finished.connect(self.finish_jobs)
+            dest_root = self.view.folder_line.text()
+            self.copy_process(dest_root)
+            collect_thread = CollectThread(
+                dest_root,
+                self.scheduler,
+                self.view.incremental_check.isChecked(),
+                self.view.handles_spin.value()
+                if self.view.trim_check.isChecked() else None)
             collect_thread.finish.connect(
                 partial(self.collect_finish, collect_thread))
             self.view.thread_pool.append(collect_thread)
+            self.job_tracker.add()
             collect_thread.start()
 
     def check_dest_root(self):
@@ -94,22 +121,33 @@ class NukePackageController(object):
         return True
 
     def collect_finish(self, thread):
-        """Get sources collection result and prepare the copying process.
+        """Get sources collection result while files are being copied.
 
-        Save nuke script to destination folder and modify file knobs to
-        use relative paths, remove collection thread from thread pool, start
-        copying process.
+        Write collected nodes into the copy journal, save nuke script to
+        destination folder and modify file knobs to use relative paths,
+        remove collection thread from thread pool. The script isn't saved
+        if collecting been stopped.
 
         Args:
             thread (QtCore.QThread): Collector thread instance.
         """
         index = thread.index
         self.package_wrapper = thread.package_wrapper
-        self.total_copy_amount = self.package_wrapper.copy_files_count
-        self.thread_finish(thread)
+        self.scheduler.journal.log_collection(
+            self.package_wrapper.error_nodes,
+            self.package_wrapper.sequence_results,
+            self.package_wrapper.single_results)
         if index == len(self.package_wrapper.nodes):
+            # Unsaved changes of the script are saved from the main thread.
             self.package_wrapper.modify_nodes_path()
-            self.copy_process()
+            if self.scheduler.archive:
+                self.scheduler.archive.add_file(self.package_wrapper.dest_nk,
+                                                self.package_wrapper.dest_nk)
+            # Sources of the previous package are only removed once copying
+            # is done, workers may still be creating folders meanwhile.
+            self.prune_previous = thread.incremental and \
+                not self.scheduler.archive
+        self.thread_finish(thread)
 
     def thread_finish(self, thread):
         """Remove worker thread from thread pool when it finish running.
@@ -118,61 +156,143 @@ class NukePackageController(object):
             thread (QtCore.QThread): Worker thread instance.
         """
         if thread in self.view.thread_pool:
-            self.finish_log.extend(thread.log)
             self.view.thread_pool.remove(thread)
+            self.job_tracker.done()
 
-    def copy_process(self):
-        """Create, store and run worker threads."""
-        self.view.show_message('Starting packaging, please wait.')
-
-        single_copy_thread = SingleCopyThread(
-            self.package_wrapper.single_results,
-            self.package_wrapper.dest_root)
-        single_copy_thread.finish.connect(
-            partial(self.thread_finish, single_copy_thread))
-        single_copy_thread.copy_one_file.connect(self.show_copy_status)
-        self.view.thread_pool.append(single_copy_thread)
-
-        for basename in self.package_wrapper.sequence_results:
-            sequence_copy_thread = SequenceCopyThread(
-                basename,
-                self.package_wrapper.sequence_results[basename],
-                self.package_wrapper.dest_root)
-            sequence_copy_thread.finish.connect(
-                partial(self.thread_finish, sequence_copy_thread))
-            sequence_copy_thread.copy_one_file.connect(self.show_copy_status)
-            self.view.thread_pool.append(sequence_copy_thread)
-
-        finish_thread = FinishThread(self.view)
-        finish_thread.finish.connect(self.finish_copy)
-        self.view.thread_pool.append(finish_thread)
-
-        for thread in self.view.thread_pool:
-            thread.start()
-
-    def show_copy_status(self, source):
-        """Show the file been copying and update percentage of the process bar.
+    def copy_process(self, dest_root):
+        """Create, store and run worker threads.
 
-        Args:
-            source (str): Absolute path of the source file been copying.
+        All sources are split into per-file tasks of one scheduler, a fixed
+        number of worker threads share the tasks no matter how many nodes
+        the script has. Workers wait for tasks added by the collect thread.
+        Files recorded in the copy journal of a previous run into the same
+        destination are skipped. With an archive output the script and
+        sources are streamed into one archive instead, the script is added
+        among the sources once collecting is done.
 
+        Args:
+            dest_root (str): Destination root folder path.
+        """
+        journal = CopyJournal(dest_root)
+        journal.open()
+        # Total bytes grow while sources are collected.
+        self.progress = ProgressAggregator(0)
+        archive = None
+        archive_format = self.view.output_combo.itemData(
+            self.view.output_combo.currentIndex())
+        if archive_format:
+            archive = open_archive(
+                dest_root, archive_format,
+                self.view.volume_spin.value() * 1024 * 1024)
+        self.scheduler = CopyScheduler(
+            self.view.workers_spin.value(),
+            journal,
+            self.progress,
+            self.view.mode_combo.itemData(self.view.mode_combo.currentIndex()),
+            archive,
+            DEFAULT_HASH_NAME if self.view.checksum_check.isChecked()
+            else None)
+        for _ in range(self.scheduler.workers):
+            copy_thread = CopyWorkerThread(self.scheduler)
+            copy_thread.finish.connect(
+                partial(self.thread_finish, copy_thread))
+            self.view.thread_pool.append(copy_thread)
+            self.job_tracker.add()
+            copy_thread.start()
+        self.view.progress_timer.start()
+
+    def show_copy_status(self):
+        """Show the file been copying, throughput, ETA and byte percentage.
+
+        Triggered by the progress_timer at a fixed rate instead of once per
+        copied file.
         """
-        self.view.show_message('Copy {}...'.format(os.path.basename(source)))
-        self.copy_count += 1
-        process = int(
-            (float(self.copy_count) / float(self.total_copy_amount)) * 100)
-        self.view.progress_bar.setValue(process)
+        if self.progress:
+            percent, message = self.progress.get_message()
+            self.view.show_message(message)
+            self.view.progress_bar.setValue(percent)
 
-    def finish_copy(self):
-        """Save the copying log and show finishing message."""
-        self.save_copying_log()
-        self.view.show_message('Finish packaging all sources.')
+    def finish_jobs(self, cancelled):
+        """Save the copying log once all worker threads are done.
+
+        Remove sources of the previous package no longer used by a finished
+        incremental run. Show finishing message with number of files by
+        copy mode, bytes saved by trimming frames and the listing cache hit
+        rate, or close the view if the packaging process been cancelled by
+        closing it.
+
+        Args:
+            cancelled (bool): Whether the packaging process been cancelled.
+        """
+        self.view.progress_timer.stop()
+        self.show_copy_status()
+        if self.prune_previous and not cancelled:
+            self.scheduler.journal.prune(self.scheduler.dests)
+        journal_error = self.save_copying_log()
+        if cancelled:
+            self.view.close_flag = True
+            self.view.refresh_ui()
+            self.view.close()
+        else:
+            message = 'Finish packaging all sources ({}).'.format(
+                ', '.join('{} {}'.format(mode_count, mode) for mode, mode_count
+                          in self.scheduler.journal.get_mode_counts().items()))
+            if self.package_wrapper and self.package_wrapper.root_range:
+                trimmed_count, trimmed_bytes = \
+                    self.package_wrapper.source_index.trimmed
+                message += ' Trimmed {} frame(s), {:.1f} MB saved.'.format(
+                    trimmed_count, trimmed_bytes / 1024.0 / 1024.0)
+            if self.package_wrapper and self.package_wrapper.scanner.cache:
+                message += ' ' + \
+                    self.package_wrapper.scanner.cache.get_report()
+            if journal_error:
+                message += ' The copy log may be incomplete: {}'.format(
+                    journal_error)
+            if self.scheduler.failed:
+                message += ' Failed to copy {} file(s):\n{}'.format(
+                    len(self.scheduler.failed),
+                    '\n'.join('{}: {}'.format(dest, error) for dest, error
+                              in self.scheduler.failed[:MAX_FAILED_SHOWN]))
+            self.view.show_message(message)
 
     def save_copying_log(self):
-        """Save copying log to destination root folder."""
-        if self.package_wrapper and self.finish_log:
-            with open(
-                    '{}/copy_log.log'.format(self.package_wrapper.dest_root),
-                    'w') as log_file:
-                self.finish_log[0] = self.finish_log[0].replace('\n\n', '')
-                log_file.writelines(self.finish_log)
+        """Save copying log to destination root folder.
+
+        The log is rendered from the copy journal, so it also lists files
+        copied by previous runs into the same destination. The checksum
+        manifest is saved along with it, both are added into the archive of
+        this run as its last members before closing it. The manifest lists
+        members of the archive, so it's only kept inside the archive.
+
+        A journal which failed to be written still has the log rendered
+        from the events written before the failure, and the archive is
+        still closed.
+
+        Returns:
+            str: Error of writing the journal, None if it's written.
+        """
+        if not self.package_wrapper:
+            return None
+        journal = self.scheduler.journal
+        journal_error = None
+        try:
+            journal.close()
+        except IOError as exc:
+            journal_error = str(exc)
+        journal.save_log()
+        manifest_path = None
+        if self.scheduler.hash_name:
+            # The script isn't saved if collecting been stopped.
+            manifest_path = journal.save_manifest(
+                self.scheduler.hash_name,
+                [path for path in [self.package_wrapper.dest_nk]
+                 if os.path.isfile(path)])
+        if self.scheduler.archive:
+            for path in (manifest_path, '{}/copy_log.log'.format(
+                    self.package_wrapper.dest_root)):
+                if path and os.path.isfile(path):
+                    self.scheduler.archive.add_file(path, path)
+            self.scheduler.archive.close()
+            if manifest_path:
+                os.remove(manifest_path)
+        return journal_error
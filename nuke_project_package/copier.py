@@ -0,0 +1,581 @@
+"""Module includes file copy functions of this tool."""
+
+# Import built-in modules
+import errno
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, reflink is not available.
+    fcntl = None
+
+try:
+    from queue import Empty, Full, Queue
+except ImportError:
+    from Queue import Empty, Full, Queue
+
+# Size of one chunk read from source file.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Copy modes, from the fastest to the slowest.
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+KERNEL = 'kernel'
+COPY = 'copy'
+
+# Copy modes can be asked for, KERNEL and COPY are used as fallbacks.
+LINK_MODES = (HARDLINK, REFLINK)
+
+# ioctl request of Linux to clone a file, _IOW(0x94, 9, int).
+FICLONE = 0x40049409
+
+# Suffix of the temporary file a destination is written to, it's renamed to
+# the destination once copied completely.
+TEMP_SUFFIX = '.part'
+
+# Minimum size in bytes of a file copied as parallel byte ranges.
+RANGE_MIN_SIZE = 256 * 1024 * 1024
+
+# Number of chunks queued for one destination of a file copied into several
+# destinations, reading waits while the queue of any destination is full.
+FANOUT_CHUNKS = 8
+
+# Seconds a destination may take no chunk before it's given up, so a stalled
+# destination doesn't stall the others.
+STALL_TIMEOUT = 30.0
+
+# Seconds between two checks of a stopped copy while waiting for writers.
+FANOUT_WAIT = 0.2
+
+
+class CopyCancelled(Exception):
+    """Raised when a copy been stopped before the file is complete."""
+
+
+def check_running(is_running, source):
+    """Raise CopyCancelled if the copy of a file been stopped.
+
+    Args:
+        is_running (callable): Returns False when the copy should stop, None
+            to never stop.
+        source (str): Path of the source file, for the error message.
+    """
+    if is_running is not None and not is_running():
+        raise CopyCancelled('Copy of {} been stopped.'.format(source))
+
+
+def get_temp_path(dest):
+    """Get path of the temporary file of a destination file.
+
+    Args:
+        dest (str): Absolute path of the destination file.
+    Returns:
+        str: Hidden file next to the destination.
+    """
+    folder, name = os.path.split(dest)
+    return os.path.join(folder, '.{}{}'.format(name, TEMP_SUFFIX))
+
+
+def is_same_device(source, dest_folder):
+    """Check if a source file and a destination folder are on one volume.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest_folder (str): Absolute path of an existing destination folder.
+    Returns:
+        bool: True if both paths are on the same device.
+    """
+    try:
+        return os.stat(source).st_dev == os.stat(dest_folder).st_dev
+    except OSError:
+        return False
+
+
+def remove_file(path):
+    """Remove a file if it exists."""
+    try:
+        os.remove(path)
+    except OSError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+
+
+def replace_file(temp_path, dest):
+    """Rename a completely written temporary file to its destination.
+
+    Args:
+        temp_path (str): Path of the temporary file.
+        dest (str): Path of the destination file, replaced if it exists.
+    """
+    if os.name == 'nt':
+        # Renaming doesn't replace an existing file on Windows.
+        remove_file(dest)
+    elif os.path.exists(dest) and os.path.samefile(temp_path, dest):
+        # Renaming a hardlink onto the same file does nothing.
+        remove_file(temp_path)
+        return
+    os.rename(temp_path, dest)
+
+
+def hardlink_file(source, dest):
+    """Link destination to the same inode as source.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+    Returns:
+        bool: True if linked, False if hardlinks are not supported.
+    """
+    if not hasattr(os, 'link'):
+        return False
+    try:
+        os.link(source, dest)
+    except OSError:
+        return False
+    return True
+
+
+def reflink_file(source, dest):
+    """Clone source into destination sharing data blocks (copy-on-write).
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+    Returns:
+        bool: True if cloned, False if the file system can't clone files.
+    """
+    if fcntl is None:
+        return False
+    with open(source, 'rb') as source_file, open(dest, 'wb') as dest_file:
+        try:
+            fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+        except (IOError, OSError):
+            cloned = False
+        else:
+            cloned = True
+    if cloned:
+        shutil.copystat(source, dest)
+    else:
+        remove_file(dest)
+    return cloned
+
+
+def sendfile_range(source_fd, dest_fd, count):
+    """Call os.sendfile() with arguments in order of os.copy_file_range()."""
+    return os.sendfile(dest_fd, source_fd, None, count)
+
+
+def kernel_copy_file(source, dest, on_progress=None, chunk_size=CHUNK_SIZE,
+                     is_running=None):
+    """Copy a file inside the kernel by copy_file_range or sendfile.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+        on_progress (callable): Called with number of bytes of every copied
+            chunk.
+        chunk_size (int): Size in bytes of one chunk.
+        is_running (callable): Returns False when the copy should stop.
+    Returns:
+        bool: True if copied, False if neither system call is available or
+            the first call failed, nothing is reported in that case.
+    Raises:
+        CopyCancelled: If the copy been stopped.
+    """
+    if hasattr(os, 'copy_file_range'):
+        kernel_copy = os.copy_file_range
+    elif hasattr(os, 'sendfile'):
+        kernel_copy = sendfile_range
+    else:
+        return False
+    with open(source, 'rb') as source_file, open(dest, 'wb') as dest_file:
+        source_fd = source_file.fileno()
+        dest_fd = dest_file.fileno()
+        copied = 0
+        while True:
+            check_running(is_running, source)
+            try:
+                count = kernel_copy(source_fd, dest_fd, chunk_size)
+            except OSError:
+                if copied:
+                    raise
+                # Not supported between these file systems, the
+                # userspace copy starts again from an empty file.
+                return False
+            if not count:
+                break
+            copied += count
+            if on_progress:
+                on_progress(count)
+    shutil.copystat(source, dest)
+    return True
+
+
+def copy_range(source, dest, start, end, on_progress=None,
+               chunk_size=CHUNK_SIZE, is_running=None):
+    """Copy a byte range of a file into the same range of another file.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of an existing destination file.
+        start (int): Offset of the first byte.
+        end (int): Offset after the last byte.
+        on_progress (callable): Called with number of bytes of every copied
+            chunk.
+        chunk_size (int): Size in bytes of one chunk.
+        is_running (callable): Returns False when the copy should stop.
+    Raises:
+        CopyCancelled: If the copy been stopped.
+    """
+    with open(source, 'rb') as source_file, open(dest, 'r+b') as dest_file:
+        source_file.seek(start)
+        dest_file.seek(start)
+        position = start
+        while position < end:
+            check_running(is_running, source)
+            chunk = source_file.read(min(chunk_size, end - position))
+            if not chunk:
+                break
+            dest_file.write(chunk)
+            position += len(chunk)
+            if on_progress:
+                on_progress(len(chunk))
+
+
+def range_copy_file(source, dest, on_progress=None, chunk_size=CHUNK_SIZE,
+                    is_running=None, parts=4):
+    """Copy a large file as byte ranges read in parallel.
+
+    One stream often can't fill the bandwidth of a network volume, reading
+    several ranges of the same file at once can.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+        on_progress (callable): Called with number of bytes of every copied
+            chunk, from several threads.
+        chunk_size (int): Size in bytes of one chunk.
+        is_running (callable): Returns False when the copy should stop.
+        parts (int): Number of ranges copied at once.
+    Raises:
+        CopyCancelled: If the copy been stopped.
+    """
+    size = os.path.getsize(source)
+    with open(dest, 'wb') as dest_file:
+        dest_file.truncate(size)
+    # Ranges are whole chunks, so reads stay aligned.
+    part_size = max(chunk_size,
+                    -(-size // max(1, parts) // chunk_size) * chunk_size)
+    errors = []
+
+    def is_part_running():
+        return not errors and (is_running is None or is_running())
+
+    def run_part(start):
+        try:
+            copy_range(source, dest, start, min(size, start + part_size),
+                       on_progress, chunk_size, is_part_running)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run_part, args=(start,))
+               for start in range(0, size, part_size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        # A real error goes first, other parts only stopped after it.
+        errors.sort(key=lambda exc: isinstance(exc, CopyCancelled))
+        raise errors[0]
+    shutil.copystat(source, dest)
+
+
+def copy_data(source, dest, on_progress=None, chunk_size=CHUNK_SIZE,
+              link_mode=None, hasher=None, is_running=None, range_parts=1):
+    """Write a file as a copy or a link of the source.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+        on_progress (callable): Called with number of bytes of every copied
+            chunk.
+        chunk_size (int): Size in bytes of one chunk.
+        link_mode (str): HARDLINK or REFLINK to try first, None to always
+            copy data.
+        hasher (object): Hash object updated with the file content.
+        is_running (callable): Returns False when the copy should stop.
+        range_parts (int): Number of byte ranges a large file is copied as
+            in parallel, 1 to copy every file as one stream.
+    Returns:
+        str: The copy mode used, one of HARDLINK, REFLINK, KERNEL and COPY.
+    Raises:
+        CopyCancelled: If the copy been stopped.
+    """
+    if link_mode in LINK_MODES and \
+            is_same_device(source, os.path.dirname(dest)):
+        linker = hardlink_file if link_mode == HARDLINK else reflink_file
+        if linker(source, dest):
+            if hasher:
+                # Nothing is copied, the source is only read for hashing.
+                with open(source, 'rb') as source_file:
+                    while True:
+                        check_running(is_running, source)
+                        chunk = source_file.read(chunk_size)
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+            if on_progress:
+                on_progress(os.path.getsize(source))
+            return link_mode
+    # Ranges are written out of order, they can't be hashed while copying.
+    if hasher is None and range_parts > 1 and \
+            os.path.getsize(source) >= RANGE_MIN_SIZE:
+        range_copy_file(source, dest, on_progress, chunk_size, is_running,
+                        range_parts)
+        return COPY
+    if hasher is None and kernel_copy_file(source, dest, on_progress,
+                                           chunk_size, is_running):
+        return KERNEL
+    with open(source, 'rb') as source_file, open(dest, 'wb') as dest_file:
+        while True:
+            check_running(is_running, source)
+            chunk = source_file.read(chunk_size)
+            if not chunk:
+                break
+            dest_file.write(chunk)
+            if hasher:
+                hasher.update(chunk)
+            if on_progress:
+                on_progress(len(chunk))
+    shutil.copystat(source, dest)
+    return COPY
+
+
+def copy_file(source, dest, on_progress=None, chunk_size=CHUNK_SIZE,
+              link_mode=None, hasher=None, is_running=None, range_parts=1):
+    """Copy a file in chunks and report every copied chunk.
+
+    A link mode is only tried when source and destination are on the same
+    volume, then the file is copied by the kernel if possible, and by
+    reading and writing chunks in the end. When hashing, the kernel copy and
+    the range copy are skipped and the chunks are hashed from the same
+    buffers they are written from, so the source is read once, at the cost
+    of the faster copy paths.
+
+    The file is written to a temporary name next to the destination and
+    renamed once complete, a stopped or failed copy removes it, so a
+    destination file is never left partially written. A destination left
+    by a previous run, which may be a hardlink of its source, is replaced
+    by the rename instead of being written into.
+
+    Args:
+        source (str): Absolute path of the source file.
+        dest (str): Absolute path of the destination file.
+        on_progress (callable): Called with number of bytes of every copied
+            chunk.
+        chunk_size (int): Size in bytes of one chunk.
+        link_mode (str): HARDLINK or REFLINK to try first, None to always
+            copy data.
+        hasher (object): Hash object updated with the file content.
+        is_running (callable): Returns False when the copy should stop, it's
+            checked before every chunk.
+        range_parts (int): Number of byte ranges a large file is copied as
+            in parallel, 1 to copy every file as one stream.
+    Returns:
+        str: The copy mode used, one of HARDLINK, REFLINK, KERNEL and COPY.
+    Raises:
+        CopyCancelled: If the copy been stopped.
+    """
+    temp_path = get_temp_path(dest)
+    remove_file(temp_path)
+    try:
+        mode = copy_data(source, temp_path, on_progress, chunk_size,
+                         link_mode, hasher, is_running, range_parts)
+        replace_file(temp_path, dest)
+    except BaseException:
+        remove_file(temp_path)
+        raise
+    return mode
+
+
+class DestinationStalled(IOError):
+    """Raised for a destination which took no chunk for too long."""
+
+
+class ChunkWriter(threading.Thread):
+    """Thread writes queued chunks of a source into one destination file."""
+
+    # Queued after the last chunk.
+    _end = object()
+
+    def __init__(self, path, max_chunks=FANOUT_CHUNKS):
+        """Initialize and start writer.
+
+        Args:
+            path (str): Path of the file to write.
+            max_chunks (int): Number of chunks queued at most.
+        """
+        super(ChunkWriter, self).__init__()
+        self.daemon = True
+        self.path = path
+        self.error = None
+        self.done = False
+        self.abandoned = False
+        # Time the writer last took a chunk.
+        self.last_active = time.time()
+        self._queue = Queue(max_chunks)
+        self.start()
+
+    def put(self, chunk, timeout):
+        """Queue a chunk, waiting while the queue is full.
+
+        Args:
+            chunk (bytes): Chunk to write, None after the last chunk.
+            timeout (float): Seconds to wait for a free slot.
+        Raises:
+            Full: If the writer took no chunk within timeout.
+        """
+        self._queue.put(self._end if chunk is None else chunk,
+                        timeout=timeout)
+
+    def abandon(self, error):
+        """Give up the file, queued and later chunks are dropped.
+
+        Args:
+            error (Exception): Reason the file been given up.
+        """
+        if self.error is None:
+            self.error = error
+        self.abandoned = True
+
+    def run(self):
+        """Write queued chunks until the last one or abandoned."""
+        try:
+            with open(self.path, 'wb') as dest_file:
+                while not self.abandoned:
+                    try:
+                        chunk = self._queue.get(timeout=FANOUT_WAIT)
+                    except Empty:
+                        continue
+                    self.last_active = time.time()
+                    if chunk is self._end:
+                        self.done = True
+                        break
+                    dest_file.write(chunk)
+        except (IOError, OSError) as exc:
+            self.abandon(exc)
+        if self.abandoned:
+            remove_file(self.path)
+            # Chunks aren't taken anymore, the reader may be waiting.
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except Empty:
+                    break
+
+
+def fanout_copy_file(source, dests, on_progress=None, chunk_size=CHUNK_SIZE,
+                     link_mode=None, hasher=None, is_running=None,
+                     max_chunks=FANOUT_CHUNKS, stall_timeout=STALL_TIMEOUT):
+    """Copy a file into several destinations reading it once.
+
+    Every chunk read is queued to one writer thread per destination, so
+    destinations are written concurrently. Queues are bounded: reading
+    waits for the slowest destination, a destination taking no chunk for
+    stall_timeout is given up and the others carry on. Destinations on the
+    same volume as the source are linked first if a link mode is given.
+    Files are written to temporary names and renamed once complete, as by
+    copy_file().
+
+    Args:
+        source (str): Absolute path of the source file.
+        dests (list): Absolute paths of the destination files.
+        on_progress (callable): Called with number of bytes of every chunk
+            read.
+        chunk_size (int): Size in bytes of one chunk.
+        link_mode (str): HARDLINK or REFLINK to try first, None to always
+            copy data.
+        hasher (object): Hash object updated with the file content.
+        is_running (callable): Returns False when the copy should stop.
+        max_chunks (int): Number of chunks queued for one destination.
+        stall_timeout (float): Seconds a destination may take no chunk.
+    Returns:
+        dict: Destination path to the copy mode used, or to the exception
+            the destination failed with.
+    Raises:
+        CopyCancelled: If the copy been stopped, no destination is written.
+    """
+    results = {}
+    temp_paths = {}
+    writers = {}
+    linked = []
+    try:
+        for dest in dests:
+            temp_path = get_temp_path(dest)
+            temp_paths[dest] = temp_path
+            remove_file(temp_path)
+            if link_mode in LINK_MODES and \
+                    is_same_device(source, os.path.dirname(dest)):
+                linker = hardlink_file if link_mode == HARDLINK \
+                    else reflink_file
+                if linker(source, temp_path):
+                    linked.append(dest)
+                    continue
+            writers[dest] = ChunkWriter(temp_path, max_chunks)
+        with open(source, 'rb') as source_file:
+            while True:
+                check_running(is_running, source)
+                chunk = source_file.read(chunk_size)
+                live = [(dest, writer) for dest, writer in writers.items()
+                        if not writer.abandoned]
+                for dest, writer in live:
+                    try:
+                        writer.put(chunk or None, stall_timeout)
+                    except Full:
+                        writer.abandon(DestinationStalled(
+                            'Destination {} stalled.'.format(dest)))
+                if not chunk:
+                    break
+                if hasher:
+                    hasher.update(chunk)
+                if on_progress:
+                    on_progress(len(chunk))
+        for dest, writer in writers.items():
+            while writer.is_alive():
+                check_running(is_running, source)
+                writer.join(FANOUT_WAIT)
+                # A writer which took the last chunk is only closing the
+                # file, however long it takes, the file is complete.
+                if writer.is_alive() and not writer.done and \
+                        time.time() - writer.last_active > stall_timeout:
+                    writer.abandon(DestinationStalled(
+                        'Destination {} stalled.'.format(dest)))
+                    break
+    except BaseException:
+        for writer in writers.values():
+            writer.abandon(CopyCancelled('Copy of {} been stopped.'.format(
+                source)))
+        for dest in linked:
+            remove_file(temp_paths[dest])
+        raise
+    for dest in dests:
+        writer = writers.get(dest)
+        if writer is not None and (writer.abandoned or not writer.done):
+            results[dest] = writer.error or DestinationStalled(
+                'Destination {} stalled.'.format(dest))
+            continue
+        try:
+            if writer is not None:
+                shutil.copystat(source, temp_paths[dest])
+            replace_file(temp_paths[dest], dest)
+        except (IOError, OSError) as exc:
+            remove_file(temp_paths[dest])
+            results[dest] = exc
+        else:
+            results[dest] = COPY if writer is not None else link_mode
+    return results
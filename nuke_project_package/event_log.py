@@ -0,0 +1,381 @@
+"""Module includes the background writer of the copy journal events and the
+renderer of the human readable copy log.
+
+The copy journal is a JSON lines file, one event per line. Copy events are
+written by worker threads as files are copied, collection events once the
+sources of the script been collected. The copy log is rendered from the
+journal, so it can be rendered again after a crash.
+
+Example:
+    python event_log.py /path/to/dest
+"""
+
+# Import built-in modules
+import argparse
+from collections import OrderedDict
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from queue import Empty, Full, Queue
+except ImportError:
+    from Queue import Empty, Full, Queue
+
+# Import local modules
+from frames import FrameSet
+from scanner import SequencePattern
+import utils
+
+# Types of events, lines without a type are copy events of old journals.
+COPY = 'copy'
+RUN = 'run'
+ERROR_NODE = 'error_node'
+SEQUENCE = 'sequence'
+SINGLE = 'single'
+
+# Default number of queued events at which writing waits for the writer.
+MAX_EVENTS = 4096
+
+# Default number of written events and seconds between two flushes.
+FLUSH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+
+# Seconds writing waits for a free slot before checking if the writer failed.
+PUT_INTERVAL = 0.2
+
+# File name of the rendered copy log.
+LOG_FILE_NAME = 'copy_log.log'
+
+
+class EventWriter(threading.Thread):
+    """Thread appends events to a JSON lines file.
+
+    Callers only queue events, encoding and writing happen in this thread.
+    The queue is bounded, so memory stays fixed however many events are
+    written, and the file is flushed in batches instead of once per event.
+    Once writing the file failed, later events are dropped and the error is
+    raised by close(), so callers never wait for a writer which stopped.
+    """
+
+    # Queued to stop the writer.
+    _stop_event = object()
+
+    def __init__(self, path, max_events=MAX_EVENTS, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        """Initialize and start writer.
+
+        Args:
+            path (str): Path of the file to append events to.
+            max_events (int): Number of queued events at which write()
+                waits for the writer.
+            flush_size (int): Number of written events to flush after.
+            flush_interval (float): Seconds to flush after.
+        """
+        super(EventWriter, self).__init__()
+        self.daemon = True
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        # Exception writing the file failed with.
+        self.error = None
+        self._queue = Queue(max_events)
+        self._file = open(path, 'a')
+        self.start()
+
+    def put(self, event):
+        """Queue an event, waiting while the queue is full.
+
+        Args:
+            event (object): Event to be queued.
+        Returns:
+            bool: False if the event been dropped as the writer failed.
+        """
+        while self.error is None:
+            try:
+                self._queue.put(event, timeout=PUT_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def write(self, event):
+        """Queue an event to be written, dropped if the writer failed.
+
+        Args:
+            event (dict): Event to be written as one JSON line, not changed
+                after been queued.
+        """
+        self.put(event)
+
+    def run(self):
+        """Write queued events until closed or writing failed."""
+        unflushed = 0
+        last_flush = time.time()
+        try:
+            while True:
+                try:
+                    event = self._queue.get(timeout=self.flush_interval)
+                except Empty:
+                    event = None
+                if event is self._stop_event:
+                    break
+                if event is not None:
+                    self._file.write(json.dumps(event) + '\n')
+                    unflushed += 1
+                now = time.time()
+                if unflushed and (unflushed >= self.flush_size or
+                                  now - last_flush >= self.flush_interval):
+                    self._file.flush()
+                    unflushed = 0
+                    last_flush = now
+            self._file.close()
+        except Exception as exc:
+            self.error = exc
+            try:
+                self._file.close()
+            except (IOError, OSError):
+                pass
+
+    def close(self):
+        """Write all queued events, close the file and wait for the writer.
+
+        Raises:
+            IOError: If writing the file failed, events after the failure
+                are not written.
+        """
+        self.put(self._stop_event)
+        self.join()
+        if self.error is not None:
+            raise IOError('Failed to write events into {}: {}'.format(
+                self.path, self.error))
+
+
+def iter_events(path):
+    """Read events of a JSON lines file.
+
+    Args:
+        path (str): Path of the file.
+    Yields:
+        dict: Events in written order.
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, 'r') as events_file:
+        for line in events_file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # The last line may be cut off by a crash.
+                continue
+
+
+class CopiedSequence(object):
+    """Frames of one sequence folder copied by all runs.
+
+    Frames are held as runs of a FrameSet per copy mode instead of one item
+    per copied file, the last copy of a frame wins.
+    """
+
+    def __init__(self, node_name, source):
+        """Initialize sequence by its first copied frame.
+
+        Args:
+            node_name (str): Names of the nodes read the sequence.
+            source (str): Source path of the first copied frame.
+        """
+        self.node_name = node_name
+        self.source = source
+        self.pattern = SequencePattern.parse(utils.frame_to_pattern(source))
+        # Copy mode to FrameSet of frames last copied in that mode.
+        self.modes = OrderedDict()
+        self._pending = []
+
+    def add(self, source, mode):
+        """Add a copied frame.
+
+        Args:
+            source (str): Source path of the frame.
+            mode (str): Copy mode used.
+        """
+        frame = self.pattern.match(os.path.basename(source)) \
+            if self.pattern else None
+        if frame is None:
+            return
+        self._pending.append((frame, mode))
+        if len(self._pending) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Merge added frames into the frame sets of their copy modes."""
+        pending = self._pending
+        self._pending = []
+        start = 0
+        while start < len(pending):
+            mode = pending[start][1]
+            end = start
+            while end < len(pending) and pending[end][1] == mode:
+                end += 1
+            frames = FrameSet(frame for frame, _ in pending[start:end])
+            for other_mode, other_frames in self.modes.items():
+                if other_mode != mode:
+                    self.modes[other_mode] = other_frames.difference(frames)
+            self.modes.setdefault(mode, FrameSet()).update(frames)
+            start = end
+
+    @property
+    def frames(self):
+        """FrameSet: All copied frames."""
+        self.flush()
+        return FrameSet.from_runs(run for frames in self.modes.values()
+                                  for run in frames.runs)
+
+
+def render_log(events, log_file):
+    """Write the human readable copy log of journal events.
+
+    Copied files of all runs are listed, error nodes and node names of the
+    last run. Copy events are grouped while read, memory grows with the
+    number of single files and sequences, not with the number of frames.
+
+    Args:
+        events (iterable): Journal events in written order.
+        log_file (file): File object to write the log into.
+    """
+    error_nodes = []
+    sequences = {}
+    single_nodes = {}
+    # Destination to (node names, source, copy mode) of single files, and
+    # sequence folder to CopiedSequence, the last copy of a file wins.
+    singles = OrderedDict()
+    copied_sequences = OrderedDict()
+    # Copy modes in the order first used.
+    modes = OrderedDict()
+    for event in events:
+        event_type = event.get('event', COPY)
+        if event_type == RUN:
+            error_nodes = []
+            sequences = {}
+            single_nodes = {}
+        elif event_type == ERROR_NODE:
+            error_nodes.append(event['node'])
+        elif event_type == SEQUENCE:
+            sequences[event['folder']] = event
+        elif event_type == SINGLE:
+            single_nodes[event['source']] = event['nodes']
+        elif event_type == COPY:
+            # Entries written before modes were recorded are plain copies.
+            mode = event.get('mode') or COPY
+            modes[mode] = True
+            folder = event['sequence']
+            if folder is None:
+                singles[event['dest']] = (event['node'], event['source'],
+                                          mode)
+                continue
+            if folder not in copied_sequences:
+                copied_sequences[folder] = CopiedSequence(event['node'],
+                                                          event['source'])
+            copied_sequences[folder].add(event['source'], mode)
+
+    lines = []
+    written = []
+
+    def write_lines():
+        text = ''.join(lines)
+        if not written:
+            # The log starts without blank lines.
+            text = text.lstrip('\n')
+        if text:
+            log_file.write(text)
+            written.append(True)
+        del lines[:]
+
+    if error_nodes:
+        lines.append('Nodes with error:')
+    for node_name in error_nodes:
+        lines.append('\n{}'.format(node_name))
+    mode_counts = OrderedDict((mode, 0) for mode in modes)
+    for node_name, source, mode in singles.values():
+        mode_counts[mode] += 1
+        lines.append('\n\n{}\n{}'.format(single_nodes.get(source, node_name),
+                                          source))
+        if len(lines) >= FLUSH_SIZE:
+            write_lines()
+    for folder, copied_sequence in copied_sequences.items():
+        copied = copied_sequence.frames
+        for mode, frames in copied_sequence.modes.items():
+            mode_counts[mode] += len(frames)
+        node_name = copied_sequence.node_name
+        pattern = copied_sequence.pattern
+        frames = None
+        sequence = sequences.get(folder)
+        if sequence:
+            node_name = sequence['nodes']
+            if sequence['missing']:
+                node_name += ' (missing frames {})'.format(
+                    sequence['missing'])
+            pattern = SequencePattern.parse(sequence['pattern'])
+            frames = FrameSet.parse(sequence['frames'])
+        sequence_range = str(copied)
+        if frames is not None and len(copied) < len(frames):
+            sequence_range += ' ({}/{} frames copied)'.format(
+                len(copied), len(frames))
+        lines.append('\n\n{}'.format(node_name))
+        lines.append('\n{} {}'.format(
+            pattern.printf_path if pattern else copied_sequence.source,
+            sequence_range))
+        if len(lines) >= FLUSH_SIZE:
+            write_lines()
+    mode_counts = [(mode, mode_count) for mode, mode_count in
+                   mode_counts.items() if mode_count]
+    if mode_counts:
+        lines.append('\n\nCopy modes:')
+    for mode, mode_count in mode_counts:
+        lines.append('\n{}: {} file(s)'.format(mode, mode_count))
+    write_lines()
+
+
+def render_file(events_path, log_path):
+    """Render the copy log of a journal file into a log file.
+
+    Args:
+        events_path (str): Path of the journal file.
+        log_path (str): Path of the log file, not written if there's nothing
+            to log.
+    """
+    if not os.path.isfile(events_path):
+        return
+    with open(log_path, 'w') as log_file:
+        render_log(iter_events(events_path), log_file)
+    if not os.path.getsize(log_path):
+        os.remove(log_path)
+
+
+def main(argv=None):
+    """Entry of the log render command line tool."""
+    # Imported here, the journal imports this module.
+    from journal import CopyJournal
+
+    parser = argparse.ArgumentParser(
+        description='Render the copy log of a package from its journal.')
+    parser.add_argument('dest', help='Destination root folder.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Path of the log file, - to print it, '
+                             'copy_log.log in destination root by default.')
+    args = parser.parse_args(argv)
+
+    events_path = '{}/{}'.format(args.dest, CopyJournal.file_name)
+    if not os.path.isfile(events_path):
+        parser.error('No copy journal found in {}.'.format(args.dest))
+    if args.output == '-':
+        render_log(iter_events(events_path), sys.stdout)
+        sys.stdout.write('\n')
+    else:
+        render_file(events_path, args.output or '{}/{}'.format(
+            args.dest, LOG_FILE_NAME))
+
+
+if __name__ == '__main__':
+    main()
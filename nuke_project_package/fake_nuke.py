@@ -0,0 +1,192 @@
+"""Stand-in of the nuke module to run this tool without a Nuke license.
+
+Only the functions used by this tool are provided. Scripts are parsed and
+saved as real .nk text, so reading and writing scripts costs about what it
+costs in Nuke. Groups are not supported, all nodes are on root level.
+"""
+
+# Import built-in modules
+from collections import OrderedDict
+
+# Import local modules
+from nk_parser import DEFAULT_KNOB_VALUES, NkScript, quote_word
+
+# Nodes of the opened script and knob values of its root.
+_nodes = []
+_root = OrderedDict([('name', '')])
+
+
+class Knob(object):
+    """Knob holds one value."""
+
+    def __init__(self, name, value=''):
+        """Initialize knob.
+
+        Args:
+            name (str): Knob name.
+            value (str): Knob value.
+        """
+        self._name = name
+        self._value = value
+
+    def name(self):
+        """Get knob name."""
+        return self._name
+
+    def value(self):
+        """Get knob value."""
+        return self._value
+
+    def setValue(self, value):
+        """Set knob value."""
+        self._value = value
+
+
+class Node(object):
+    """Node with knobs, an 'error' knob set to a true value makes hasError()
+    return True."""
+
+    def __init__(self, node_class, knobs=None):
+        """Initialize node.
+
+        Args:
+            node_class (str): Class name of the node.
+            knobs (OrderedDict): Knob name to value.
+        """
+        self._class = node_class
+        self._knobs = OrderedDict(
+            (name, Knob(name, value)) for name, value in
+            (knobs or {}).items())
+
+    def __getitem__(self, name):
+        return self._knobs.get(name) or \
+            Knob(name, DEFAULT_KNOB_VALUES.get(name, ''))
+
+    def Class(self):
+        """Get class name of the node."""
+        return self._class
+
+    def name(self):
+        """Get name of the node."""
+        return self['name'].value()
+
+    def fullName(self):
+        """Get name of the node, nodes are all on root level."""
+        return self.name()
+
+    def hasError(self):
+        """Check if the node has error."""
+        return bool(self['error'].value())
+
+    def knobs(self):
+        """Get knob name to knob dict of the node."""
+        return self._knobs
+
+
+class RootNode(object):
+    """Root of the opened script."""
+
+    def __getitem__(self, name):
+        return Knob(name, _root.get(name, DEFAULT_KNOB_VALUES.get(name, '')))
+
+    @staticmethod
+    def name():
+        """Get path of the opened script."""
+        return _root['name']
+
+    @staticmethod
+    def modified():
+        """Check if the opened script has unsaved changes, it never has."""
+        return False
+
+
+def Root():
+    """Get root of the opened script."""
+    return RootNode()
+
+
+root = Root
+
+
+def allNodes(filter=None, recurseGroups=False):
+    """Get nodes of the opened script.
+
+    Args:
+        filter (str): Class name of nodes, None to get all nodes.
+        recurseGroups (bool): Unused, there's no group.
+    Returns:
+        list: Nodes in script order.
+    """
+    return [node for node in _nodes
+            if filter is None or node.Class() == filter]
+
+
+def createNode(node_class, knobs=None):
+    """Add a node into the opened script.
+
+    Args:
+        node_class (str): Class name of the node.
+        knobs (OrderedDict): Knob name to value.
+    Returns:
+        Node: The new node.
+    """
+    node = Node(node_class, knobs)
+    _nodes.append(node)
+    return node
+
+
+def scriptClear():
+    """Close the opened script."""
+    del _nodes[:]
+    _root.clear()
+    _root['name'] = ''
+
+
+def scriptOpen(path):
+    """Open a .nk file, the opened script is closed first.
+
+    Args:
+        path (str): Path of the .nk file.
+    """
+    script = NkScript.read(path)
+    scriptClear()
+    _root['name'] = path
+    for parsed_node in script.nodes:
+        if parsed_node.Class() == 'Root':
+            _root.update((name, knob.value()) for name, knob in
+                         parsed_node.knobs.items() if name != 'name')
+        else:
+            createNode(parsed_node.Class(), OrderedDict(
+                (name, knob.value()) for name, knob in
+                parsed_node.knobs.items()))
+
+
+def scriptSave(filename=None):
+    """Save the opened script.
+
+    Args:
+        filename (str): Path to save into, None to save into the opened path.
+    """
+    lines = ['Root {\n',
+             ' name {}\n'.format(quote_word(filename or _root['name']))]
+    lines.extend(' {} {}\n'.format(name, quote_word(str(value)))
+                 for name, value in _root.items() if name != 'name')
+    lines.append('}\n')
+    for node in _nodes:
+        lines.append('{} {{\n'.format(node.Class()))
+        lines.extend(' {} {}\n'.format(name, quote_word(str(knob.value())))
+                     for name, knob in node.knobs().items())
+        lines.append('}\n')
+    with open(filename or _root['name'], 'w') as nk_file:
+        nk_file.writelines(lines)
+
+
+def scriptSaveAs(filename, overwrite=-1):
+    """Save the opened script into another path and keep it opened there.
+
+    Args:
+        filename (str): Path of the .nk file.
+        overwrite (int): Unused, the file is always overwritten.
+    """
+    _root['name'] = filename
+    scriptSave()
@@ -0,0 +1,234 @@
+"""Module includes the frame set and functions to find frames of sequences
+used by a script."""
+
+# Import built-in modules
+from bisect import bisect_right
+import re
+
+# Frame modes of the Read node mapping output frames to frames of files.
+START_AT = 'start at'
+OFFSET = 'offset'
+
+# Values of before / after knobs of the Read node with which frames outside
+# of the first-last range show no other frame than first or last one.
+HOLD_MODES = ('hold', 'black')
+
+# One run of frames formatted by FrameSet, e.g. 8, 1-5 or -10--1.
+FRAME_RUN = re.compile(r'^(-?\d+)(?:-(-?\d+))?$')
+
+
+class FrameSet(object):
+    """Set of frame numbers held as sorted runs of consecutive frames.
+
+    A sequence of ten thousand frames with a few gaps is held as a few
+    (first, last) runs instead of one item per frame. Frames are iterated
+    on demand.
+    """
+
+    def __init__(self, frames=()):
+        """Initialize frame set.
+
+        Args:
+            frames (iterable): Frame numbers in any order.
+        """
+        self.runs = []
+        self.update(frames)
+
+    @classmethod
+    def from_runs(cls, runs):
+        """Create a frame set from (first, last) runs.
+
+        Args:
+            runs (iterable): Inclusive (first frame, last frame) tuples.
+        Returns:
+            FrameSet: The frame set.
+        """
+        frame_set = cls()
+        frame_set.runs = merge_runs(list(runs))
+        return frame_set
+
+    @classmethod
+    def parse(cls, text):
+        """Create a frame set from runs formatted by str().
+
+        Args:
+            text (str): Runs separated by spaces, e.g. '1-5 8 10-20'.
+        Returns:
+            FrameSet: The frame set, words which aren't runs are ignored.
+        """
+        runs = []
+        for word in text.split():
+            match = FRAME_RUN.match(word)
+            if match:
+                first = int(match.group(1))
+                last = int(match.group(2)) if match.group(2) else first
+                runs.append((first, last))
+        return cls.from_runs(runs)
+
+    def update(self, frames):
+        """Add frame numbers.
+
+        Args:
+            frames (iterable): Frame numbers in any order.
+        """
+        runs = []
+        for frame in sorted(frames):
+            if runs and frame <= runs[-1][1] + 1:
+                runs[-1][1] = max(runs[-1][1], frame)
+            else:
+                runs.append([frame, frame])
+        if runs:
+            self.runs = merge_runs(self.runs + [tuple(run) for run in runs])
+
+    def difference(self, other):
+        """Get frames of this set not in another set.
+
+        Args:
+            other (FrameSet): Frames to be left out.
+        Returns:
+            FrameSet: A new frame set.
+        """
+        runs = []
+        other_runs = other.runs
+        index = 0
+        for first, last in self.runs:
+            while index < len(other_runs) and other_runs[index][1] < first:
+                index += 1
+            position = index
+            while first <= last:
+                if position >= len(other_runs) or \
+                        other_runs[position][0] > last:
+                    runs.append((first, last))
+                    break
+                other_first, other_last = other_runs[position]
+                if other_first > first:
+                    runs.append((first, other_first - 1))
+                first = max(first, other_last + 1)
+                position += 1
+        return FrameSet.from_runs(runs)
+
+    @property
+    def first(self):
+        """int: The smallest frame number, None if empty."""
+        return self.runs[0][0] if self.runs else None
+
+    @property
+    def last(self):
+        """int: The largest frame number, None if empty."""
+        return self.runs[-1][1] if self.runs else None
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self.runs)
+
+    def __iter__(self):
+        for first, last in self.runs:
+            for frame in range(first, last + 1):
+                yield frame
+
+    def __contains__(self, frame):
+        index = bisect_right(self.runs, (frame, float('inf'))) - 1
+        return index >= 0 and self.runs[index][1] >= frame
+
+    def __repr__(self):
+        return 'FrameSet({!r})'.format(str(self))
+
+    def __str__(self):
+        """Format runs in the syntax of Nuke frame ranges, e.g. 1-5 8 10-20."""
+        return ' '.join(str(first) if first == last else
+                        '{}-{}'.format(first, last)
+                        for first, last in self.runs)
+
+
+def merge_runs(runs):
+    """Sort runs of frames and merge the overlapping or adjacent ones.
+
+    Args:
+        runs (list): Inclusive (first frame, last frame) tuples.
+    Returns:
+        list: Sorted (first frame, last frame) tuples without overlaps.
+    """
+    merged = []
+    for first, last in sorted(runs):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def get_int(knob, default=None):
+    """Get value of a knob as an integer.
+
+    Args:
+        knob (nuke.Knob or NkKnob): A knob holds a number.
+        default (int): Value returned if the knob holds an expression.
+    Returns:
+        int: Value of the knob.
+    """
+    try:
+        return int(float(knob.value()))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_root_range(root):
+    """Get frame range of a script.
+
+    Args:
+        root (nuke.Node or NkNode): Root node of the script.
+    Returns:
+        tuple: (first frame, last frame), None if the range is an expression.
+    """
+    first = get_int(root['first_frame'])
+    last = get_int(root['last_frame'])
+    if first is None or last is None:
+        return None
+    return first, last
+
+
+def get_file_offset(node, first):
+    """Get offset from output frames of a Read node to frames of its files.
+
+    Args:
+        node (nuke.Node or NkNode): A node reads an image sequence.
+        first (int): First frame of the node.
+    Returns:
+        int: Offset added to an output frame to get the file frame, None if
+            frames are mapped by an expression.
+    """
+    frame_mode = node['frame_mode'].value()
+    frame = node['frame'].value()
+    if frame_mode == START_AT:
+        start = get_int(node['frame'])
+        return None if start is None else first - start
+    if frame_mode == OFFSET:
+        offset = get_int(node['frame'])
+        return None if offset is None else -offset
+    # An empty expression shows file frames as they are.
+    return None if frame.strip() else 0
+
+
+def get_used_range(node, root_range, handles=0):
+    """Get range of file frames a node shows within the script range.
+
+    Args:
+        node (nuke.Node or NkNode): A node reads an image sequence.
+        root_range (tuple): (first frame, last frame) of the script.
+        handles (int): Number of frames kept before and after the range.
+    Returns:
+        tuple: (first frame, last frame) within first and last knobs of the
+            node, all of them if the used frames can't be worked out.
+    """
+    first = get_int(node['first'], 1)
+    last = get_int(node['last'], 1)
+    offset = get_file_offset(node, first)
+    if root_range is None or offset is None:
+        return first, last
+    used_first = root_range[0] - handles + offset
+    used_last = root_range[1] + handles + offset
+    # Looped or bounced frames outside of the node range may show any frame.
+    if (used_first < first and node['before'].value() not in HOLD_MODES) or \
+            (used_last > last and node['after'].value() not in HOLD_MODES):
+        return first, last
+    return (min(max(used_first, first), last),
+            max(min(used_last, last), first))
@@ -0,0 +1,269 @@
+"""Module includes the on-disk copy journal of this tool."""
+
+# Import built-in modules
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+# Import local modules
+from checksum import (HASH_NAMES, get_manifest_path, hash_file,
+                      write_manifest)
+from copier import COPY
+import event_log
+
+
+class CopyJournal(object):
+    """Append-only journal of copied files in the destination root folder.
+
+    Every copied file is written as one JSON line by a background writer as
+    soon as it's copied, so the journal survives a crash of Nuke. Packaging
+    again into the same destination skips files whose entry still matches
+    the source. Collected nodes are written as events too, the copy log is
+    rendered from the journal by event_log.
+    """
+
+    file_name = '.copy_journal'
+
+    def __init__(self, dest_root):
+        """Initialize journal and load entries of previous runs.
+
+        Args:
+            dest_root (str): Destination root folder path.
+        """
+        self.dest_root = dest_root
+        self.path = '{}/{}'.format(dest_root, self.file_name)
+        self.entries = OrderedDict()
+        self._writer = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load copy entries from journal file, later entries win."""
+        for entry in event_log.iter_events(self.path):
+            if entry.get('event', event_log.COPY) == event_log.COPY:
+                self.entries[entry['dest']] = entry
+
+    def open(self):
+        """Start writer appending events to journal file, a run event is
+        written first."""
+        self._writer = event_log.EventWriter(self.path)
+        self._writer.write(OrderedDict([('event', event_log.RUN),
+                                        ('time', time.time())]))
+
+    def get_previous_dests(self):
+        """Get destinations of sources copied by previous runs.
+
+        Returns:
+            dict: Source path to destination path relative to the sources
+                folder.
+        """
+        sources_folder = '{}/sources'.format(self.dest_root)
+        return dict((entry['source'], self.get_relative_path(
+            entry['dest'], sources_folder)) for entry in self.entries.values())
+
+    def prune(self, dests):
+        """Remove files of the sources folder not in given destinations.
+
+        Entries of removed files are dropped and the journal file is written
+        again with only the remaining entries, so the log and the manifest
+        only list files of the current package.
+
+        Args:
+            dests (list): Destination paths of all current sources.
+        Returns:
+            list: Paths of removed files.
+        """
+        keep = set(os.path.normcase(os.path.normpath(dest)) for dest in dests)
+        removed = []
+        sources_folder = '{}/sources'.format(self.dest_root)
+        for folder, _, file_names in os.walk(sources_folder, topdown=False):
+            for file_name in file_names:
+                path = os.path.join(folder, file_name)
+                if os.path.normcase(os.path.normpath(path)) not in keep:
+                    os.remove(path)
+                    removed.append(path)
+            if folder != sources_folder and not os.listdir(folder):
+                os.rmdir(folder)
+        with self._lock:
+            for dest in list(self.entries):
+                if os.path.normcase(os.path.normpath(dest)) not in keep:
+                    del self.entries[dest]
+            self.rewrite()
+        return removed
+
+    def rewrite(self):
+        """Write all entries into a new journal file replacing the old one.
+
+        Collection events of the last run are kept after the entries.
+        """
+        reopen = self._writer is not None
+        if reopen:
+            self._writer.close()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as journal_file:
+            for entry in self.entries.values():
+                journal_file.write(json.dumps(entry) + '\n')
+            run_events = []
+            for event in event_log.iter_events(self.path):
+                event_type = event.get('event', event_log.COPY)
+                if event_type == event_log.RUN:
+                    run_events = [event]
+                elif event_type != event_log.COPY:
+                    run_events.append(event)
+            for event in run_events:
+                journal_file.write(json.dumps(event) + '\n')
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        os.rename(temp_path, self.path)
+        if reopen:
+            self._writer = event_log.EventWriter(self.path)
+
+    def close(self):
+        """Write all queued events and stop the writer.
+
+        Raises:
+            IOError: If writing the journal file failed.
+        """
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer:
+                writer.close()
+
+    def is_copied(self, task):
+        """Check if a task been copied by a previous run.
+
+        Args:
+            task (CopyTask): A copy task.
+        Returns:
+            bool: True if the journal entry still matches the source and the
+                destination file, False otherwise.
+        """
+        dest = task.dest
+        entry = self.entries.get(dest)
+        if not entry or entry['source'] != task.source:
+            return False
+        try:
+            source_stat = os.stat(task.source)
+            dest_size = os.path.getsize(dest)
+        except OSError:
+            return False
+        return (source_stat.st_size == entry['size'] == dest_size and
+                source_stat.st_mtime == entry['mtime'])
+
+    def record(self, task):
+        """Append a copied task to the journal.
+
+        Args:
+            task (CopyTask): A copied task.
+        """
+        source_stat = os.stat(task.source)
+        entry = OrderedDict([('event', event_log.COPY),
+                             ('node', task.node_name),
+                             ('source', task.source),
+                             ('dest', task.dest),
+                             ('size', source_stat.st_size),
+                             ('mtime', source_stat.st_mtime),
+                             ('sequence', task.sequence),
+                             ('mode', task.mode),
+                             ('hash_name', task.hash_name),
+                             ('hash', task.hash)])
+        with self._lock:
+            self.entries[entry['dest']] = entry
+            if self._writer:
+                self._writer.write(entry)
+
+    def log_collection(self, error_nodes, sequences, singles=()):
+        """Append collected nodes of current run to the journal.
+
+        Args:
+            error_nodes (list): Names of nodes with error.
+            sequences (dict): Sequence folder name to sequence info tuple
+                (node_name, pattern, frames, first, last, missing_frames) of
+                current run.
+            singles (list): (node names, source path, destination name) of
+                single files of current run, files may be copied before
+                all nodes reading them been collected.
+        """
+        with self._lock:
+            if not self._writer:
+                return
+            for node_name in error_nodes:
+                self._writer.write(OrderedDict([
+                    ('event', event_log.ERROR_NODE), ('node', node_name)]))
+            for folder, (node_name, pattern, frames, first, last,
+                         missing_frames) in sequences.items():
+                self._writer.write(OrderedDict([
+                    ('event', event_log.SEQUENCE),
+                    ('folder', folder),
+                    ('nodes', node_name),
+                    ('pattern', pattern.printf_path),
+                    ('frames', str(frames)),
+                    ('first', first),
+                    ('last', last),
+                    ('missing', str(missing_frames or ''))]))
+            for node_name, source, dest_name in singles:
+                self._writer.write(OrderedDict([
+                    ('event', event_log.SINGLE),
+                    ('nodes', node_name),
+                    ('source', source),
+                    ('dest', dest_name)]))
+
+    def get_mode_counts(self):
+        """Count files in the journal by the copy mode used.
+
+        Returns:
+            OrderedDict: Copy mode to number of files, entries written
+                before modes were recorded count as copier.COPY.
+        """
+        mode_counts = OrderedDict()
+        for entry in list(self.entries.values()):
+            mode = entry.get('mode') or COPY
+            mode_counts[mode] = mode_counts.get(mode, 0) + 1
+        return mode_counts
+
+    def save_manifest(self, hash_name, paths=()):
+        """Save checksum manifest of all files in the journal.
+
+        Digests hashed while copying are used as they are, files copied by
+        a previous run without a digest of the same algorithm are hashed
+        now. Manifests of other algorithms are removed.
+
+        Args:
+            hash_name (str): Name of the hash algorithm.
+            paths (list): Paths of other files in destination root folder to
+                be listed, like the scripts.
+        Returns:
+            str: Path of the manifest file.
+        """
+        checksums = {}
+        for entry in list(self.entries.values()):
+            digest = entry.get('hash')
+            if entry.get('hash_name') != hash_name:
+                if not os.path.isfile(entry['dest']):
+                    continue
+                digest = hash_file(entry['dest'], hash_name)
+            checksums[self.get_relative_path(entry['dest'],
+                                             self.dest_root)] = digest
+        for path in paths:
+            checksums[self.get_relative_path(path, self.dest_root)] = \
+                hash_file(path, hash_name)
+        manifest_path = get_manifest_path(self.dest_root, hash_name)
+        for other_name in HASH_NAMES:
+            other_path = get_manifest_path(self.dest_root, other_name)
+            if other_name != hash_name and os.path.isfile(other_path):
+                os.remove(other_path)
+        write_manifest(manifest_path, checksums)
+        return manifest_path
+
+    @staticmethod
+    def get_relative_path(path, folder):
+        """Get path relative to a folder with forward slashes."""
+        return os.path.relpath(path, folder).replace(os.sep, '/')
+
+    def save_log(self):
+        """Save copying log rendered from the journal to destination root
+        folder, the journal should be closed first."""
+        event_log.render_file(self.path, '{}/{}'.format(
+            self.dest_root, event_log.LOG_FILE_NAME))
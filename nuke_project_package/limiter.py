@@ -0,0 +1,134 @@
+"""Module includes the adaptive concurrency limiter of source volumes."""
+
+# Import built-in modules
+import os
+import time
+
+# Seconds of first read latency under which latency isn't compared.
+MIN_LATENCY = 0.001
+
+
+def get_volume_key(path):
+    """Get a key identifies the storage volume of a path.
+
+    Args:
+        path (str): Path of an existing file or folder.
+    Returns:
+        tuple: ('dev', device number), or ('drive', drive or UNC share) if
+            the file system doesn't provide device numbers.
+    """
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        device = 0
+    if device:
+        return 'dev', device
+    return 'drive', os.path.splitdrive(os.path.abspath(path))[0].lower()
+
+
+class VolumeLimiter(object):
+    """Limit of concurrent reads from one storage volume.
+
+    The limit follows additive increase, multiplicative decrease: after each
+    window of copied files it grows by one while the volume keeps up, and
+    shrinks by a factor once throughput drops or the latency of first reads
+    rises well above the best seen, which means reads queue up on a
+    saturated volume. Not thread-safe, the scheduler calls it under its
+    lock.
+    """
+
+    def __init__(self, max_limit, limit=2, window=1.0,
+                 latency_tolerance=2.0, throughput_tolerance=0.7,
+                 backoff=0.5):
+        """Initialize limiter.
+
+        Args:
+            max_limit (int): Upper bound of the limit, the number of workers.
+            limit (int): Initial limit.
+            window (float): Minimum seconds between two adjustments.
+            latency_tolerance (float): Ratio of first read latency to the best
+                seen above which the volume is taken as saturated.
+            throughput_tolerance (float): Ratio of throughput to the best
+                seen under which the volume is taken as saturated.
+            backoff (float): Factor the limit is multiplied by when the
+                volume is saturated.
+        """
+        self.max_limit = max(1, max_limit)
+        self.limit = max(1, min(limit, self.max_limit))
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.throughput_tolerance = throughput_tolerance
+        self.backoff = backoff
+        self.active = 0
+        self.best_throughput = 0.0
+        self.best_latency = None
+        self.copied_bytes = 0
+        self._window_start = time.time()
+        self._window_bytes = 0
+        self._window_latencies = []
+        self._window_peak = 0
+
+    def is_available(self):
+        """bool: True if one more read is allowed."""
+        return self.active < self.limit
+
+    def acquire(self):
+        """Take a read slot."""
+        self.active += 1
+        self._window_peak = max(self._window_peak, self.active)
+
+    def release(self, size=0, latency=None):
+        """Give back a read slot and sample a copied file.
+
+        Args:
+            size (int): Size in bytes of the copied file.
+            latency (float): Seconds from opening the file to its first
+                chunk been copied, None if it wasn't copied, then nothing
+                is sampled.
+        """
+        self.active -= 1
+        if latency is None:
+            return
+        self.copied_bytes += size
+        self._window_bytes += size
+        self._window_latencies.append(latency)
+        now = time.time()
+        if now - self._window_start >= self.window:
+            self.adjust(now - self._window_start)
+            self._window_start = now
+            self._window_bytes = 0
+            self._window_latencies = []
+            self._window_peak = self.active
+
+    def adjust(self, elapsed):
+        """Change the limit by throughput and latency of the last window.
+
+        Args:
+            elapsed (float): Seconds of the last window.
+        """
+        if not self._window_latencies:
+            return
+        throughput = self._window_bytes / elapsed
+        # Unlike seconds per file, first read latency doesn't depend on file
+        # sizes, it grows only when reads wait on each other.
+        latency = sorted(self._window_latencies)[
+            len(self._window_latencies) // 2]
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        self.best_throughput = max(self.best_throughput, throughput)
+        # Throughput only tells about the volume while all slots were used,
+        # otherwise the volume simply ran out of files. Latencies below a
+        # millisecond are taken as noise of a local disk.
+        all_used = self._window_peak >= self.limit
+        slow_down = all_used and \
+            throughput < self.best_throughput * self.throughput_tolerance
+        queued = latency > max(self.best_latency, MIN_LATENCY) * \
+            self.latency_tolerance
+        if slow_down or queued:
+            self.limit = max(1, int(self.limit * self.backoff))
+            # Forget the best so the volume is measured again under the new
+            # load, instead of backing off forever after a burst.
+            self.best_throughput = throughput
+            self.best_latency = latency
+        elif all_used:
+            self.limit = min(self.max_limit, self.limit + 1)
@@ -0,0 +1,145 @@
+"""Module includes the persistent cache of source directory listings."""
+
+# Import built-in modules
+from collections import OrderedDict
+import json
+import os
+import time
+
+# Environment variable to override path of the cache file.
+CACHE_PATH_ENV = 'NUKE_PACKAGE_LISTING_CACHE'
+
+# Default path of the cache file, local to the artist's machine.
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.nuke',
+                                  'nuke_project_package', 'listings.json')
+
+# Default number of files of all cached listings, about 8 MB of JSON.
+MAX_FILES = 200000
+
+# Seconds after a directory been modified within which it isn't cached, a
+# file added within the same mtime tick wouldn't change the mtime again.
+SETTLE_SECONDS = 2.0
+
+
+def get_cache_path():
+    """Get path of the cache file, from environment or the default one."""
+    return os.environ.get(CACHE_PATH_ENV) or DEFAULT_CACHE_PATH
+
+
+class ListingCache(object):
+    """Least recently used cache of directory listings kept between sessions.
+
+    Listings are keyed by directory path and valid while the directory's
+    mtime is unchanged, which changes once a file is added, removed or
+    renamed. A file rewritten in place doesn't change it, its cached size
+    is used until anything else changes in the directory.
+    """
+
+    # Version 1 listings held a size and an mtime per file.
+    version = 2
+
+    def __init__(self, path=None, max_files=MAX_FILES):
+        """Initialize empty cache.
+
+        Args:
+            path (str): Path of the cache file, None for get_cache_path().
+            max_files (int): Number of files of all listings above which the
+                least recently used listings are evicted.
+        """
+        self.path = path or get_cache_path()
+        self.max_files = max_files
+        # Directory key to (directory mtime, {name: size}), from the least
+        # recently used one.
+        self.entries = OrderedDict()
+        self.file_count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Load listings from the cache file, a broken file is ignored.
+
+        Returns:
+            ListingCache: The cache itself.
+        """
+        try:
+            with open(self.path, 'r') as cache_file:
+                data = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return self
+        if data.get('version') != self.version:
+            return self
+        for key, mtime, files in data.get('entries', []):
+            self.add(key, mtime, files)
+        return self
+
+    def save(self):
+        """Write listings into the cache file, replacing it at once.
+
+        Errors are ignored, the cache only makes packaging faster.
+        """
+        temp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(temp_path, 'w') as cache_file:
+                json.dump({'version': self.version,
+                           'entries': [[key, mtime, files] for key, (
+                               mtime, files) in self.entries.items()]},
+                          cache_file)
+            if os.name == 'nt' and os.path.isfile(self.path):
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError):
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+    def get(self, key, mtime):
+        """Get a cached listing still valid.
+
+        Args:
+            key (str): Normalized absolute path of the directory.
+            mtime (float): Current mtime of the directory.
+        Returns:
+            dict: File name to size in bytes, None if not cached or
+                outdated.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != mtime:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Move to the most recently used end.
+        self.entries[key] = self.entries.pop(key)
+        return entry[1]
+
+    def add(self, key, mtime, files):
+        """Cache the listing of a directory.
+
+        Listings of directories modified just now aren't cached.
+
+        Args:
+            key (str): Normalized absolute path of the directory.
+            mtime (float): Mtime of the directory before it been listed.
+            files (dict): File name to size in bytes.
+        """
+        if time.time() - mtime < SETTLE_SECONDS:
+            return
+        if key in self.entries:
+            self.file_count -= len(self.entries.pop(key)[1])
+        self.entries[key] = (mtime, files)
+        self.file_count += len(files)
+        while self.file_count > self.max_files and self.entries:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.file_count -= len(evicted)
+
+    @property
+    def hit_rate(self):
+        """float: Ratio of listings found valid in the cache."""
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def get_report(self):
+        """str: Hits, misses and hit rate of this session."""
+        return 'Listing cache: {} hit(s), {} miss(es), {:.0f}% hit rate.' \
+            .format(self.hits, self.misses, self.hit_rate * 100)
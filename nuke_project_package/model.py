@@ -7,102 +7,75 @@ import os
 import nuke
 
 # Import local modules
-from utils import get_read_nodes, modify_path
+from collector import SourceCollector
+from frames import get_root_range
+from journal import CopyJournal
+from nk_parser import NkScript
+from scanner import SequenceScanner
+from source_index import SourceIndex
+from utils import get_read_nodes, rewrite_script
 
 
-class NukePackageWrapper(object):
-    """Class to provide all Nuke related data operating functions."""
+def has_unsaved_changes():
+    """Check if the opened script has changes which can't be packaged.
 
-    def __init__(self, dest_root):
-        """ Initialize packaging worker class.
+    Without nuke.scriptSaveToTemp() only the saved script file can be
+    packaged, its unsaved changes would be missing from the package.
 
-        Args:
-            dest_root (str): Path of destination root folder.
-        """
-        self.error_nodes = []
-        self.single_results = []
-        self.sequence_results = {}
-        self.copy_files_count = 0
-        self.dest_root = dest_root
-        self.original_nk = nuke.Root().name()
-        self.nodes = [node for node in get_read_nodes() if
-                      self.check_node_error(node)]
+    Returns:
+        bool: True if the script is modified and can't be saved to a temp
+            file, False otherwise.
+    """
+    return not hasattr(nuke, 'scriptSaveToTemp') and nuke.root().modified()
 
-    def check_node_error(self, node):
-        """Check if given node has error.
 
-        Args:
-            node (nuke.Node): A specific node.
-        Returns:
-            bool: True if there's no error on the given node, False if not.
-        """
-        if node.hasError():
-            self.error_nodes.append(node.name())
-            return False
-        return True
-
-    def get_node_source(self, node):
-        """Get source information of a given node.
-
-        Args:
-            node (nuke.Node): A specific node that has file knob.
-        """
-        knob_name = 'file'
-        if node.Class() == 'Vectorfield':
-            knob_name = 'vfield_file'
-        source = node[knob_name].value()
-        if os.path.isfile(source):
-            self.single_results.append((node.name(), source))
-            self.copy_files_count += 1
-        elif '%04d' in source:
-            self.get_sequence_source(node, source, '%04d')
-        elif '####' in source:
-            self.get_sequence_source(node, source, '####')
-        else:
-            return
-
-    def get_sequence_source(self, node, source, pattern):
-        """Get and store source information of an image sequence.
-
-        Args:
-            node (nuke.Node): A node holds an image sequence in its file knob.
-            source (str): Source path pattern of the node's file knob.
-            pattern (str): Sequence count pattern of the source path.
-        """
-        source_files = []
-        first = node['first'].value()
-        last = node['last'].value()
-        for frame in range(first, last + 1):
-            source_file = source.replace(pattern, str(frame).zfill(4))
-            if os.path.isfile(source_file):
-                source_files.append(source_file)
-                self.copy_files_count += 1
-        if source_files:
-            basename = '.'.join(os.path.basename(source).split('.')[:-2])
-            self.sequence_results[basename] = (node.name(),
-                                               source_files,
-                                               first,
-                                               last)
-        else:
-            self.error_nodes.append(node.name())
+class NukePackageWrapper(SourceCollector):
+    """Class to provide all Nuke related data operating functions."""
 
-    def grab_source(self, index):
-        """Grab sources information from specific node.
+    def __init__(self, dest_root, incremental=False, handles=None,
+                 listing_cache=None):
+        """ Initialize packaging worker class.
 
         Args:
-            index (int): Index of the nodes list.
+            dest_root (str): Path of destination root folder.
+            incremental (bool): Whether to keep destinations of sources of
+                the previous package in destination root folder.
+            handles (int): Number of frames kept before and after the frame
+                range of the script, None to collect all frames.
+            listing_cache (ListingCache): Persistent cache of source
+                directory listings, None to list every directory.
         """
-        self.get_node_source(self.nodes[index])
+        source_index = None
+        if incremental:
+            source_index = SourceIndex(
+                CopyJournal(dest_root).get_previous_dests())
+        root_range = None
+        if handles is not None:
+            root_range = get_root_range(nuke.root())
+        super(NukePackageWrapper, self).__init__(
+            dest_root, get_read_nodes(), source_index,
+            SequenceScanner(listing_cache), root_range=root_range,
+            handles=handles or 0)
+        self.original_nk = nuke.Root().name()
+        self.dest_nk = '{}/{}'.format(dest_root,
+                                      os.path.basename(self.original_nk))
 
     def modify_nodes_path(self):
-        """Modify file knobs in specific nodes to use relative paths."""
-        # We save the script to destination folder before modify it,
-        # by this way we do not change anything in the original nk file.
-        nuke.scriptSaveAs('{}/{}'.format(self.dest_root,
-                                         os.path.basename(nuke.Root().name())),
-                          1)
-        for node in self.nodes:
-            modify_path(node)
-        nuke.scriptSave()
-        nuke.scriptClear()
-        nuke.scriptOpen(self.original_nk)
+        """Write the script into destination folder with file knobs using
+        relative paths.
+
+        The script text is rewritten, the script opened in the session is
+        never changed or reloaded. Unsaved changes are written by
+        nuke.scriptSaveToTemp() where available, which keeps the name and
+        the modified state of the opened script, otherwise the saved script
+        file is packaged, the controller refuses to start packaging a
+        script with unsaved changes then, see has_unsaved_changes().
+        """
+        save_to_temp = getattr(nuke, 'scriptSaveToTemp', None)
+        source_nk = self.original_nk
+        if save_to_temp and nuke.root().modified():
+            save_to_temp(self.dest_nk)
+            source_nk = self.dest_nk
+        rewrite_script(NkScript.read(source_nk),
+                       self.source_index.node_paths,
+                       self.dest_nk)
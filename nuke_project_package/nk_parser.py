@@ -0,0 +1,298 @@
+"""Module includes a parser of Nuke script text, works without Nuke."""
+
+# Import built-in modules
+from collections import OrderedDict
+import re
+
+# Header line of a node block, e.g. 'Read {'.
+NODE_START = re.compile(r'^(?P<class>\w+) \{$')
+
+# Knob values of node classes not saved into script when left as default.
+DEFAULT_KNOB_VALUES = {
+    'first': '1',
+    'last': '1',
+    'before': 'hold',
+    'after': 'hold',
+    'first_frame': '1',
+    'last_frame': '100',
+    'file': '',
+    'vfield_file': ''
+}
+
+# Word which can be written into script without quotes.
+PLAIN_WORD = re.compile(r'^[^\s{}\[\]"\\$;]+$')
+
+# Backslash escapes used in quoted words of Nuke scripts.
+ESCAPES = {'n': '\n', 't': '\t'}
+
+
+def parse_word(text):
+    """Parse the first TCL word of a knob value.
+
+    Args:
+        text (str): Knob value text, may be {braced} or "quoted".
+    Returns:
+        str: The first word with quotes removed and escapes resolved.
+    """
+    text = text.lstrip()
+    if text.startswith('{'):
+        depth = 0
+        for index, char in enumerate(text):
+            if char == '{' and (index == 0 or text[index - 1] != '\\'):
+                depth += 1
+            elif char == '}' and text[index - 1] != '\\':
+                depth -= 1
+                if depth == 0:
+                    return text[1:index]
+        return text[1:]
+    word = []
+    quoted = text.startswith('"')
+    index = 1 if quoted else 0
+    while index < len(text):
+        char = text[index]
+        if char == '\\' and index + 1 < len(text):
+            index += 1
+            word.append(ESCAPES.get(text[index], text[index]))
+        elif quoted and char == '"':
+            break
+        elif not quoted and char.isspace():
+            break
+        else:
+            word.append(char)
+        index += 1
+    return ''.join(word)
+
+
+def is_complete(text):
+    """Check if a knob value text has balanced braces and quotes.
+
+    Args:
+        text (str): Knob value text collected so far.
+    Returns:
+        bool: False if the value continues on next line.
+    """
+    depth = 0
+    quoted = False
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '"' and depth == 0:
+            quoted = not quoted
+        elif char == '{' and not quoted:
+            depth += 1
+        elif char == '}' and not quoted:
+            depth -= 1
+        index += 1
+    return depth <= 0 and not quoted
+
+
+def quote_word(value):
+    """Quote a knob value so Nuke reads it back unchanged.
+
+    Braces keep TCL expressions like [value root.name] from being evaluated
+    while loading the script.
+
+    Args:
+        value (str): Knob value.
+    Returns:
+        str: Value safe to be written into a script.
+    """
+    if value and PLAIN_WORD.match(value):
+        return value
+    if value and is_complete(value) and not value.endswith('\\'):
+        return '{{{}}}'.format(value)
+    return '"{}"'.format(re.sub(r'([\\"\[\]$])', r'\\\1', value))
+
+
+class NkKnob(object):
+    """Knob of a parsed node, provides value() like nuke.Knob."""
+
+    def __init__(self, name, text, start, end):
+        """Initialize knob.
+
+        Args:
+            name (str): Knob name.
+            text (str): Raw value text of the knob in script.
+            start (int): Index of the first line of the knob in script.
+            end (int): Index of the last line of the knob in script.
+        """
+        self.name = name
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def value(self):
+        """Get the first word of knob value."""
+        return parse_word(self.text)
+
+
+class NkNode(object):
+    """Node block of a parsed script, mimics the nuke.Node interface used by
+    this tool."""
+
+    def __init__(self, node_class, group, prefix=''):
+        """Initialize node without knobs.
+
+        Args:
+            node_class (str): Class name of the node.
+            group (str): Full name of the group holding this node, empty for
+                root level.
+            prefix (str): Prefix added to full name, used to tell nodes of
+                different scripts apart.
+        """
+        self.node_class = node_class
+        self.group = group
+        self.prefix = prefix
+        self.knobs = OrderedDict()
+
+    def __getitem__(self, name):
+        if name not in self.knobs:
+            return NkKnob(name, DEFAULT_KNOB_VALUES.get(name, ''), -1, -1)
+        return self.knobs[name]
+
+    def Class(self):
+        """Get class name of the node."""
+        return self.node_class
+
+    def name(self):
+        """Get name of the node."""
+        return self['name'].value()
+
+    def fullName(self):
+        """Get name of the node with its groups and prefix."""
+        full_name = '.'.join(filter(None, [self.group, self.name()]))
+        if self.prefix:
+            return '{}:{}'.format(self.prefix, full_name)
+        return full_name
+
+    @staticmethod
+    def hasError():
+        """Parsed nodes are never evaluated, so they never have error."""
+        return False
+
+
+class NkScript(object):
+    """Parsed Nuke script text.
+
+    Only node blocks and their knobs are parsed, everything else is kept as
+    it is, so the script can be written back with some knobs changed.
+    """
+
+    def __init__(self, text, prefix=''):
+        """Parse script text.
+
+        Args:
+            text (str): Content of a .nk file.
+            prefix (str): Prefix added to full names of all nodes.
+        """
+        self.lines = text.splitlines(True)
+        self.prefix = prefix
+        self.nodes = []
+        self.parse()
+
+    @classmethod
+    def read(cls, path, prefix=''):
+        """Parse a .nk file.
+
+        Args:
+            path (str): Path of the .nk file.
+            prefix (str): Prefix added to full names of all nodes.
+        Returns:
+            NkScript: Parsed script.
+        """
+        with open(path, 'r') as nk_file:
+            return cls(nk_file.read(), prefix)
+
+    def parse(self):
+        """Parse node blocks of all lines."""
+        groups = []
+        index = 0
+        while index < len(self.lines):
+            line = self.lines[index].strip()
+            match = NODE_START.match(line)
+            if line == 'end_group' and groups:
+                groups.pop()
+            elif match:
+                node = NkNode(match.group('class'), '.'.join(groups),
+                              self.prefix)
+                index = self.parse_knobs(node, index + 1)
+                self.nodes.append(node)
+                if node.Class() in ('Group', 'LiveGroup'):
+                    groups.append(node.name())
+            index += 1
+
+    def parse_knobs(self, node, index):
+        """Parse knob lines of a node block.
+
+        Args:
+            node (NkNode): The node to add knobs to.
+            index (int): Index of the first line after the node header.
+        Returns:
+            int: Index of the closing line of the node block.
+        """
+        while index < len(self.lines):
+            line = self.lines[index].strip()
+            if line == '}':
+                return index
+            start = index
+            parts = line.split(None, 1)
+            text = parts[1] if len(parts) > 1 else ''
+            while not is_complete(text) and index + 1 < len(self.lines):
+                index += 1
+                text += '\n' + self.lines[index].rstrip('\r\n')
+            if parts:
+                node.knobs[parts[0]] = NkKnob(parts[0], text, start, index)
+            index += 1
+        return index
+
+    def get_nodes(self, node_classes):
+        """Get parsed nodes of given classes.
+
+        Args:
+            node_classes (list): Class names of nodes.
+        Returns:
+            list: Nodes of given classes in script order.
+        """
+        return [node for node in self.nodes if node.Class() in node_classes]
+
+    def set_values(self, values):
+        """Change knob values in script lines.
+
+        Args:
+            values (dict): (node, knob name) to new value.
+        """
+        replacements = {}
+        for (node, knob_name), value in values.items():
+            knob = node.knobs.get(knob_name)
+            if knob is None:
+                continue
+            indent = self.lines[knob.start][:len(
+                self.lines[knob.start]) - len(self.lines[knob.start].lstrip())]
+            replacements[knob.start] = (knob.end, '{}{} {}\n'.format(
+                indent, knob_name, quote_word(value)))
+        lines = []
+        index = 0
+        while index < len(self.lines):
+            if index in replacements:
+                end, line = replacements[index]
+                lines.append(line)
+                index = end + 1
+            else:
+                lines.append(self.lines[index])
+                index += 1
+        self.lines = lines
+        # Line indexes of knobs changed, parse again to keep them valid.
+        self.nodes = []
+        self.parse()
+
+    def write(self, path):
+        """Write script lines into a .nk file.
+
+        Args:
+            path (str): Path of the .nk file.
+        """
+        with open(path, 'w') as nk_file:
+            nk_file.writelines(self.lines)
@@ -0,0 +1,113 @@
+"""Module includes the copy progress aggregator of this tool."""
+
+# Import built-in modules
+from collections import deque
+import os
+import threading
+import time
+
+
+def format_duration(seconds):
+    """Format seconds into HH:MM:SS string.
+
+    Args:
+        seconds (float): Duration in seconds.
+    Returns:
+        str: Formatted duration.
+    """
+    seconds = int(seconds)
+    return '{:02d}:{:02d}:{:02d}'.format(seconds // 3600,
+                                         seconds % 3600 // 60,
+                                         seconds % 60)
+
+
+class ProgressAggregator(object):
+    """Thread-safe byte counter shared by all copy worker threads.
+
+    Workers report every copied chunk, the GUI reads a snapshot at a fixed
+    rate, so the Qt event loop isn't flooded by tiny files and large files
+    still move the progress while being copied.
+    """
+
+    def __init__(self, total_bytes, window=5.0):
+        """Initialize aggregator.
+
+        Args:
+            total_bytes (int): Size of all files to be copied.
+            window (float): Seconds of history used to measure throughput.
+        """
+        self.total_bytes = total_bytes
+        self.copied_bytes = 0
+        self.copied_files = 0
+        self.current_file = ''
+        self.window = window
+        self._samples = deque([(time.time(), 0)])
+        self._lock = threading.Lock()
+
+    def add_bytes(self, count):
+        """Count copied bytes of a file being copied.
+
+        Args:
+            count (int): Number of bytes copied since last call.
+        """
+        with self._lock:
+            self.copied_bytes += count
+
+    def add_total(self, count):
+        """Count more bytes to be copied, sources are added while copying.
+
+        Args:
+            count (int): Size in bytes of added files.
+        """
+        with self._lock:
+            self.total_bytes += count
+
+    def add_file(self, source):
+        """Count a file been copied.
+
+        Args:
+            source (str): Absolute path of the source file.
+        """
+        with self._lock:
+            self.copied_files += 1
+            self.current_file = source
+
+    def snapshot(self):
+        """Get current progress.
+
+        Returns:
+            tuple: (percent, bytes per second, seconds remaining or None,
+                current file path)
+        """
+        now = time.time()
+        with self._lock:
+            copied_bytes = self.copied_bytes
+            current_file = self.current_file
+            self._samples.append((now, copied_bytes))
+            while len(self._samples) > 2 and \
+                    now - self._samples[1][0] >= self.window:
+                self._samples.popleft()
+        start_time, start_bytes = self._samples[0]
+        rate = 0.0
+        if now > start_time:
+            rate = (copied_bytes - start_bytes) / (now - start_time)
+        eta = None
+        if rate > 0:
+            eta = max(0, self.total_bytes - copied_bytes) / rate
+        percent = 100
+        if self.total_bytes:
+            percent = min(100, int(copied_bytes * 100 / self.total_bytes))
+        return percent, rate, eta, current_file
+
+    def get_message(self):
+        """Get a progress message for the GUI.
+
+        Returns:
+            tuple: (percent, message)
+        """
+        percent, rate, eta, current_file = self.snapshot()
+        message = 'Copy {}... {:.1f} MB/s'.format(
+            os.path.basename(current_file), rate / 1024.0 / 1024.0)
+        if eta is not None:
+            message += ', ETA {}'.format(format_duration(eta))
+        return percent, message
@@ -0,0 +1,248 @@
+"""Module includes the image sequence scanner of this tool."""
+
+# Import built-in modules
+import os
+import re
+
+# Import local modules
+from frames import FrameSet
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# Frame tokens of a sequence path, %04d / %d, #### of any length and $F / $F4.
+FRAME_TOKEN = re.compile(r'%(?P<printf>\d*)d|(?P<hash>#+)|\$F(?P<houdini>\d*)')
+
+
+class SequencePattern(object):
+    """Frame pattern of an image sequence path."""
+
+    def __init__(self, path, token, padding, start, end):
+        """Initialize sequence pattern.
+
+        Args:
+            path (str): Full path of the sequence with frame token.
+            token (str): The frame token string found in the path.
+            padding (int): Minimum digits count of a frame number.
+            start (int): Start index of the token in the path.
+            end (int): End index of the token in the path.
+        """
+        self.path = path
+        self.token = token
+        self.padding = padding
+        self.dirname = os.path.dirname(path[:start])
+        self.prefix = os.path.basename(path[:start])
+        self.suffix = path[end:]
+        self._regex = re.compile(r'^{}(-?\d+){}$'.format(
+            re.escape(self.prefix), re.escape(self.suffix)))
+
+    @classmethod
+    def parse(cls, path):
+        """Find the frame token in the file name of a path.
+
+        Args:
+            path (str): File path of a read node.
+        Returns:
+            SequencePattern: Pattern of the path, None if it's not a sequence.
+        """
+        matches = list(FRAME_TOKEN.finditer(os.path.basename(path)))
+        if not matches:
+            return None
+        match = matches[-1]
+        offset = len(path) - len(os.path.basename(path))
+        if match.group('hash'):
+            padding = len(match.group('hash'))
+        else:
+            digits = match.group('printf') or match.group('houdini')
+            padding = int(digits) if digits else 1
+        return cls(path, match.group(0), padding,
+                   offset + match.start(), offset + match.end())
+
+    def get_name(self, frame):
+        """Get file name of a frame."""
+        if frame < 0:
+            return '{}-{}{}'.format(self.prefix,
+                                    str(-frame).zfill(self.padding),
+                                    self.suffix)
+        return '{}{}{}'.format(self.prefix,
+                               str(frame).zfill(self.padding),
+                               self.suffix)
+
+    def get_path(self, frame):
+        """Get file path of a frame."""
+        return '{}/{}'.format(self.dirname, self.get_name(frame)) \
+            if self.dirname else self.get_name(frame)
+
+    @property
+    def printf_path(self):
+        """str: Path of the sequence with a printf style frame token."""
+        name = '{}%0{}d{}'.format(self.prefix, self.padding, self.suffix)
+        return '{}/{}'.format(self.dirname, name).replace('\\', '/') \
+            if self.dirname else name
+
+    def match(self, name):
+        """Get frame number from a file name of this sequence.
+
+        Args:
+            name (str): A file name.
+        Returns:
+            int: Frame number, None if the name doesn't belong to the sequence.
+        """
+        result = self._regex.match(name)
+        if result:
+            frame = int(result.group(1))
+            # Reject names with a different padding, e.g. 01 for %04d.
+            if self.get_name(frame) == name:
+                return frame
+        return None
+
+
+class ScanResult(object):
+    """Frames of a sequence found in one directory listing."""
+
+    def __init__(self, pattern, first, last):
+        """Initialize empty scan result.
+
+        Args:
+            pattern (SequencePattern): Pattern of the sequence.
+            first (int): First frame number.
+            last (int): Last frame number.
+        """
+        self.pattern = pattern
+        self.first = first
+        self.last = last
+        self.sizes = {}
+
+    @property
+    def frames(self):
+        """FrameSet: Present frame numbers."""
+        return FrameSet(self.sizes)
+
+    @property
+    def missing(self):
+        """FrameSet: Frame numbers between first and last that don't
+        exist."""
+        return FrameSet.from_runs([(self.first, self.last)]).difference(
+            self.frames)
+
+    @property
+    def files(self):
+        """generator: Paths of present frames in order."""
+        return (self.pattern.get_path(frame) for frame in self.frames)
+
+    @property
+    def total_bytes(self):
+        """int: Size of all present frames."""
+        return sum(self.sizes.values())
+
+    def get_range(self, first, last):
+        """Get present frames between first and last.
+
+        Args:
+            first (int): First frame number.
+            last (int): Last frame number.
+        Returns:
+            ScanResult: A new result without listing the directory again.
+        """
+        result = ScanResult(self.pattern, first, last)
+        result.sizes = dict((frame, size) for frame, size in self.sizes.items()
+                            if first <= frame <= last)
+        return result
+
+
+class SequenceScanner(object):
+    """Scanner lists every sequence directory once.
+
+    Listings are shared, nodes reading from the same directory cost only one
+    listing in total. With a persistent listing cache, a directory unchanged
+    since a previous session costs one stat instead of a listing.
+    """
+
+    def __init__(self, cache=None):
+        """Initialize the scanner with empty listing cache.
+
+        Args:
+            cache (ListingCache): Persistent cache of listings, None to list
+                every directory once per scanner.
+        """
+        self.listings = {}
+        self.cache = cache
+
+    def list_dir(self, dirname):
+        """Get names and sizes of files in a directory.
+
+        Args:
+            dirname (str): Path of the directory.
+        Returns:
+            dict: File name to size in bytes, empty if it's not a directory.
+        """
+        key = os.path.normcase(os.path.abspath(dirname or '.'))
+        if key not in self.listings:
+            self.listings[key] = self.read_dir(dirname or '.', key)
+        return self.listings[key]
+
+    def read_dir(self, dirname, key):
+        """Get a listing from the persistent cache or list the directory.
+
+        Args:
+            dirname (str): Path of the directory.
+            key (str): Normalized absolute path of the directory.
+        Returns:
+            dict: File name to size in bytes.
+        """
+        if self.cache is None:
+            return self._list_dir(dirname)
+        try:
+            mtime = os.stat(dirname).st_mtime
+        except OSError:
+            return {}
+        files = self.cache.get(key, mtime)
+        if files is None:
+            files = self._list_dir(dirname)
+            self.cache.add(key, mtime, files)
+        return files
+
+    def save_cache(self):
+        """Write the persistent listing cache if there's one."""
+        if self.cache is not None:
+            self.cache.save()
+
+    @staticmethod
+    def _list_dir(dirname):
+        """List a directory without cache."""
+        files = {}
+        try:
+            if scandir:
+                for entry in scandir(dirname):
+                    if entry.is_file():
+                        files[entry.name] = entry.stat().st_size
+            else:
+                for name in os.listdir(dirname):
+                    path = os.path.join(dirname, name)
+                    if os.path.isfile(path):
+                        files[name] = os.path.getsize(path)
+        except OSError:
+            pass
+        return files
+
+    def scan(self, pattern, first, last):
+        """Find present frames of a sequence between first and last.
+
+        Args:
+            pattern (SequencePattern): Pattern of the sequence.
+            first (int): First frame number.
+            last (int): Last frame number.
+        Returns:
+            ScanResult: Present frames with sizes.
+        """
+        result = ScanResult(pattern, first, last)
+        for name, size in self.list_dir(pattern.dirname).items():
+            frame = pattern.match(name)
+            if frame is not None and first <= frame <= last:
+                result.sizes[frame] = size
+        return result
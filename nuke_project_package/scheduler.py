@@ -0,0 +1,450 @@
+"""Module includes the copy scheduler shared by all copy worker threads."""
+
+# Import built-in modules
+import copy
+import errno
+import heapq
+from itertools import count
+import os
+import threading
+import time
+
+# Import local modules
+from checksum import new_hasher
+from copier import (CopyCancelled, DestinationStalled, copy_file,
+                    fanout_copy_file)
+from limiter import VolumeLimiter, get_volume_key
+
+# Seconds a worker waits for a read slot before checking if it's stopped.
+WAIT_INTERVAL = 0.2
+
+# Default number of queued tasks at which adding tasks waits for workers.
+MAX_PENDING = 1024
+
+
+class CopyTask(object):
+    """One source file to be copied."""
+
+    def __init__(self, node_name, source, dest, size, sequence=None):
+        """Initialize copy task.
+
+        Args:
+            node_name (str): Names of the nodes read this source.
+            source (str): Absolute path of the source file.
+            dest (str): Destination file path.
+            size (int): Size in bytes of the source file.
+            sequence (str): Destination folder name of the image sequence
+                this file belongs to, None for a single file.
+        """
+        self.node_name = node_name
+        self.source = source
+        self.dest = dest
+        self.dest_folder = os.path.dirname(dest)
+        self.size = size
+        self.sequence = sequence
+        # Copy mode used, filled in once the file been copied.
+        self.mode = None
+        # Key of the storage volume of source, filled in by the scheduler.
+        self.volume = None
+        # Hash algorithm name and hex digest of the content, filled in once
+        # the file been copied.
+        self.hash_name = None
+        self.hash = None
+        # Paths of the same file in destination roots of mirrors.
+        self.mirror_dests = []
+
+    def with_dest(self, dest):
+        """Get a copy of this task with another destination.
+
+        Args:
+            dest (str): Destination file path.
+        Returns:
+            CopyTask: The new task, without mirrors.
+        """
+        task = copy.copy(self)
+        task.dest = dest
+        task.dest_folder = os.path.dirname(dest)
+        task.mirror_dests = []
+        return task
+
+
+class CopyScheduler(object):
+    """Scheduler splits all sources into per-file tasks for worker threads.
+
+    Tasks are grouped by the storage volume of their sources, every volume
+    has its own adaptive limit of concurrent reads, so a slow NAS isn't
+    hammered by all workers while a fast volume can use them all. Workers
+    take the largest remaining file of volumes with a free slot, so the work
+    is balanced by bytes no matter how files are grouped into nodes.
+
+    Tasks can be added while workers are copying, so copying starts as soon
+    as the first node been collected. Workers wait for more tasks until the
+    scheduler is closed, the producer waits while too many tasks are queued.
+
+    With mirrors, every file is also copied into the destination root of
+    each mirror, the source is read once for all of them. A mirror which
+    stalled is given up for the rest of the run.
+    """
+
+    def __init__(self, workers=4, journal=None, progress=None,
+                 link_mode=None, archive=None, hash_name=None,
+                 max_pending=MAX_PENDING, range_parts=1, mirrors=(),
+                 pool=None):
+        """Initialize empty scheduler.
+
+        Args:
+            workers (int): Number of worker threads to copy files.
+            journal (CopyJournal): Journal to record copied files into and
+                to skip files copied by a previous run.
+            progress (ProgressAggregator): Aggregator to count copied bytes.
+            link_mode (str): copier.HARDLINK or copier.REFLINK to link
+                sources on the same volume as destination instead of
+                copying them, None to always copy.
+            archive (ArchiveWriter): Archive to stream sources into instead
+                of the destination folder tree.
+            hash_name (str): Name of the hash algorithm to hash every copied
+                file with, None to not hash.
+            max_pending (int): Number of queued tasks at which adding tasks
+                waits for workers, 0 for no limit.
+            range_parts (int): Number of byte ranges a large file is copied
+                as in parallel, 1 to copy every file as one stream.
+            mirrors (list): Journals of other destination roots to copy
+                every file into as well, not used with an archive.
+            pool (SourcePool): Pool to store sources into, destinations are
+                linked to pooled files, not used with an archive or mirrors.
+        """
+        self.workers = max(1, workers)
+        self.journal = journal
+        self.progress = progress
+        self.link_mode = link_mode
+        self.archive = archive
+        self.hash_name = hash_name
+        self.max_pending = max_pending
+        self.range_parts = range_parts
+        self.mirrors = list(mirrors)
+        self.pool = pool
+        self.closed = False
+        # Destination paths of all added tasks, and in every mirror.
+        self.dests = []
+        self.mirror_dests = [[] for _ in self.mirrors]
+        # (destination path, error message) of files failed to be copied.
+        self.failed = []
+        # Journals of mirrors which stalled, no more file is copied into
+        # them.
+        self.stalled_mirrors = []
+        self._pending = 0
+        # Volume key to heap of tasks and to concurrency limiter.
+        self.heaps = {}
+        self.limiters = {}
+        self._volumes = {}
+        self._order = count()
+        self._condition = threading.Condition()
+
+    def get_volume(self, source):
+        """Get the volume key of a source, cached by folder.
+
+        Args:
+            source (str): Absolute path of a source file.
+        Returns:
+            tuple: Volume key from limiter.get_volume_key().
+        """
+        folder = os.path.dirname(source)
+        if folder not in self._volumes:
+            self._volumes[folder] = get_volume_key(folder or '.')
+        return self._volumes[folder]
+
+    def add_task(self, task, is_running=None, block=True):
+        """Add a copy task to the scheduler.
+
+        Waits while max_pending tasks are queued.
+
+        Args:
+            task (CopyTask): The task to add.
+            is_running (callable): Returns False when the producer should
+                stop waiting, the task is added anyway.
+            block (bool): False to add the task without waiting.
+        """
+        task.volume = self.get_volume(task.source)
+        with self._condition:
+            while block and self.max_pending and \
+                    self._pending >= self.max_pending \
+                    and (is_running is None or is_running()):
+                self._condition.wait(WAIT_INTERVAL)
+            self._pending += 1
+            self.dests.append(task.dest)
+            for dests, dest in zip(self.mirror_dests, task.mirror_dests):
+                dests.append(dest)
+            if self.progress:
+                self.progress.add_total(task.size)
+            if task.volume not in self.heaps:
+                self.heaps[task.volume] = []
+                self.limiters[task.volume] = VolumeLimiter(
+                    self.workers, max(1, self.workers // 2))
+            heapq.heappush(self.heaps[task.volume],
+                           (-task.size, next(self._order), task))
+            self._condition.notify()
+
+    def add_files(self, files, dest_root, is_running=None, block=True):
+        """Add files to be copied.
+
+        Args:
+            files (list): Tuples of SourceIndex.iter_files().
+            dest_root (str): Destination root folder path.
+            is_running (callable): Returns False when the producer should
+                stop waiting for workers.
+            block (bool): False to add files without waiting.
+        """
+        for node_name, source, dest, size, sequence in files:
+            task = CopyTask(node_name,
+                            source,
+                            '{}/sources/{}'.format(dest_root, dest),
+                            size,
+                            sequence)
+            task.mirror_dests = ['{}/sources/{}'.format(mirror.dest_root,
+                                                        dest)
+                                 for mirror in self.mirrors]
+            self.add_task(task, is_running, block)
+
+    def add_sources(self, source_index, dest_root):
+        """Add all files of a collected source index and close.
+
+        Files are all added without waiting, so workers can be started
+        afterwards.
+
+        Args:
+            source_index (SourceIndex): Index of collected sources.
+            dest_root (str): Destination root folder path.
+        """
+        self.add_files(source_index.iter_files(), dest_root, block=False)
+        self.close()
+
+    def close(self):
+        """Tell workers no more task will be added."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def next_task(self, is_running=None):
+        """Take the largest remaining task of volumes with a free read slot.
+
+        Waits while all volumes with remaining tasks are at their limits, or
+        no task is queued before the scheduler is closed. The slot must be
+        given back by task_done().
+
+        Args:
+            is_running (callable): Returns False when the worker should stop
+                waiting.
+        Returns:
+            CopyTask: Task to be copied, None if no task remains or the
+                worker been stopped.
+        """
+        with self._condition:
+            while True:
+                largest = None
+                for volume, heap in self.heaps.items():
+                    if heap and self.limiters[volume].is_available() and (
+                            largest is None or
+                            heap[0] < self.heaps[largest][0]):
+                        largest = volume
+                if largest is not None:
+                    self.limiters[largest].acquire()
+                    self._pending -= 1
+                    self._condition.notify_all()
+                    return heapq.heappop(self.heaps[largest])[-1]
+                if self.closed and not self._pending:
+                    return None
+                if is_running and not is_running():
+                    return None
+                self._condition.wait(WAIT_INTERVAL)
+
+    def task_done(self, task, latency=None):
+        """Give back the read slot of a task taken by next_task().
+
+        Args:
+            task (CopyTask): The finished task.
+            latency (float): Seconds until the first chunk been copied, None
+                if the task been skipped.
+        """
+        with self._condition:
+            self.limiters[task.volume].release(task.size, latency)
+            self._condition.notify_all()
+
+    def copy(self, task, is_running=None):
+        """Copy the source file of a task into its destination folder, or
+        into the archive, and hash it from the copied chunks.
+
+        Args:
+            task (CopyTask): The task to copy.
+            is_running (callable): Returns False when the copy should stop,
+                checked before every chunk copied.
+        Returns:
+            float: Seconds until the first chunk been copied.
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        start = time.time()
+        first_chunk = []
+        hasher = new_hasher(self.hash_name) if self.hash_name else None
+        on_progress = self.get_progress_callback(start, first_chunk)
+        if self.archive:
+            task.mode = self.archive.add_file(task.source, task.dest,
+                                              on_progress, hasher,
+                                              is_running)
+        else:
+            try:
+                os.makedirs(task.dest_folder)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+            copy_function = self.pool.copy if self.pool else copy_file
+            task.mode = copy_function(task.source,
+                                      task.dest,
+                                      on_progress,
+                                      link_mode=self.link_mode,
+                                      hasher=hasher,
+                                      is_running=is_running,
+                                      range_parts=self.range_parts)
+        if hasher:
+            task.hash_name = self.hash_name
+            task.hash = hasher.hexdigest()
+        return first_chunk[0] if first_chunk else time.time() - start
+
+    def copy_mirrored(self, targets, is_running=None):
+        """Copy one source file into several destinations reading it once.
+
+        Copied destinations are recorded into their journals, failed ones
+        are added to failed, so a stalled mirror doesn't stop the others.
+        A stalled mirror is added to stalled_mirrors, so later files don't
+        wait for it again and no more writer thread is left blocked on it.
+
+        Args:
+            targets (list): (CopyTask, CopyJournal) of every destination.
+            is_running (callable): Returns False when the copy should stop.
+        Returns:
+            float: Seconds until the first chunk been copied.
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        source = targets[0][0].source
+        start = time.time()
+        first_chunk = []
+        hasher = new_hasher(self.hash_name) if self.hash_name else None
+        for task, _ in targets:
+            try:
+                os.makedirs(task.dest_folder)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        results = fanout_copy_file(source,
+                                   [task.dest for task, _ in targets],
+                                   self.get_progress_callback(start,
+                                                              first_chunk),
+                                   link_mode=self.link_mode,
+                                   hasher=hasher,
+                                   is_running=is_running)
+        for task, journal in targets:
+            result = results[task.dest]
+            if isinstance(result, Exception):
+                self.add_failed([(task, journal)], result)
+                continue
+            task.mode = result
+            if hasher:
+                task.hash_name = self.hash_name
+                task.hash = hasher.hexdigest()
+            if journal:
+                journal.record(task)
+        return first_chunk[0] if first_chunk else time.time() - start
+
+    def add_failed(self, targets, error):
+        """Add destinations failed to be copied.
+
+        A mirror whose destination stalled is added to stalled_mirrors.
+
+        Args:
+            targets (list): (CopyTask, CopyJournal) of failed destinations.
+            error (Exception): Error the destinations failed with.
+        """
+        with self._condition:
+            for task, journal in targets:
+                self.failed.append((task.dest, str(error)))
+                if isinstance(error, DestinationStalled) and \
+                        journal in self.mirrors and \
+                        journal not in self.stalled_mirrors:
+                    self.stalled_mirrors.append(journal)
+
+    def get_progress_callback(self, start, first_chunk):
+        """Get callback of copied chunks of one file.
+
+        Args:
+            start (float): Time the copy started.
+            first_chunk (list): Seconds until the first chunk is appended
+                into it.
+        Returns:
+            callable: Called with number of bytes of every copied chunk.
+        """
+        def on_progress(count):
+            if not first_chunk:
+                first_chunk.append(time.time() - start)
+            if self.progress:
+                self.progress.add_bytes(count)
+
+        return on_progress
+
+    def get_targets(self, task):
+        """Get destinations of a task not copied by a previous run.
+
+        Args:
+            task (CopyTask): A copy task.
+        Returns:
+            list: (CopyTask, CopyJournal) of the destination of the task and
+                of every mirror not stalled, with the task itself first.
+        """
+        if self.archive:
+            # A new archive is written every run, nothing can be skipped.
+            return [(task, self.journal)]
+        targets = [(task, self.journal)]
+        targets.extend((task.with_dest(dest), mirror) for dest, mirror in
+                       zip(task.mirror_dests, self.mirrors)
+                       if mirror not in self.stalled_mirrors)
+        return [(target, journal) for target, journal in targets
+                if not journal or not journal.is_copied(target)]
+
+    def run_worker(self, is_running, on_copied):
+        """Copy tasks until none remains or the worker been stopped.
+
+        A stopped worker gives up the file being copied within one chunk,
+        the file isn't recorded into the journal. A file which can't be
+        read or written is added to failed and the worker carries on with
+        the next one.
+
+        Args:
+            is_running (callable): Returns False when the worker should stop.
+            on_copied (callable): Called with every copied task.
+        """
+        while is_running():
+            task = self.next_task(is_running)
+            if task is None:
+                break
+            latency = None
+            targets = [(task, None)]
+            try:
+                targets = self.get_targets(task)
+                if not targets:
+                    if self.progress:
+                        self.progress.add_bytes(task.size)
+                elif len(targets) == 1:
+                    target, journal = targets[0]
+                    latency = self.copy(target, is_running)
+                    if journal:
+                        journal.record(target)
+                else:
+                    latency = self.copy_mirrored(targets, is_running)
+            except CopyCancelled:
+                break
+            except (IOError, OSError) as exc:
+                self.add_failed(targets, exc)
+            finally:
+                self.task_done(task, latency)
+            if self.progress:
+                self.progress.add_file(task.source)
+            on_copied(task)
@@ -0,0 +1,242 @@
+"""Module includes the source deduplication index of this tool."""
+
+# Import built-in modules
+from collections import OrderedDict
+import os
+
+# Import local modules
+from frames import FrameSet, merge_runs
+
+
+def get_file_key(path, stat):
+    """Get a key identifies the physical file or folder of a path.
+
+    Args:
+        path (str): Path of a file or folder.
+        stat (os.stat_result): Stat result of the path.
+    Returns:
+        tuple: (device, inode), or a one item tuple of the normalized real path
+            if the file system doesn't provide inode numbers.
+    """
+    if stat.st_ino:
+        return stat.st_dev, stat.st_ino
+    return (os.path.normcase(os.path.realpath(path)),)
+
+
+class SourceIndex(object):
+    """Index of all collected sources keyed by physical file.
+
+    A file or sequence referenced by several nodes is copied once, every
+    referencing node is mapped to the same destination. Different sources
+    with the same name get distinct destinations.
+
+    Sources of a previous package keep their destinations, and new sources
+    never take names used by the previous package, so unchanged files of
+    an incremental run stay in place.
+    """
+
+    def __init__(self, previous_dests=None):
+        """Initialize empty index.
+
+        Args:
+            previous_dests (dict): Source path to destination path relative
+                to the sources folder of a previous package.
+        """
+        self.singles = OrderedDict()
+        self.sequences = OrderedDict()
+        # Full node name to destination path relative to sources folder.
+        self.node_paths = {}
+        self.previous_dests = previous_dests or {}
+        # Files added since last pop_new_files(), (None, single key) or
+        # (sequence key, FrameSet of new frames).
+        self._new_files = []
+        self._names = set(dest.split('/')[0].lower()
+                          for dest in self.previous_dests.values())
+
+    def get_unique_name(self, name):
+        """Get a name not used by any other destination in sources folder.
+
+        Args:
+            name (str): Preferred file or folder name.
+        Returns:
+            str: The name itself, or with a number appended to its stem.
+        """
+        stem, ext = os.path.splitext(name)
+        unique_name = name
+        index = 0
+        while unique_name.lower() in self._names:
+            index += 1
+            unique_name = '{}_{}{}'.format(stem, index, ext)
+        self._names.add(unique_name.lower())
+        return unique_name
+
+    def add_single(self, node_name, source, stat):
+        """Add a single file referenced by a node.
+
+        Args:
+            node_name (str): Full name of the node.
+            source (str): Path of the file.
+            stat (os.stat_result): Stat result of the file.
+        Returns:
+            bool: True if the file is new to the index, False if another node
+                already referenced it.
+        """
+        key = get_file_key(source, stat)
+        is_new = key not in self.singles
+        if is_new:
+            dest = self.previous_dests.get(source)
+            if not dest or '/' in dest:
+                dest = self.get_unique_name(os.path.basename(source))
+            self.singles[key] = {
+                'source': source,
+                'dest': dest,
+                'size': stat.st_size,
+                'nodes': []
+            }
+            self._new_files.append((None, [key]))
+        self.singles[key]['nodes'].append(node_name)
+        self.node_paths[node_name] = self.singles[key]['dest']
+        return is_new
+
+    def add_sequence(self, node_name, scan_result, trimmed_sizes=None):
+        """Add frames of an image sequence referenced by a node.
+
+        Args:
+            node_name (str): Full name of the node.
+            scan_result (ScanResult): Present frames of the sequence.
+            trimmed_sizes (dict): Frame number to size in bytes of present
+                frames of the node left out as they're never shown.
+        Returns:
+            FrameSet: Frame numbers new to the index.
+        """
+        pattern = scan_result.pattern
+        dirname = pattern.dirname or '.'
+        key = get_file_key(dirname, os.stat(dirname)) + \
+            (pattern.prefix, pattern.padding, pattern.suffix)
+        if key not in self.sequences:
+            self.sequences[key] = {
+                'pattern': pattern,
+                'folder': self.get_sequence_folder(scan_result),
+                'sizes': {},
+                'trimmed': {},
+                'ranges': [],
+                'first': scan_result.first,
+                'last': scan_result.last,
+                'nodes': []
+            }
+        sequence = self.sequences[key]
+        sequence['first'] = min(sequence['first'], scan_result.first)
+        sequence['last'] = max(sequence['last'], scan_result.last)
+        sequence['nodes'].append(node_name)
+        sequence['ranges'] = merge_runs(
+            sequence['ranges'] + [(scan_result.first, scan_result.last)])
+        new_frames = FrameSet(frame for frame in scan_result.sizes
+                              if frame not in sequence['sizes'])
+        sequence['sizes'].update(scan_result.sizes)
+        sequence['trimmed'].update(trimmed_sizes or {})
+        if new_frames:
+            self._new_files.append((key, new_frames))
+        self.node_paths[node_name] = '{}/{}'.format(
+            sequence['folder'], os.path.basename(pattern.path))
+        return new_frames
+
+    def get_sequence_folder(self, scan_result):
+        """Get destination folder name of a sequence new to the index.
+
+        Args:
+            scan_result (ScanResult): Present frames of the sequence.
+        Returns:
+            str: Folder of any frame in the previous package, or a new
+                unique name.
+        """
+        pattern = scan_result.pattern
+        for frame in scan_result.frames:
+            dest = self.previous_dests.get(pattern.get_path(frame), '')
+            if '/' in dest:
+                return dest.split('/')[0]
+        folder = pattern.prefix.rstrip('._- ') or \
+            os.path.basename(os.path.abspath(pattern.dirname or '.')) or \
+            'sequence'
+        return self.get_unique_name(folder)
+
+    @property
+    def single_results(self):
+        """list: (node names, source path, destination name) of singles."""
+        return [(', '.join(single['nodes']), single['source'], single['dest'])
+                for single in self.singles.values()]
+
+    @property
+    def trimmed(self):
+        """tuple: (number of frames, size in bytes) of frames left out by
+        trimming and not used by any other node."""
+        sizes = [size for sequence in self.sequences.values()
+                 for frame, size in sequence['trimmed'].items()
+                 if frame not in sequence['sizes']]
+        return len(sizes), sum(sizes)
+
+    @property
+    def sequence_results(self):
+        """dict: Destination folder name to sequence info tuple
+        (node names, SequencePattern, FrameSet of present frames, first frame,
+        last frame, FrameSet of missing frames).
+
+        Only frames within ranges used by nodes are taken as missing, frames
+        left out by trimming are not.
+        """
+        results = OrderedDict()
+        for sequence in self.sequences.values():
+            frames = FrameSet(sequence['sizes'])
+            results[sequence['folder']] = (
+                ', '.join(sequence['nodes']),
+                sequence['pattern'],
+                frames,
+                sequence['first'],
+                sequence['last'],
+                FrameSet.from_runs(sequence['ranges']).difference(frames))
+        return results
+
+    def iter_files(self):
+        """Iterate all physical files to be copied.
+
+        Yields:
+            tuple: (node names, source path, destination path relative to the
+                sources folder, size in bytes, sequence folder name or None)
+        """
+        for key in self.singles:
+            yield self.get_file(None, key)
+        for key, sequence in self.sequences.items():
+            for frame in FrameSet(sequence['sizes']):
+                yield self.get_file(key, frame)
+
+    def pop_new_files(self):
+        """Take files added since last call, to be copied while collecting.
+
+        Returns:
+            list: Tuples in the same format as iter_files().
+        """
+        new_files = [self.get_file(sequence_key, item)
+                     for sequence_key, items in self._new_files
+                     for item in items]
+        self._new_files = []
+        return new_files
+
+    def get_file(self, sequence_key, item):
+        """Get a physical file to be copied.
+
+        Args:
+            sequence_key (tuple): Key of a sequence, None for a single file.
+            item (tuple or int): Key of the single file, or frame number of
+                the sequence.
+        Returns:
+            tuple: (node names, source path, destination path relative to the
+                sources folder, size in bytes, sequence folder name or None)
+        """
+        if sequence_key is None:
+            single = self.singles[item]
+            return (', '.join(single['nodes']), single['source'],
+                    single['dest'], single['size'], None)
+        sequence = self.sequences[sequence_key]
+        source = sequence['pattern'].get_path(item)
+        return (', '.join(sequence['nodes']), source,
+                '{}/{}'.format(sequence['folder'], os.path.basename(source)),
+                sequence['sizes'][item], sequence['folder'])
@@ -0,0 +1,240 @@
+"""Module includes the pool of source files shared by packages in one
+delivery root."""
+
+# Import built-in modules
+import errno
+import hashlib
+import os
+import threading
+
+# Import local modules
+from checksum import new_hasher
+from copier import (CHUNK_SIZE, COPY, check_running, copy_file,
+                    get_temp_path, hardlink_file, remove_file, replace_file)
+
+# Keys pooled files are named by.
+CONTENT = 'content'
+PATH = 'path'
+KEY_MODES = (CONTENT, PATH)
+
+# Hash algorithm of content keys, the same in every environment so runs of
+# other Nuke versions share the pool.
+CONTENT_HASH_NAME = 'sha256'
+
+# Name of the pool folder in the delivery root.
+POOL_FOLDER = '.source_pool'
+
+# Copy mode of a destination linked to a pooled file.
+POOL = 'pool'
+
+
+class TeeHasher(object):
+    """Hash object updating several hash objects with the same chunks."""
+
+    def __init__(self, hashers):
+        """Initialize hasher.
+
+        Args:
+            hashers (list): Hash objects, None items are skipped.
+        """
+        self.hashers = [hasher for hasher in hashers if hasher is not None]
+
+    def update(self, chunk):
+        """Update all hash objects."""
+        for hasher in self.hashers:
+            hasher.update(chunk)
+
+
+class SourcePool(object):
+    """Pool of source files shared by packages in one delivery root.
+
+    Every source is stored once in the pool folder named by its key, the
+    destination in the sources folder of a package is a hardlink of the
+    pooled file, so paths written into scripts stay valid. Keyed by content,
+    a source is still read to be hashed, but identical files of different
+    paths are stored once. Keyed by path, a source already pooled with the
+    same size and mtime isn't read at all.
+    """
+
+    def __init__(self, root, key_mode=CONTENT, hash_name=CONTENT_HASH_NAME):
+        """Initialize pool.
+
+        Args:
+            root (str): Delivery root folder path, the pool folder is created
+                in it. It should be on the same volume as the destination
+                root folders to link files.
+            key_mode (str): CONTENT or PATH.
+            hash_name (str): Name of the hash algorithm of content keys.
+        """
+        self.root = root
+        self.folder = os.path.join(root, POOL_FOLDER)
+        self.key_mode = key_mode
+        self.hash_name = hash_name
+        # Bytes of destinations linked to files already pooled, and bytes
+        # written into the pool.
+        self.deduplicated_bytes = 0
+        self.pooled_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_path(self, key, source):
+        """Get path of a pooled file.
+
+        Args:
+            key (str): Hex key of the file.
+            source (str): Path of the source file, for the file extension.
+        Returns:
+            str: Path in a sub folder named by the first two key characters.
+        """
+        return os.path.join(self.folder, key[:2],
+                            key + os.path.splitext(source)[1])
+
+    @staticmethod
+    def get_path_key(source):
+        """Get key of a source by its real path, size and mtime.
+
+        Args:
+            source (str): Absolute path of the source file.
+        Returns:
+            str: Hex digest of the key.
+        """
+        source_stat = os.stat(source)
+        key = '{}|{}|{!r}'.format(
+            os.path.normcase(os.path.realpath(source)), source_stat.st_size,
+            source_stat.st_mtime)
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+        return hashlib.sha1(key).hexdigest()
+
+    @staticmethod
+    def make_folder(folder):
+        """Create a folder, an existing one is fine."""
+        try:
+            os.makedirs(folder)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    def add_file(self, source, on_progress=None, link_mode=None, hasher=None,
+                 is_running=None, range_parts=1):
+        """Store a source file into the pool unless it's pooled already.
+
+        Args:
+            source (str): Absolute path of the source file.
+            on_progress (callable): Called with number of bytes of every
+                copied chunk.
+            link_mode (str): copier.HARDLINK or copier.REFLINK to link a
+                source on the same volume into the pool.
+            hasher (object): Hash object updated with the file content.
+            is_running (callable): Returns False when the copy should stop.
+            range_parts (int): Number of byte ranges a large file is copied
+                as in parallel.
+        Returns:
+            tuple: (path of the pooled file, True if it was pooled already).
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        if self.key_mode == PATH:
+            pool_path = self.get_path(self.get_path_key(source), source)
+            if os.path.isfile(pool_path):
+                if hasher:
+                    self.read_file(pool_path, on_progress, hasher,
+                                   is_running)
+                elif on_progress:
+                    on_progress(os.path.getsize(pool_path))
+                return pool_path, True
+            self.make_folder(os.path.dirname(pool_path))
+            copy_file(source, pool_path, on_progress, link_mode=link_mode,
+                      hasher=hasher, is_running=is_running,
+                      range_parts=range_parts)
+            return pool_path, False
+        # The key is only known once copied, the file is copied under a
+        # name of this thread first.
+        key_hasher = new_hasher(self.hash_name)
+        incoming = os.path.join(self.folder, 'incoming', '{}_{}{}'.format(
+            os.getpid(), threading.current_thread().ident,
+            os.path.splitext(source)[1]))
+        self.make_folder(os.path.dirname(incoming))
+        copy_file(source, incoming, on_progress, link_mode=link_mode,
+                  hasher=TeeHasher([key_hasher, hasher]),
+                  is_running=is_running)
+        pool_path = self.get_path(key_hasher.hexdigest(), source)
+        with self._lock:
+            if os.path.isfile(pool_path):
+                remove_file(incoming)
+                return pool_path, True
+            self.make_folder(os.path.dirname(pool_path))
+            os.rename(incoming, pool_path)
+        return pool_path, False
+
+    @staticmethod
+    def read_file(path, on_progress=None, hasher=None, is_running=None,
+                  chunk_size=CHUNK_SIZE):
+        """Read a pooled file to hash it and report its chunks.
+
+        Args:
+            path (str): Path of the pooled file.
+            on_progress (callable): Called with number of bytes of every
+                chunk.
+            hasher (object): Hash object updated with the file content.
+            is_running (callable): Returns False when reading should stop.
+            chunk_size (int): Size in bytes of one chunk.
+        Raises:
+            CopyCancelled: If reading been stopped.
+        """
+        with open(path, 'rb') as pooled_file:
+            while True:
+                check_running(is_running, path)
+                chunk = pooled_file.read(chunk_size)
+                if not chunk:
+                    break
+                if hasher:
+                    hasher.update(chunk)
+                if on_progress:
+                    on_progress(len(chunk))
+
+    def copy(self, source, dest, on_progress=None, link_mode=None,
+             hasher=None, is_running=None, range_parts=1):
+        """Store a source into the pool and link the destination to it.
+
+        A destination which can't be linked, like on another volume than
+        the pool, gets a copy of the pooled file.
+
+        Args:
+            source (str): Absolute path of the source file.
+            dest (str): Absolute path of the destination file.
+            on_progress (callable): Called with number of bytes of every
+                copied chunk.
+            link_mode (str): copier.HARDLINK or copier.REFLINK to link a
+                source on the same volume into the pool.
+            hasher (object): Hash object updated with the file content.
+            is_running (callable): Returns False when the copy should stop.
+            range_parts (int): Number of byte ranges a large file is copied
+                as in parallel.
+        Returns:
+            str: POOL if linked to the pooled file, copier.COPY otherwise.
+        Raises:
+            CopyCancelled: If the copy been stopped.
+        """
+        pool_path, pooled = self.add_file(source, on_progress, link_mode,
+                                          hasher, is_running, range_parts)
+        size = os.path.getsize(pool_path)
+        temp_path = get_temp_path(dest)
+        remove_file(temp_path)
+        if hardlink_file(pool_path, temp_path):
+            replace_file(temp_path, dest)
+            mode = POOL
+        else:
+            copy_file(pool_path, dest, is_running=is_running)
+            mode = COPY
+        with self._lock:
+            if not pooled:
+                self.pooled_bytes += size
+            elif mode == POOL:
+                self.deduplicated_bytes += size
+        return mode
+
+    def get_report(self):
+        """str: Bytes written into the pool and bytes deduplicated."""
+        return 'Source pool: {:.1f} MB pooled, {:.1f} MB deduplicated.' \
+            .format(self.pooled_bytes / 1024.0 / 1024.0,
+                    self.deduplicated_bytes / 1024.0 / 1024.0)
@@ -0,0 +1,8 @@
+"""Make the flat modules of this tool importable by its tests."""
+
+# Import built-in modules
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
@@ -0,0 +1,86 @@
+"""Tests of streaming files into archives."""
+
+# Import built-in modules
+import os
+import tarfile
+import zipfile
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+import archive
+from archive import TarArchiveWriter, ZipArchiveWriter
+from copier import CopyCancelled
+
+CHUNK_SIZE = 1024
+
+
+def write_data(path, data):
+    """Write data into a file, return the path."""
+    with open(path, 'wb') as data_file:
+        data_file.write(data)
+    return path
+
+
+def stop_after(count):
+    """Get an is_running callable returning False after count calls."""
+    calls = []
+
+    def is_running():
+        calls.append(True)
+        return len(calls) <= count
+
+    return is_running
+
+
+@pytest.mark.parametrize('name, data', [
+    ('stored.exr', os.urandom(CHUNK_SIZE * 64)),
+    ('deflated.nk', b'compressible ' * CHUNK_SIZE * 8),
+])
+def test_cancelled_zip_member_is_left_out(tmpdir, monkeypatch, name, data):
+    monkeypatch.setattr(archive, 'CHUNK_SIZE', CHUNK_SIZE)
+    source = write_data(str(tmpdir.join(name)), data)
+    kept = write_data(str(tmpdir.join('kept.exr')), b'kept')
+    writer = ZipArchiveWriter(str(tmpdir.mkdir('package')))
+
+    writer.add_file(kept, writer.root + '/kept.exr')
+    with pytest.raises(CopyCancelled):
+        writer.add_file(source, writer.root + '/' + name,
+                        is_running=stop_after(2))
+    writer.add_file(kept, writer.root + '/after.exr')
+    writer.close()
+
+    with zipfile.ZipFile(writer.path) as zip_file:
+        assert zip_file.namelist() == ['kept.exr', 'after.exr']
+        assert zip_file.read('after.exr') == b'kept'
+        assert zip_file.testzip() is None
+
+
+def test_cancelled_tar_member_raises(tmpdir):
+    source = write_data(str(tmpdir.join('source.exr')),
+                        os.urandom(tarfile.RECORDSIZE * 8))
+    writer = TarArchiveWriter(str(tmpdir.mkdir('package')))
+
+    with pytest.raises(CopyCancelled):
+        writer.add_file(source, writer.root + '/source.exr',
+                        is_running=stop_after(2))
+
+
+def test_zip_over_zip64_entry_limit_opens(tmpdir):
+    source = write_data(str(tmpdir.join('frame.exr')), b'frame')
+    writer = ZipArchiveWriter(str(tmpdir.mkdir('package')))
+    count = 0xffff + 2
+
+    for index in range(count):
+        writer.add_file(source, '{}/frame.{:05d}.exr'.format(writer.root,
+                                                            index))
+    writer.close()
+
+    with zipfile.ZipFile(writer.path) as zip_file:
+        infos = zip_file.infolist()
+        assert len(infos) == count
+        assert infos[-1].filename == 'frame.{:05d}.exr'.format(count - 1)
+        assert infos[-1].file_size == len(b'frame')
+        assert zip_file.read(infos[-1]) == b'frame'
+        assert zip_file.read(infos[0]) == b'frame'
@@ -0,0 +1,148 @@
+"""Tests of packaging .nk scripts by batch.package_scripts()."""
+
+# Import built-in modules
+import os
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from batch import package_scripts
+from checksum import verify
+from nk_parser import NkScript
+from scanner import SequencePattern
+from utils import READ_CLASSES, SOURCES_PATH
+
+SCRIPT = '''Root {{
+ inputs 0
+ name {root}/scripts/{name}.nk
+ first_frame 1001
+ last_frame 1002
+}}
+Read {{
+ inputs 0
+ file {root}/src/plate/plate.####.exr
+ first 1001
+ last 1003
+ name Read1
+}}
+Read {{
+ inputs 0
+ file "{root}/src/clip one.mov"
+ name Read2
+}}
+Group {{
+ name Group1
+}}
+ Read {{
+  inputs 0
+  file {{{root}/src/plate/plate.%04d.exr}}
+  first 1001
+  last 1003
+  name Read1
+ }}
+end_group
+Read {{
+ inputs 0
+ file {root}/missing/missing.%04d.exr
+ name Read3
+}}
+'''
+
+FRAMES = (1001, 1002, 1003)
+
+
+@pytest.fixture
+def scripts(tmpdir):
+    """Write two scripts reading the same sources, return their paths."""
+    root = str(tmpdir)
+    os.makedirs(os.path.join(root, 'src', 'plate'))
+    os.makedirs(os.path.join(root, 'scripts'))
+    for frame in FRAMES:
+        write_file(os.path.join(root, 'src', 'plate',
+                                'plate.{}.exr'.format(frame)),
+                   'frame {}'.format(frame))
+    write_file(os.path.join(root, 'src', 'clip one.mov'), 'clip')
+    paths = []
+    for name in ('shot010', 'shot020'):
+        path = os.path.join(root, 'scripts', name + '.nk')
+        write_file(path, SCRIPT.format(root=root.replace('\\', '/'),
+                                       name=name))
+        paths.append(path)
+    return paths
+
+
+def write_file(path, text):
+    """Write text into a file."""
+    with open(path, 'w') as text_file:
+        text_file.write(text)
+
+
+def read_file(path):
+    """Read text of a file."""
+    with open(path, 'r') as text_file:
+        return text_file.read()
+
+
+def get_file_values(script_path):
+    """Get node full name to file knob value of a packaged script."""
+    script = NkScript.read(script_path)
+    return dict((node.fullName(), node['file'].value())
+                for node in script.get_nodes(READ_CLASSES))
+
+
+def get_packaged_path(dest_root, value, frame=None):
+    """Get path a rewritten file knob value resolves to."""
+    assert value.startswith(SOURCES_PATH)
+    path = '{}/sources/{}'.format(dest_root, value[len(SOURCES_PATH):])
+    if frame is None:
+        return path
+    return SequencePattern.parse(path).get_path(frame)
+
+
+def test_file_knobs_point_to_copied_sources(scripts, tmpdir):
+    dest_root = str(tmpdir.join('dest'))
+    source_index, scheduler = package_scripts(scripts, dest_root,
+                                              processes=1, workers=2)
+
+    assert not scheduler.failed
+    # Both scripts share one sources folder, every file is copied once.
+    assert sum(1 for _ in source_index.iter_files()) == 4
+    for script in scripts:
+        dest_nk = '{}/{}'.format(dest_root, os.path.basename(script))
+        values = get_file_values(dest_nk)
+        root = NkScript.read(dest_nk).get_nodes(['Root'])[0]
+        assert root['name'].value() == dest_nk
+        assert values['Read3'] == NkScript.read(script).get_nodes(
+            ['Read'])[-1]['file'].value()
+        # The frame token of each node is kept.
+        assert values['Read1'].endswith('/plate.####.exr')
+        assert values['Group1.Read1'].endswith('/plate.%04d.exr')
+        for node_name in ('Read1', 'Group1.Read1'):
+            for frame in FRAMES:
+                path = get_packaged_path(dest_root, values[node_name], frame)
+                assert read_file(path) == 'frame {}'.format(frame)
+        assert read_file(get_packaged_path(dest_root, values['Read2'])) == \
+            'clip'
+    assert os.path.isfile('{}/copy_log.log'.format(dest_root))
+
+
+def test_trim_copies_frames_in_script_range(scripts, tmpdir):
+    dest_root = str(tmpdir.join('dest'))
+    source_index, _ = package_scripts(scripts, dest_root, processes=1,
+                                      handles=0)
+
+    value = get_file_values('{}/{}'.format(
+        dest_root, os.path.basename(scripts[0])))['Read1']
+    assert [os.path.isfile(get_packaged_path(dest_root, value, frame))
+            for frame in FRAMES] == [True, True, False]
+    assert source_index.trimmed[0] == 1
+
+
+def test_checksum_manifest_matches_copied_files(scripts, tmpdir):
+    dest_root = str(tmpdir.join('dest'))
+    package_scripts(scripts, dest_root, processes=1, hash_name='md5')
+
+    manifest = read_file('{}/checksums.md5'.format(dest_root))
+    assert len(manifest.splitlines()) == 6
+    assert verify(dest_root) == []
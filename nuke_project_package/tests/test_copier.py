@@ -0,0 +1,220 @@
+"""Tests of copying files by copier."""
+
+# Import built-in modules
+import hashlib
+import os
+import threading
+import time
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+import copier
+from copier import (COPY, HARDLINK, KERNEL, REFLINK, ChunkWriter,
+                    CopyCancelled, DestinationStalled, copy_file,
+                    fanout_copy_file, get_temp_path)
+
+CHUNK_SIZE = 1024
+
+
+def write_data(path, size):
+    """Write a file of random data, return the data."""
+    data = os.urandom(size)
+    with open(path, 'wb') as data_file:
+        data_file.write(data)
+    return data
+
+
+def read_data(path):
+    """Read data of a file."""
+    with open(path, 'rb') as data_file:
+        return data_file.read()
+
+
+def stop_after(count):
+    """Get an is_running callable returning False after count calls."""
+    calls = []
+
+    def is_running():
+        calls.append(True)
+        return len(calls) <= count
+
+    return is_running
+
+
+@pytest.fixture(params=['kernel', 'hash', 'range'])
+def copy_kwargs(request, monkeypatch):
+    """Keyword arguments of copy_file() for every way data is copied."""
+    if request.param == 'hash':
+        return {'hasher': hashlib.md5()}
+    if request.param == 'range':
+        monkeypatch.setattr(copier, 'RANGE_MIN_SIZE', CHUNK_SIZE)
+        return {'range_parts': 4}
+    return {}
+
+
+def test_copy_file_writes_whole_file(tmpdir, copy_kwargs):
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    data = write_data(source, CHUNK_SIZE * 16 + 1)
+
+    copy_file(source, dest, chunk_size=CHUNK_SIZE, **copy_kwargs)
+
+    assert read_data(dest) == data
+    assert not os.path.exists(get_temp_path(dest))
+
+
+def test_cancelled_copy_leaves_no_file(tmpdir, copy_kwargs):
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    write_data(source, CHUNK_SIZE * 16)
+
+    with pytest.raises(CopyCancelled):
+        copy_file(source, dest, chunk_size=CHUNK_SIZE,
+                  is_running=stop_after(3), **copy_kwargs)
+
+    assert sorted(os.listdir(str(tmpdir))) == ['source.exr']
+
+
+def test_cancelled_copy_keeps_previous_destination(tmpdir, copy_kwargs):
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    write_data(source, CHUNK_SIZE * 16)
+    previous = write_data(dest, 10)
+
+    with pytest.raises(CopyCancelled):
+        copy_file(source, dest, chunk_size=CHUNK_SIZE,
+                  is_running=stop_after(3), **copy_kwargs)
+
+    assert read_data(dest) == previous
+    assert not os.path.exists(get_temp_path(dest))
+
+
+def test_hardlink_mode_links_source(tmpdir):
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    data = write_data(source, CHUNK_SIZE * 4)
+    hasher = hashlib.md5()
+    progress = []
+
+    mode = copy_file(source, dest, progress.append, CHUNK_SIZE,
+                     link_mode=HARDLINK, hasher=hasher)
+
+    assert mode == HARDLINK
+    assert os.path.samefile(source, dest)
+    assert hasher.hexdigest() == hashlib.md5(data).hexdigest()
+    assert sum(progress) == len(data)
+    assert sorted(os.listdir(str(tmpdir))) == ['dest.exr', 'source.exr']
+
+
+def test_hardlink_replaces_previous_link_of_same_source(tmpdir):
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    write_data(source, CHUNK_SIZE)
+    copy_file(source, dest, link_mode=HARDLINK)
+
+    assert copy_file(source, dest, link_mode=HARDLINK) == HARDLINK
+    assert os.path.samefile(source, dest)
+    assert not os.path.exists(get_temp_path(dest))
+
+
+class FailingIoctl(object):
+    """fcntl stand-in of a file system which can't clone files."""
+
+    @staticmethod
+    def ioctl(fd, request, arg):
+        raise IOError(95, 'Operation not supported')
+
+
+def test_reflink_falls_back_to_copy(tmpdir, monkeypatch):
+    monkeypatch.setattr(copier, 'fcntl', FailingIoctl)
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    data = write_data(source, CHUNK_SIZE * 4)
+
+    mode = copy_file(source, dest, chunk_size=CHUNK_SIZE,
+                     link_mode=REFLINK)
+
+    assert mode in (KERNEL, COPY)
+    assert read_data(dest) == data
+    assert not os.path.samefile(source, dest)
+    assert sorted(os.listdir(str(tmpdir))) == ['dest.exr', 'source.exr']
+
+
+@pytest.mark.parametrize('link_mode', [HARDLINK, REFLINK])
+def test_link_modes_copy_across_volumes(tmpdir, monkeypatch, link_mode):
+    monkeypatch.setattr(copier, 'is_same_device', lambda source, dest: False)
+    source = str(tmpdir.join('source.exr'))
+    dest = str(tmpdir.join('dest.exr'))
+    data = write_data(source, CHUNK_SIZE * 4)
+
+    mode = copy_file(source, dest, chunk_size=CHUNK_SIZE,
+                     link_mode=link_mode)
+
+    assert mode in (KERNEL, COPY)
+    assert read_data(dest) == data
+    assert not os.path.samefile(source, dest)
+
+
+def test_fanout_gives_up_stalled_destination(tmpdir, monkeypatch):
+    source = str(tmpdir.join('source.exr'))
+    data = write_data(source, CHUNK_SIZE * 16)
+    dests = [str(tmpdir.mkdir(name).join('dest.exr'))
+             for name in ('fast', 'stalled')]
+    release = threading.Event()
+    run = ChunkWriter.run
+
+    def hanging_run(writer):
+        if os.path.dirname(writer.path) == os.path.dirname(dests[1]):
+            release.wait()
+        run(writer)
+
+    monkeypatch.setattr(ChunkWriter, 'run', hanging_run)
+    start = time.time()
+    try:
+        results = fanout_copy_file(source, dests, chunk_size=CHUNK_SIZE,
+                                   max_chunks=1, stall_timeout=0.2)
+    finally:
+        release.set()
+
+    assert time.time() - start < 5
+    assert results[dests[0]] == COPY
+    assert read_data(dests[0]) == data
+    assert isinstance(results[dests[1]], DestinationStalled)
+    assert not os.path.exists(dests[1])
+
+
+class SlowClosingFile(object):
+    """File object stand-in takes a while to be closed, like a flush to a
+    slow network volume."""
+
+    def __init__(self, file_obj, delay):
+        self.file_obj = file_obj
+        self.delay = delay
+
+    def __enter__(self):
+        return self.file_obj
+
+    def __exit__(self, *args):
+        time.sleep(self.delay)
+        self.file_obj.close()
+
+
+def test_fanout_waits_for_slow_close_of_last_chunk(tmpdir, monkeypatch):
+    source = str(tmpdir.join('source.exr'))
+    data = write_data(source, CHUNK_SIZE * 4)
+    dest = str(tmpdir.join('dest.exr'))
+
+    def slow_open(path, mode='r'):
+        if path == get_temp_path(dest):
+            return SlowClosingFile(open(path, mode), 1.0)
+        return open(path, mode)
+
+    monkeypatch.setattr(copier, 'open', slow_open, raising=False)
+
+    results = fanout_copy_file(source, [dest], chunk_size=CHUNK_SIZE,
+                               stall_timeout=0.2)
+
+    assert results == {dest: COPY}
+    assert read_data(dest) == data
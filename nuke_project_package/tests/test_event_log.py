@@ -0,0 +1,150 @@
+"""Tests of the journal event writer and the copy log renderer."""
+
+# Import built-in modules
+from collections import OrderedDict
+import io
+import json
+import time
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+import event_log
+from event_log import (COPY, ERROR_NODE, RUN, SEQUENCE, SINGLE,
+                       CopiedSequence, EventWriter, iter_events, render_log)
+from journal import CopyJournal
+
+
+class Unserializable(object):
+    """Value json can't encode, fails the writer."""
+
+
+def render(events):
+    """Render the copy log of events into a string."""
+    log_file = io.StringIO() if str is not bytes else io.BytesIO()
+    render_log(iter(events), log_file)
+    return log_file.getvalue()
+
+
+def copy_event(source, dest, sequence=None, mode=COPY, node='Read1'):
+    """Get a copy event."""
+    return OrderedDict([('event', COPY), ('node', node), ('source', source),
+                        ('dest', dest), ('sequence', sequence),
+                        ('mode', mode)])
+
+
+def frame_event(frame, mode=COPY):
+    """Get copy event of a frame of the plate sequence."""
+    name = 'plate.{:04d}.exr'.format(frame)
+    return copy_event('/src/plate/' + name, '/dest/sources/plate/' + name,
+                      'plate', mode)
+
+
+def test_writer_writes_all_events_in_order(tmpdir):
+    path = str(tmpdir.join('journal'))
+    # A queue of one event makes every write wait for the writer.
+    writer = EventWriter(path, max_events=1, flush_size=7)
+    for index in range(100):
+        writer.write({'index': index})
+    writer.close()
+
+    assert [event['index'] for event in iter_events(path)] == \
+        list(range(100))
+
+
+def test_iter_events_skips_cut_off_line(tmpdir):
+    path = tmpdir.join('journal')
+    path.write(json.dumps({'index': 0}) + '\n{"index": ')
+
+    assert list(iter_events(str(path))) == [{'index': 0}]
+
+
+def test_failed_writer_drops_events_and_raises_on_close(tmpdir):
+    path = str(tmpdir.join('journal'))
+    writer = EventWriter(path, max_events=2)
+    writer.write({'index': 0})
+    writer.write({'index': Unserializable()})
+    start = time.time()
+    # Far more events than the queue holds, none of them waits.
+    for index in range(1, 100):
+        writer.write({'index': index})
+    with pytest.raises(IOError):
+        writer.close()
+
+    assert time.time() - start < event_log.PUT_INTERVAL * 10
+    assert writer.error is not None
+    assert [event['index'] for event in iter_events(path)] == [0]
+
+
+def test_copied_sequence_last_copy_of_frame_wins():
+    sequence = CopiedSequence('Read1', '/src/plate/plate.1001.exr')
+    # Enough frames to be merged in several batches.
+    frames = range(1001, 1001 + event_log.FLUSH_SIZE * 2)
+    for frame in frames:
+        sequence.add('/src/plate/plate.{:04d}.exr'.format(frame), COPY)
+    for frame in range(1001, 1011):
+        sequence.add('/src/plate/plate.{:04d}.exr'.format(frame),
+                     'hardlink')
+    sequence.add('/src/plate/other.1001.exr', COPY)
+
+    assert str(sequence.frames) == '1001-{}'.format(frames[-1])
+    assert str(sequence.modes['hardlink']) == '1001-1010'
+    assert str(sequence.modes[COPY]) == '1011-{}'.format(frames[-1])
+
+
+def test_render_log_lists_last_run_and_all_copies():
+    events = [
+        {'event': RUN},
+        {'event': ERROR_NODE, 'node': 'OldRead'},
+        frame_event(1001),
+        frame_event(1002),
+        copy_event('/src/clip.mov', '/dest/sources/clip.mov', node='Read2'),
+        {'event': RUN},
+        {'event': ERROR_NODE, 'node': 'Read3'},
+        frame_event(1002, 'hardlink'),
+        frame_event(1004, 'hardlink'),
+        # Old journals have no event type and no mode.
+        {'node': 'Read4', 'source': '/src/old.mov',
+         'dest': '/dest/sources/old.mov', 'sequence': None},
+        {'event': SEQUENCE, 'folder': 'plate', 'nodes': 'Read1, Read5',
+         'pattern': '/src/plate/plate.%04d.exr', 'frames': '1001-1004',
+         'first': 1001, 'last': 1004, 'missing': '1003'},
+        {'event': SINGLE, 'nodes': 'Read2, Read6', 'source': '/src/clip.mov',
+         'dest': 'clip.mov'},
+    ]
+
+    assert render(events) == '\n'.join([
+        'Nodes with error:',
+        'Read3',
+        '',
+        'Read2, Read6',
+        '/src/clip.mov',
+        '',
+        'Read4',
+        '/src/old.mov',
+        '',
+        'Read1, Read5 (missing frames 1003)',
+        '/src/plate/plate.%04d.exr 1001-1002 1004 (3/4 frames copied)',
+        '',
+        'Copy modes:',
+        'copy: 3 file(s)',
+        'hardlink: 2 file(s)'])
+
+
+def test_render_log_of_no_event_is_empty():
+    assert render([{'event': RUN}]) == ''
+
+
+def test_log_is_rendered_after_journal_failed(tmpdir):
+    dest_root = str(tmpdir)
+    journal = CopyJournal(dest_root)
+    journal.open()
+    journal.log_collection(['Read3'], {})
+    journal.log_collection([Unserializable()], {})
+    with pytest.raises(IOError):
+        journal.close()
+    journal.save_log()
+
+    assert tmpdir.join(event_log.LOG_FILE_NAME).read() == \
+        'Nodes with error:\nRead3'
@@ -0,0 +1,88 @@
+"""Tests of frame sets held as runs of frames."""
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from frames import FrameSet, merge_runs
+
+
+def test_frames_are_held_as_runs():
+    frame_set = FrameSet([9, 5, 1, 3, 2, 8, 2])
+
+    assert frame_set.runs == [(1, 3), (5, 5), (8, 9)]
+    assert str(frame_set) == '1-3 5 8-9'
+    assert list(frame_set) == [1, 2, 3, 5, 8, 9]
+    assert len(frame_set) == 6
+    assert (frame_set.first, frame_set.last) == (1, 9)
+
+
+def test_empty_frame_set():
+    frame_set = FrameSet()
+
+    assert frame_set.runs == []
+    assert str(frame_set) == ''
+    assert len(frame_set) == 0
+    assert frame_set.first is None and frame_set.last is None
+    assert 1 not in frame_set
+
+
+def test_update_merges_adjacent_and_overlapping_frames():
+    frame_set = FrameSet([1, 2, 10])
+
+    frame_set.update([3, 4, 9, 20])
+    frame_set.update([])
+
+    assert str(frame_set) == '1-4 9-10 20'
+
+
+@pytest.mark.parametrize('runs, merged', [
+    ([(5, 10), (1, 4), (8, 12)], [(1, 12)]),
+    ([(1, 3), (5, 6)], [(1, 3), (5, 6)]),
+    ([(1, 10), (2, 3)], [(1, 10)]),
+    ([(-5, -1), (0, 0)], [(-5, 0)]),
+    ([], []),
+])
+def test_merge_runs(runs, merged):
+    assert merge_runs(runs) == merged
+    assert FrameSet.from_runs(runs).runs == merged
+
+
+def test_contains():
+    frame_set = FrameSet.from_runs([(1, 3), (10, 20)])
+
+    assert [frame for frame in range(0, 22) if frame in frame_set] == \
+        [1, 2, 3] + list(range(10, 21))
+
+
+@pytest.mark.parametrize('frames, other, difference', [
+    ('1-10', '3-4 8', '1-2 5-7 9-10'),
+    ('1-10', '1-10', ''),
+    ('1-10', '-5-20', ''),
+    ('1-10', '', '1-10'),
+    ('5-10', '1-2 20-30', '5-10'),
+    ('1-5 7-10', '4-8', '1-3 9-10'),
+    ('1-3 5 8-9', '2 5 9', '1 3 8'),
+    ('-10--1', '-5', '-10--6 -4--1'),
+])
+def test_difference(frames, other, difference):
+    result = FrameSet.parse(frames).difference(FrameSet.parse(other))
+
+    assert str(result) == difference
+
+
+@pytest.mark.parametrize('text, runs', [
+    ('1-5 8 10-20', [(1, 5), (8, 8), (10, 20)]),
+    ('-10--1 3', [(-10, -1), (3, 3)]),
+    ('8 1-5 3-6', [(1, 6), (8, 8)]),
+    ('1-2 frames x-3 4', [(1, 2), (4, 4)]),
+    ('', []),
+])
+def test_parse(text, runs):
+    assert FrameSet.parse(text).runs == runs
+
+
+def test_parse_round_trips_str():
+    frame_set = FrameSet([-3, -2, 0, 1, 2, 7, 1001, 1002])
+
+    assert FrameSet.parse(str(frame_set)).runs == frame_set.runs
@@ -0,0 +1,88 @@
+"""Tests of packaging again into the destination of a previous run."""
+
+# Import built-in modules
+import os
+
+# Import local modules
+from journal import CopyJournal
+from scheduler import CopyScheduler, CopyTask
+
+
+def write_file(path, text):
+    """Write text into a file."""
+    with open(path, 'w') as text_file:
+        text_file.write(text)
+
+
+def read_file(path):
+    """Read text of a file."""
+    with open(path, 'r') as text_file:
+        return text_file.read()
+
+
+def package(src, dest_root, names):
+    """Copy sources of given names into destination root like batch does,
+    files of previous runs not among them are pruned.
+
+    Returns:
+        tuple: (CopyJournal, paths of pruned files)
+    """
+    if not os.path.isdir(dest_root):
+        os.makedirs(dest_root)
+    journal = CopyJournal(dest_root)
+    journal.open()
+    scheduler = CopyScheduler(1, journal)
+    scheduler.add_files([('Read{}'.format(index), os.path.join(src, name),
+                          name, 1, None)
+                         for index, name in enumerate(names)],
+                        dest_root, block=False)
+    scheduler.close()
+    scheduler.run_worker(lambda: True, lambda task: None)
+    removed = journal.prune(scheduler.dests)
+    journal.close()
+    return journal, removed
+
+
+def test_second_run_skips_copied_and_prunes_dropped_files(tmpdir):
+    src = str(tmpdir.mkdir('src'))
+    dest_root = str(tmpdir.join('dest'))
+    sources = '{}/sources'.format(dest_root)
+    for name in ('same.mov', 'changed.mov', 'dropped.mov'):
+        write_file(os.path.join(src, name), name)
+    package(src, dest_root, ['same.mov', 'changed.mov', 'dropped.mov'])
+    # Same size as the source, the content shows if it been copied again.
+    write_file('{}/same.mov'.format(sources), 'SAME.MOV')
+    write_file(os.path.join(src, 'changed.mov'), 'changed again')
+    write_file(os.path.join(src, 'added.mov'), 'added.mov')
+
+    journal, removed = package(src, dest_root,
+                               ['same.mov', 'changed.mov', 'added.mov'])
+
+    assert read_file('{}/same.mov'.format(sources)) == 'SAME.MOV'
+    assert read_file('{}/changed.mov'.format(sources)) == 'changed again'
+    assert read_file('{}/added.mov'.format(sources)) == 'added.mov'
+    assert removed == ['{}/dropped.mov'.format(sources)]
+    assert sorted(os.listdir(sources)) == ['added.mov', 'changed.mov',
+                                           'same.mov']
+    expected = sorted('{}/{}'.format(sources, name) for name in
+                      ('same.mov', 'changed.mov', 'added.mov'))
+    assert sorted(journal.entries) == expected
+    assert sorted(CopyJournal(dest_root).entries) == expected
+
+
+def test_is_copied_checks_source_and_destination(tmpdir):
+    src = str(tmpdir.mkdir('src'))
+    dest_root = str(tmpdir.join('dest'))
+    write_file(os.path.join(src, 'plate.exr'), 'plate')
+    journal, _ = package(src, dest_root, ['plate.exr'])
+    dest = '{}/sources/plate.exr'.format(dest_root)
+    source = os.path.join(src, 'plate.exr')
+
+    assert journal.is_copied(CopyTask('Read1', source, dest, 5))
+    other_source = os.path.join(src, 'other.exr')
+    assert not journal.is_copied(CopyTask('Read1', other_source, dest, 5))
+    os.utime(source, (1000, 1000))
+    assert not journal.is_copied(CopyTask('Read1', source, dest, 5))
+    os.remove(dest)
+    assert not CopyJournal(dest_root).is_copied(
+        CopyTask('Read1', source, dest, 5))
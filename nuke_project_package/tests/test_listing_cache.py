@@ -0,0 +1,99 @@
+"""Tests of the persistent cache of directory listings."""
+
+# Import built-in modules
+import os
+import time
+
+# Import local modules
+import listing_cache
+from listing_cache import ListingCache
+from scanner import SequencePattern, SequenceScanner
+
+# Mtime of a directory settled long ago.
+OLD_MTIME = 1000.0
+
+
+def test_listing_is_valid_while_mtime_is_unchanged(tmpdir):
+    cache = ListingCache(str(tmpdir.join('listings.json')))
+    cache.add('/shots/a', OLD_MTIME, {'plate.0001.exr': 10})
+
+    assert cache.get('/shots/a', OLD_MTIME) == {'plate.0001.exr': 10}
+    assert cache.get('/shots/a', OLD_MTIME + 1) is None
+    assert cache.get('/shots/b', OLD_MTIME) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_recently_modified_directory_is_not_cached(tmpdir, monkeypatch):
+    monkeypatch.setattr(listing_cache, 'SETTLE_SECONDS', 60.0)
+    cache = ListingCache(str(tmpdir.join('listings.json')))
+    now = time.time()
+
+    cache.add('/shots/new', now - 30, {'plate.0001.exr': 10})
+    cache.add('/shots/settled', now - 90, {'plate.0001.exr': 10})
+
+    assert list(cache.entries) == ['/shots/settled']
+    assert cache.file_count == 1
+
+
+def test_least_recently_used_listings_are_evicted(tmpdir):
+    cache = ListingCache(str(tmpdir.join('listings.json')), max_files=3)
+    cache.add('/a', OLD_MTIME, {'1': 1, '2': 2})
+    cache.add('/b', OLD_MTIME, {'1': 1})
+    cache.get('/a', OLD_MTIME)
+
+    cache.add('/c', OLD_MTIME, {'1': 1})
+
+    assert list(cache.entries) == ['/a', '/c']
+    assert cache.file_count == 3
+
+
+def test_listing_added_again_replaces_file_count(tmpdir):
+    cache = ListingCache(str(tmpdir.join('listings.json')), max_files=3)
+    cache.add('/a', OLD_MTIME, {'1': 1, '2': 2})
+    cache.add('/b', OLD_MTIME, {'1': 1})
+
+    cache.add('/a', OLD_MTIME + 1, {'1': 1})
+
+    assert list(cache.entries) == ['/b', '/a']
+    assert cache.file_count == 2
+
+
+def test_cache_is_saved_and_loaded(tmpdir):
+    path = str(tmpdir.join('cache', 'listings.json'))
+    cache = ListingCache(path)
+    cache.add('/a', OLD_MTIME, {'plate.0001.exr': 10})
+    cache.save()
+
+    loaded = ListingCache(path).load()
+
+    assert loaded.get('/a', OLD_MTIME) == {'plate.0001.exr': 10}
+
+
+def test_broken_or_old_cache_file_is_ignored(tmpdir):
+    path = tmpdir.join('listings.json')
+    path.write('{"version": 1, "entries": [["/a", 1000.0, {}]]}')
+    assert ListingCache(str(path)).load().entries == {}
+
+    path.write('not json')
+    assert ListingCache(str(path)).load().entries == {}
+
+
+def test_scanner_lists_unchanged_directory_from_cache(tmpdir):
+    frames = tmpdir.mkdir('frames')
+    frames.join('plate.0001.exr').write('x')
+    os.utime(str(frames), (OLD_MTIME, OLD_MTIME))
+    pattern = SequencePattern.parse(str(frames.join('plate.####.exr')))
+    path = str(tmpdir.join('listings.json'))
+    scanner = SequenceScanner(ListingCache(path))
+    scanner.scan(pattern, 1, 1)
+    scanner.save_cache()
+    # Rewritten in place without changing the directory mtime, the cached
+    # size is still used.
+    frames.join('plate.0001.exr').write('xxx')
+    os.utime(str(frames), (OLD_MTIME, OLD_MTIME))
+
+    cache = ListingCache(path).load()
+    result = SequenceScanner(cache).scan(pattern, 1, 1)
+
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert result.total_bytes == 1
@@ -0,0 +1,110 @@
+"""Tests of parsing sequence paths and scanning their directories."""
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from scanner import SequencePattern, SequenceScanner
+
+
+@pytest.mark.parametrize('path, token, padding', [
+    ('/shots/a/plate.%04d.exr', '%04d', 4),
+    ('/shots/a/plate.%d.exr', '%d', 1),
+    ('/shots/a/plate.####.exr', '####', 4),
+    ('/shots/a/plate.#.exr', '#', 1),
+    ('/shots/a/plate.$F4.exr', '$F4', 4),
+    ('/shots/a/plate.$F.exr', '$F', 1),
+])
+def test_parse_frame_tokens(path, token, padding):
+    pattern = SequencePattern.parse(path)
+
+    assert pattern.token == token
+    assert pattern.padding == padding
+    assert pattern.dirname == '/shots/a'
+    assert pattern.prefix == 'plate.'
+    assert pattern.suffix == '.exr'
+
+
+@pytest.mark.parametrize('path', [
+    '/shots/a/plate.exr',
+    '/shots/%04d/plate.exr',
+])
+def test_parse_path_without_frame_token(path):
+    assert SequencePattern.parse(path) is None
+
+
+def test_parse_takes_last_token_of_file_name():
+    pattern = SequencePattern.parse('/shots/v%02d/plate_%02d.%04d.exr')
+
+    assert pattern.token == '%04d'
+    assert pattern.dirname == '/shots/v%02d'
+    assert pattern.prefix == 'plate_%02d.'
+
+
+def test_printf_path():
+    pattern = SequencePattern.parse('/shots/a/plate.###.exr')
+
+    assert pattern.printf_path == '/shots/a/plate.%03d.exr'
+
+
+@pytest.mark.parametrize('frame, name', [
+    (5, 'plate.0005.exr'),
+    (0, 'plate.0000.exr'),
+    (12345, 'plate.12345.exr'),
+    (-5, 'plate.-0005.exr'),
+])
+def test_name_of_frame_is_padded(frame, name):
+    pattern = SequencePattern.parse('/shots/a/plate.%04d.exr')
+
+    assert pattern.get_name(frame) == name
+    assert pattern.get_path(frame) == '/shots/a/' + name
+    assert pattern.match(name) == frame
+
+
+@pytest.mark.parametrize('path, name', [
+    ('plate.%04d.exr', 'plate.05.exr'),
+    ('plate.%04d.exr', 'plate.00005.exr'),
+    ('plate.%04d.exr', 'other.0005.exr'),
+    ('plate.%04d.exr', 'plate.0005.exr.bak'),
+    ('plate.%d.exr', 'plate.05.exr'),
+])
+def test_match_rejects_other_names(path, name):
+    assert SequencePattern.parse(path).match(name) is None
+
+
+def test_unpadded_pattern_matches_any_width():
+    pattern = SequencePattern.parse('plate.%d.exr')
+
+    assert pattern.match('plate.5.exr') == 5
+    assert pattern.match('plate.1001.exr') == 1001
+
+
+def test_scan_finds_present_frames(tmpdir):
+    for frame in (1, 2, 4, 9):
+        tmpdir.join('plate.{:04d}.exr'.format(frame)).write('x' * frame)
+    tmpdir.join('plate.03.exr').write('x')
+    tmpdir.join('plate.0003.exr.bak').write('x')
+    pattern = SequencePattern.parse(str(tmpdir.join('plate.####.exr')))
+
+    result = SequenceScanner().scan(pattern, 1, 5)
+
+    assert str(result.frames) == '1-2 4'
+    assert str(result.missing) == '3 5'
+    assert result.total_bytes == 1 + 2 + 4
+    assert list(result.files) == [pattern.get_path(frame)
+                                  for frame in (1, 2, 4)]
+    assert str(result.get_range(2, 5).frames) == '2 4'
+
+
+def test_scanner_lists_directory_once(tmpdir, monkeypatch):
+    tmpdir.join('plate.0001.exr').write('x')
+    scanner = SequenceScanner()
+    listed = []
+    list_dir = SequenceScanner._list_dir
+    monkeypatch.setattr(SequenceScanner, '_list_dir', staticmethod(
+        lambda dirname: listed.append(dirname) or list_dir(dirname)))
+
+    for path in ('plate.####.exr', 'plate.%04d.exr', 'other.#.exr'):
+        scanner.scan(SequencePattern.parse(str(tmpdir.join(path))), 1, 1)
+
+    assert len(listed) == 1
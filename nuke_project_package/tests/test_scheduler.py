@@ -0,0 +1,106 @@
+"""Tests of copying tasks by CopyScheduler.run_worker()."""
+
+# Import built-in modules
+import os
+
+# Import local modules
+from copier import CHUNK_SIZE
+from journal import CopyJournal
+from scheduler import CopyScheduler
+
+
+def write_file(path, text):
+    """Write text into a file."""
+    with open(path, 'w') as text_file:
+        text_file.write(text)
+
+
+def read_file(path):
+    """Read text of a file."""
+    with open(path, 'r') as text_file:
+        return text_file.read()
+
+
+def add_sources(scheduler, src, dest_root, names):
+    """Add sources of given names, the larger ones are copied first."""
+    scheduler.add_files([('Read{}'.format(index), os.path.join(src, name),
+                          name, len(names) - index, None)
+                         for index, name in enumerate(names)],
+                        dest_root, block=False)
+    scheduler.close()
+
+
+def test_unreadable_source_does_not_stop_worker(tmpdir):
+    src = str(tmpdir.mkdir('src'))
+    dest_root = str(tmpdir.join('dest'))
+    write_file(os.path.join(src, 'valid.mov'), 'valid')
+    journal = CopyJournal(dest_root)
+    scheduler = CopyScheduler(1, journal)
+    add_sources(scheduler, src, dest_root, ['missing.mov', 'valid.mov'])
+    copied = []
+
+    scheduler.run_worker(lambda: True, copied.append)
+
+    missing_dest = '{}/sources/missing.mov'.format(dest_root)
+    valid_dest = '{}/sources/valid.mov'.format(dest_root)
+    assert [dest for dest, _ in scheduler.failed] == [missing_dest]
+    assert read_file(valid_dest) == 'valid'
+    assert list(journal.entries) == [valid_dest]
+    assert len(copied) == 2
+
+
+def test_unreadable_source_fails_every_mirror(tmpdir):
+    src = str(tmpdir.mkdir('src'))
+    dest_root = str(tmpdir.join('dest'))
+    mirror_root = str(tmpdir.join('mirror'))
+    write_file(os.path.join(src, 'valid.mov'), 'valid')
+    mirror = CopyJournal(mirror_root)
+    scheduler = CopyScheduler(1, CopyJournal(dest_root), mirrors=[mirror])
+    add_sources(scheduler, src, dest_root, ['missing.mov', 'valid.mov'])
+
+    scheduler.run_worker(lambda: True, lambda task: None)
+
+    assert sorted(dest for dest, _ in scheduler.failed) == [
+        '{}/sources/missing.mov'.format(root)
+        for root in (dest_root, mirror_root)]
+    assert read_file('{}/sources/valid.mov'.format(mirror_root)) == 'valid'
+
+
+class StopAfterBytes(object):
+    """Progress stand-in stops the copy once some bytes been copied."""
+
+    def __init__(self):
+        self.copied = 0
+
+    def add_total(self, size):
+        pass
+
+    def add_bytes(self, count):
+        self.copied += count
+
+    def add_file(self, source):
+        pass
+
+    def is_running(self):
+        return not self.copied
+
+
+def test_cancelled_copy_is_not_journaled(tmpdir):
+    src = str(tmpdir.mkdir('src'))
+    dest_root = str(tmpdir.join('dest'))
+    # Larger than one chunk, so the copy stops within the file.
+    with open(os.path.join(src, 'plate.exr'), 'wb') as data_file:
+        data_file.write(os.urandom(3 * CHUNK_SIZE))
+    journal = CopyJournal(dest_root)
+    progress = StopAfterBytes()
+    scheduler = CopyScheduler(1, journal, progress)
+    add_sources(scheduler, src, dest_root, ['plate.exr'])
+    copied = []
+
+    scheduler.run_worker(progress.is_running, copied.append)
+
+    assert 0 < progress.copied < 3 * CHUNK_SIZE
+    assert os.listdir('{}/sources'.format(dest_root)) == []
+    assert not journal.entries
+    assert not scheduler.failed
+    assert copied == []
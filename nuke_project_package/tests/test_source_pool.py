@@ -0,0 +1,95 @@
+"""Tests of sources stored once in a shared pool."""
+
+# Import built-in modules
+import hashlib
+import os
+
+# Import local modules
+import source_pool
+from source_pool import CONTENT, PATH, POOL, SourcePool
+
+
+def write_file(path, text):
+    """Write text into a file, return the path."""
+    with open(path, 'w') as text_file:
+        text_file.write(text)
+    return path
+
+
+def read_file(path):
+    """Read text of a file."""
+    with open(path, 'r') as text_file:
+        return text_file.read()
+
+
+def test_content_key_stores_identical_files_once(tmpdir):
+    src = tmpdir.mkdir('src')
+    first = write_file(str(src.mkdir('a').join('plate.exr')), 'plate')
+    second = write_file(str(src.mkdir('b').join('plate.exr')), 'plate')
+    other = write_file(str(src.join('other.exr')), 'other')
+    pool = SourcePool(str(tmpdir), CONTENT)
+    dests = [str(tmpdir.mkdir(name).join('plate.exr'))
+             for name in ('first', 'second', 'other')]
+
+    modes = [pool.copy(source, dest) for source, dest in
+             zip((first, second, other), dests)]
+
+    assert modes == [POOL] * 3
+    key = hashlib.sha256(b'plate').hexdigest()
+    pool_path = pool.get_path(key, first)
+    assert pool_path == os.path.join(pool.folder, key[:2], key + '.exr')
+    assert os.path.samefile(dests[0], pool_path)
+    assert os.path.samefile(dests[1], pool_path)
+    assert not os.path.samefile(dests[2], pool_path)
+    assert read_file(dests[2]) == 'other'
+    assert pool.pooled_bytes == len('plate') + len('other')
+    assert pool.deduplicated_bytes == len('plate')
+    assert os.listdir(os.path.join(pool.folder, 'incoming')) == []
+
+
+def test_path_key_skips_reading_pooled_source(tmpdir, monkeypatch):
+    source = write_file(str(tmpdir.join('plate.exr')), 'plate')
+    pool = SourcePool(str(tmpdir), PATH)
+    pool_path, pooled = pool.add_file(source)
+    assert not pooled
+    copied = []
+    monkeypatch.setattr(source_pool, 'copy_file',
+                        lambda *args, **kwargs: copied.append(args))
+    hasher = hashlib.md5()
+    progress = []
+
+    assert pool.add_file(source, progress.append, hasher=hasher) == (
+        pool_path, True)
+    assert copied == []
+    # Digest and progress of a pooled source come from the pooled file.
+    assert hasher.hexdigest() == hashlib.md5(b'plate').hexdigest()
+    assert sum(progress) == len('plate')
+
+
+def test_path_key_changes_with_source(tmpdir):
+    source = write_file(str(tmpdir.join('plate.exr')), 'plate')
+    other = write_file(str(tmpdir.join('other.exr')), 'plate')
+    key = SourcePool.get_path_key(source)
+
+    assert SourcePool.get_path_key(source) == key
+    assert SourcePool.get_path_key(other) != key
+    os.utime(source, (1000, 1000))
+    assert SourcePool.get_path_key(source) != key
+    write_file(source, 'plate v2')
+    os.utime(source, (1000, 1000))
+    assert SourcePool.get_path_key(source) != key
+
+
+def test_path_key_stores_modified_source_again(tmpdir):
+    source = write_file(str(tmpdir.join('plate.exr')), 'plate')
+    pool = SourcePool(str(tmpdir), PATH)
+    dest = str(tmpdir.mkdir('package').join('plate.exr'))
+    pool.copy(source, dest)
+    write_file(source, 'plate v2')
+    os.utime(source, (1000, 1000))
+
+    assert pool.copy(source, dest) == POOL
+
+    assert read_file(dest) == 'plate v2'
+    assert pool.deduplicated_bytes == 0
+    assert pool.pooled_bytes == len('plate') + len('plate v2')
@@ -1,9 +1,5 @@
 """Module includes custom thread classes for this tool."""
 
-# Import built-in modules
-import os
-import shutil
-
 # Import third-party modules
 try:
     from PySide import QtCore
@@ -11,171 +7,129 @@ except ImportError:
     from PySide2 import QtCore
 
 # Import local modules
+from listing_cache import ListingCache
 from model import NukePackageWrapper
-import utils
 
 
 class CollectThread(QtCore.QThread):
-    """Worker thread to collect sources' information from node tree."""
+    """Worker thread to collect sources' information from node tree.
+
+    Files of every collected node are added to the copy scheduler right
+    away, so copy workers start while the rest of nodes are collected.
+    Source directory listings are cached between sessions.
+    """
 
     # Qt signal emitted when finish or stop this copy process.
     finish = QtCore.Signal()
 
-    def __init__(self, dest_root):
+    def __init__(self, dest_root, scheduler, incremental=False,
+                 handles=None):
         """Initialize collector thread.
 
         Args:
             dest_root (str): Destination root folder path.
+            scheduler (CopyScheduler): Scheduler to add collected files to,
+                closed once collecting is done or stopped.
+            incremental (bool): Whether to repackage incrementally against
+                the previous package in destination root folder.
+            handles (int): Number of frames kept before and after the frame
+                range of the script, None to collect all frames.
         """
         super(CollectThread, self).__init__()
         self.package_wrapper = None
         self.dest_root = dest_root
+        self.scheduler = scheduler
+        self.incremental = incremental
+        self.handles = handles
         self.run_flag = True
         self.index = 0
-        self.log = []
 
     def run(self):
         """Collect all source information from current nuke scene."""
-        self.package_wrapper = NukePackageWrapper(self.dest_root)
+        self.package_wrapper = NukePackageWrapper(self.dest_root,
+                                                  self.incremental,
+                                                  self.handles,
+                                                  ListingCache().load())
+
+        source_index = self.package_wrapper.source_index
 
         while self.run_flag and self.index < len(self.package_wrapper.nodes):
             self.package_wrapper.grab_source(self.index)
+            self.scheduler.add_files(source_index.pop_new_files(),
+                                     self.dest_root,
+                                     lambda: self.run_flag)
             self.index += 1
 
-        if self.package_wrapper.error_nodes:
-            self.log.append('\n\nNodes with error:')
-
-        for node in self.package_wrapper.error_nodes:
-            self.log.append('\n{}'.format(node.name()))
-
+        self.scheduler.close()
+        self.package_wrapper.scanner.save_cache()
         self.finish.emit()
 
 
-class SingleCopyThread(QtCore.QThread):
-    """Worker thread to copy a list of single file."""
+class CopyWorkerThread(QtCore.QThread):
+    """Worker thread to copy files taken from the copy scheduler."""
 
     # Qt signal emitted when finish or stop this copy process.
     finish = QtCore.Signal()
-    # Qt signal emitted when one file been copied.
-    copy_one_file = QtCore.Signal(str)
 
-    def __init__(self, source_list, dest_folder):
-        """Initialize single file copy worker thread.
+    def __init__(self, scheduler):
+        """Initialize copy worker thread.
 
         Args:
-            source_list (list): List of single file.
-            dest_folder (str): Destination root folder path.
+            scheduler (CopyScheduler): Scheduler shared by all workers.
         """
-        super(SingleCopyThread, self).__init__()
-        self.source_list = source_list
-        self.dest_folder = '{}/sources'.format(dest_folder)
+        super(CopyWorkerThread, self).__init__()
+        self.scheduler = scheduler
         self.run_flag = True
-        self._mutex = QtCore.QMutex()
-        self.log = []
 
     def run(self):
-        """Copy every single file into destination folder."""
-        source_count = len(self.source_list)
-        copy_count = 0
-        source_iter = iter(self.source_list)
-
-        while self.run_flag and copy_count < source_count:
-            node_name, source = source_iter.next()
-            shutil.copy2(source, self.dest_folder)
-            self._mutex.lock()
-            self.copy_one_file.emit(source)
-            self.log.append('\n\n{}\n{}'.format(node_name, source))
-            self._mutex.unlock()
-            copy_count += 1
-
-        self.finish.emit()
+        """Copy files until no task remains or been stopped.
 
-
-class SequenceCopyThread(QtCore.QThread):
-    """Worker thread to copy an image sequence."""
-
-    # Qt signal emitted when finish or stop this copy process.
-    finish = QtCore.Signal()
-    # Qt signal emitted when one file been copied.
-    copy_one_file = QtCore.Signal(str)
-
-    def __init__(self, basename, sequence_info, dest_folder):
-        """Initialize sequence copy worker thread.
-
-        Args:
-            basename (str): Image basename without frame count and format.
-            sequence_info (tuple):
-                (
-                    image_sequence_folder_path,
-                    first_frame_number,
-                    last_frame_number,
-                    file_format
-                )
-            dest_folder (str): Destination root folder path.
+        Progress is polled from the scheduler's aggregator by the view, so
+        nothing is emitted per copied file.
         """
-        super(SequenceCopyThread, self).__init__()
-        self.node_name = sequence_info[0]
-        self.source_files = sequence_info[1]
-        self.first = sequence_info[2]
-        self.last = sequence_info[3]
-        self.basename = basename
-        self.dest_folder = '{}/sources/{}'.format(dest_folder, basename)
-        self.run_flag = True
-        self._mutex = QtCore.QMutex()
-        self.log = []
-        self.index = 0
-
-    def run(self):
-        """Copy every frame into destination folder."""
-        sequence_length = len(self.source_files)
-        if sequence_length < self.last - self.first + 1:
-            self.log.append('\n\n{} (missing frame)'.format(self.node_name))
-        else:
-            self.log.append('\n\n{}'.format(self.node_name))
-        if not os.path.isdir(self.dest_folder):
-            os.makedirs(self.dest_folder)
-
-        while self.run_flag and self.index < sequence_length:
-            source = self.source_files[self.index]
-            shutil.copy2(source, self.dest_folder)
-            self._mutex.lock()
-            self.copy_one_file.emit(source)
-            self._mutex.unlock()
-            self.index += 1
+        self.scheduler.run_worker(lambda: self.run_flag, lambda task: None)
+        self.finish.emit()
 
-        if self.index == sequence_length - 1:
-            self.log.append('\n{} {}-{}'.format(
-                utils.frame_to_pattern(self.source_files[0]),
-                self.first,
-                self.last))
-        elif self.index > 0:
-            self.log.append('\n{} {}-{}'.format(
-                utils.frame_to_pattern(self.source_files[0]),
-                self.first,
-                self.first + self.index))
 
-        self.finish.emit()
+class JobTracker(QtCore.QObject):
+    """Tracker counts outstanding worker threads of one packaging run.
 
+    Workers report to the tracker through their finish signals, which are
+    delivered in the GUI thread, so nothing needs to poll or spin while
+    copying. The finished signal is emitted exactly once, after the last
+    outstanding job is done.
+    """
 
-class FinishThread(QtCore.QThread):
-    """Monitor thread to check whether all copy processes are complete."""
+    # Qt signal emitted once all jobs are done, with whether it was cancelled.
+    finished = QtCore.Signal(bool)
 
-    # Qt signal emitted when finish or stop this copy process.
-    finish = QtCore.Signal()
+    def __init__(self):
+        """Initialize tracker without any outstanding job."""
+        super(JobTracker, self).__init__()
+        self.outstanding = 0
+        self.cancelled = False
+        self.is_finished = False
 
-    def __init__(self, view):
-        """Initialize monitor thread.
+    def add(self, count=1):
+        """Add outstanding jobs.
 
         Args:
-            view (QtGui.QWidget): Tool's main UI instance.
+            count (int): Number of jobs to be added.
         """
-        super(FinishThread, self).__init__()
-        self.run_flag = True
-        self.view = view
-
-    def run(self):
-        """Check whether all copy processes are complete."""
-        while self.run_flag and len(self.view.thread_pool) > 1:
-            continue
-
-        self.finish.emit()
+        self.outstanding += count
+
+    def done(self):
+        """Mark one job done, emit finished if none remains."""
+        self.outstanding -= 1
+        self.check_finished()
+
+    def cancel(self):
+        """Mark this run cancelled, finished will be emitted as cancelled."""
+        self.cancelled = True
+        self.check_finished()
+
+    def check_finished(self):
+        """Emit finished signal if no job remains and not emitted yet."""
+        if self.outstanding <= 0 and not self.is_finished:
+            self.is_finished = True
+            self.finished.emit(self.cancelled)
@@ -2,9 +2,14 @@
 
 # Import built-in modules
 import os
+import re
 
 # Import third-party modules
-import nuke
+try:
+    import nuke
+except ImportError:
+    # Batch mode packages .nk scripts without Nuke.
+    nuke = None
 
 # List of Nuke node type which holds a file knob.
 READ_CLASSES = [
@@ -16,6 +21,12 @@ READ_CLASSES = [
     'Vectorfield'
 ]
 
+# Prefix of rewritten file paths, points to sources folder next to the script.
+SOURCES_PATH = '[file dirname [value root.name]]/sources/'
+
+# The last frame number in a file name and the rest of the name after it.
+FRAME_NUMBER = re.compile(r'(-?\d+)([^\d/]*)$')
+
 
 def get_all_nodes(node_class=None):
     """Get all nodes from Nuke node tree, return nodes with specific
@@ -45,26 +56,37 @@ def get_read_nodes():
     return nodes
 
 
-def modify_path(node):
-    """Modify file path in given node to use relative path.
+def get_file_knob_name(node):
+    """Get name of the knob holds source path of given node.
 
     Args:
         node (nuke.Node): A specific node that hold file knob.
+    Returns:
+        str: Name of the file knob.
     """
     if node.Class() == 'Vectorfield':
-        knob_name = 'vfield_file'
-    else:
-        knob_name = 'file'
-    source = node[knob_name].value()
-    basename = os.path.basename(source)
+        return 'vfield_file'
+    return 'file'
 
-    if os.path.isfile(source):
-        node[knob_name].setValue(
-            '[file dirname [value root.name]]/sources/' + basename)
-    else:
-        node['file'].setValue(('[file dirname [value root.name]]/sources/'
-                               '{}/{}').format(basename.split('.')[0],
-                                               basename))
+
+def rewrite_script(script, node_paths, script_path):
+    """Point file knobs of a parsed script to packaged sources and write it.
+
+    Args:
+        script (NkScript): Parsed script.
+        node_paths (dict): Full node name to destination path of its source
+            relative to the sources folder.
+        script_path (str): Path to write the script into, also written as
+            the root name so [value root.name] resolves next to it.
+    """
+    values = dict(((node, get_file_knob_name(node)),
+                   SOURCES_PATH + node_paths[node.fullName()])
+                  for node in script.get_nodes(READ_CLASSES)
+                  if node.fullName() in node_paths)
+    for root in script.get_nodes(['Root']):
+        values[(root, 'name')] = script_path
+    script.set_values(values)
+    script.write(script_path)
 
 
 def frame_to_pattern(frame_path):
@@ -73,8 +95,14 @@ def frame_to_pattern(frame_path):
     Args:
         frame_path (str): Path of an image file with frame count.
     Returns:
-        str: Path of an image sequence with frame pattern.
+        str: Path of an image sequence with a frame pattern of the same
+            padding as the frame number, the path itself if it holds no
+            frame number.
     """
-    name_list = frame_path.split('.')
-    name_list[-2] = '%04d'
-    return '.'.join(name_list).replace('\\', '/')
+    frame_path = frame_path.replace('\\', '/')
+    match = FRAME_NUMBER.search(frame_path)
+    if not match:
+        return frame_path
+    return '{}%0{}d{}'.format(frame_path[:match.start()],
+                              len(match.group(1).lstrip('-')),
+                              match.group(2))
@@ -12,6 +12,9 @@ except ImportError:
 class PackageToolUI(QtWidgets.QWidget):
     """GUI class of this tool."""
 
+    # Qt signal emitted when closing while worker threads are still running.
+    close_requested = QtCore.Signal()
+
     def __init__(self):
         """Initialize GUI and connect signals to slots."""
         super(PackageToolUI, self).__init__(None,
@@ -27,22 +30,84 @@ class PackageToolUI(QtWidgets.QWidget):
         self.folder_layout.addWidget(self.folder_label)
         self.folder_layout.addWidget(self.folder_line)
         self.folder_layout.addWidget(self.folder_button)
+        self.workers_layout = QtWidgets.QHBoxLayout()
+        self.workers_label = QtWidgets.QLabel('Copy Threads:')
+        self.workers_spin = QtWidgets.QSpinBox()
+        self.workers_spin.setRange(1, 32)
+        self.workers_spin.setValue(4)
+        self.workers_layout.addWidget(self.workers_label)
+        self.workers_layout.addWidget(self.workers_spin)
+        self.workers_layout.addStretch()
+        self.mode_label = QtWidgets.QLabel('Copy Mode:')
+        self.mode_combo = QtWidgets.QComboBox()
+        # Item data is the link mode passed to the copy scheduler.
+        self.mode_combo.addItem('Copy', None)
+        self.mode_combo.addItem('Hardlink', 'hardlink')
+        self.mode_combo.addItem('Reflink', 'reflink')
+        self.workers_layout.addWidget(self.mode_label)
+        self.workers_layout.addWidget(self.mode_combo)
+        self.output_layout = QtWidgets.QHBoxLayout()
+        self.output_label = QtWidgets.QLabel('Output:')
+        self.output_combo = QtWidgets.QComboBox()
+        # Item data is the archive format, None for a folder tree.
+        self.output_combo.addItem('Folder', None)
+        self.output_combo.addItem('Tar', 'tar')
+        self.output_combo.addItem('Zip', 'zip')
+        self.volume_label = QtWidgets.QLabel('Tar Volume Size:')
+        # In MB, the same unit as --volume-size of batch.py.
+        self.volume_spin = QtWidgets.QSpinBox()
+        self.volume_spin.setRange(0, 1024 * 1024)
+        self.volume_spin.setSingleStep(1024)
+        self.volume_spin.setSuffix(' MB')
+        self.volume_spin.setSpecialValueText('No Split')
+        self.output_layout.addWidget(self.output_label)
+        self.output_layout.addWidget(self.output_combo)
+        self.output_layout.addWidget(self.volume_label)
+        self.output_layout.addWidget(self.volume_spin)
+        self.output_layout.addStretch()
+        # Unchecked by default, hashing copies every file through Python
+        # buffers instead of the faster kernel copy.
+        self.checksum_check = QtWidgets.QCheckBox(
+            'Write Checksums (slower copy)')
+        self.incremental_check = QtWidgets.QCheckBox(
+            'Incremental (keep unchanged sources, remove unused ones)')
+        self.trim_layout = QtWidgets.QHBoxLayout()
+        self.trim_check = QtWidgets.QCheckBox(
+            'Only Copy Frames In Script Range')
+        self.handles_label = QtWidgets.QLabel('Handles:')
+        self.handles_spin = QtWidgets.QSpinBox()
+        self.handles_spin.setRange(0, 1000)
+        self.handles_spin.setSuffix(' frames')
+        self.trim_layout.addWidget(self.trim_check)
+        self.trim_layout.addWidget(self.handles_label)
+        self.trim_layout.addWidget(self.handles_spin)
+        self.trim_layout.addStretch()
         self.run_button = QtWidgets.QPushButton('Package Now!')
         self.progress_bar = QtWidgets.QProgressBar()
         self.progress_bar.setRange(0, 100)
         self.message = QtWidgets.QLabel()
         self.layout().addLayout(self.folder_layout)
+        self.layout().addLayout(self.workers_layout)
+        self.layout().addLayout(self.output_layout)
+        self.layout().addWidget(self.checksum_check)
+        self.layout().addWidget(self.incremental_check)
+        self.layout().addLayout(self.trim_layout)
         self.layout().addWidget(self.run_button)
         self.layout().addWidget(self.progress_bar)
         self.layout().addWidget(self.message)
 
         self.thread_pool = []
         self.close_flag = False
-        self.close_timer = QtCore.QTimer()
+        # Timer to refresh copy progress, coalesces updates of all workers.
+        self.progress_timer = QtCore.QTimer()
+        self.progress_timer.setInterval(250)
 
     def closeEvent(self, event):
         """Override closeEvent() to stop all worker threads.
 
+        The close is ignored until all worker threads stopped, then the
+        controller closes the view again with close_flag set.
+
         Args:
             event (QtCore.QCloseEvent): Close widget event emitted by Qt.
         """
@@ -53,7 +118,7 @@ class PackageToolUI(QtWidgets.QWidget):
             for thread in self.thread_pool:
                 thread.run_flag = False
             if not self.close_flag:
-                self.close_timer.start(1000),
+                self.close_requested.emit()
                 event.ignore()
             else:
                 event.accept()